@@ -1,9 +1,18 @@
 '''
 This module can be run to produce all of the results quoted in the write-up
 and to perform the validation to ensure the code is working properly.
-It can be run question by question or all in one go.
-'''
+It can be run for all of the questions in one go or for chosen questions, for
+example 'python Answers.py Q3 Q5'.
+The questions are computed in parallel, then printed and plotted in order.
+Use --headless to skip the plots and --serial to compute the questions in turn.
+Results are cached on disk between runs (see Cache.py); use --no-cache to
+recompute them and --clear-cache to empty the cache first.
+Each question module can also be run on its own.
+'''
+import argparse
 import matplotlib.pyplot as plt
+import Runner
+import Cache
 
 params = {
    'axes.labelsize': 12,
@@ -15,48 +24,23 @@ params = {
    } 
 plt.rcParams.update(params)
 
-#%%
-'''
-Q1
-'''
-print('Question 1 \n \n')
-exec(open("Assignment_Q1.py").read())
-print('\n \n')
-#%%
-'''
-Q2
-'''
-print('Question 2 \n \n ')
-exec(open("Assignment_Q2.py").read())
-'''
-The following code is here so the answers to question 2 are not reprinted when 
-question 3 calls the matrix solve method for the cubic spline.
-'''
-print('Result for (a):\n',Res)
-print('L:\n',L)
-print('U:\n',U)
-print('Det:\n', Det)
-print('x:\n',x)
-print('Inv:\n',Inv)
-print('\n \n')
-#%%
-'''
-Q3
-'''
-print('Question 3 \n \n ')
-exec(open("Assignment_Q3.py").read())
-print('\n \n')
-#%%
-'''
-Q4
-'''
-print('Question 4 \n \n')
-exec(open("Assignment_Q4.py").read())
-print('\n \n')
-#%%
-'''
-Q5
-'''
-print('Question 5 \n \n')
-exec(open("Assignment_Q5.py").read())
-print('\n \n')
\ No newline at end of file
+tasks = [Runner.Task('Q1', 'Assignment_Q1', title='Question 1'),
+         Runner.Task('Q2', 'Assignment_Q2', title='Question 2'),
+         Runner.Task('Q3', 'Assignment_Q3', deps=['Q2'], title='Question 3'), #the spline uses the Q2 solver, so Q2 is validated first
+         Runner.Task('Q4', 'Assignment_Q4', title='Question 4'),
+         Runner.Task('Q5', 'Assignment_Q5', title='Question 5')] #the questions and their dependencies
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Produces the results for the assignment.')
+    parser.add_argument('questions', nargs='*', help='the questions to run (default all), e.g. Q1 Q3')
+    parser.add_argument('--headless', action='store_true', help='skip the plots')
+    parser.add_argument('--serial', action='store_true', help='compute the questions in turn')
+    parser.add_argument('--no-cache', action='store_true', help='recompute the results instead of loading them from the cache')
+    parser.add_argument('--clear-cache', action='store_true', help='empty the result cache first')
+    args = parser.parse_args()
+    if args.clear_cache:
+        Cache.clear()
+    chosen = Runner.select(tasks, args.questions or [task.name for task in tasks])
+    Runner.run(chosen, workers=1 if args.serial else None, plot=not args.headless, cache=not args.no_cache)
+    if not args.headless:
+        plt.show()
@@ -1,6 +1,52 @@
 import scipy as sp
+import numpy as np
 import matplotlib.pyplot as plt
 
+def nearArray(r, dtype=np.float64):
+    '''
+    nearArray(r, dtype=np.float64)
+    
+    Function to find the nearest representable real numbers higher and lower in
+    magnitude than every value in an array (r) of floating point numbers of a given
+    type (float16, float32 or float64), all at once.
+    The neighbours are found directly from the bit patterns with nextafter.
+    Also finds the upper and lower difference within which real numbers are rounded to
+    each value and expresses it as a fractional range (found in float64, so it does
+    not underflow for small float16 and float32 values)
+    Outputs the upper numbers, lower numbers and the fractional rounding ranges.
+    '''
+    r = np.asarray(r, dtype=dtype)
+    inf = np.array(np.inf, dtype=dtype)
+    away = np.copysign(inf, r) #the direction away from zero
+    with np.errstate(over='ignore'): #the neighbour of the largest finite number away from zero is inf
+        upper = np.nextafter(r, away) #the next representable number away from zero
+        lower = np.nextafter(r, -away) #the next representable number towards zero
+    wide = r.astype(np.float64) #the differences are found in float64 so half a spacing does not underflow
+    difU = upper.astype(np.float64) - wide #twice the range above r that rounds to r
+    difL = wide - lower.astype(np.float64) #twice the range below r that rounds to r
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fracRange = ((difU+difL)/wide)/2 #finds the range that rounds to r as a fraction of r (halved last, so float64 subnormals do not underflow)
+    zero = r == 0 #there is no range around zero in proportion to it
+    nan = np.array(np.nan, dtype=dtype)
+    upper, lower, fracRange = np.where(zero, nan, upper), np.where(zero, nan, lower), np.where(zero, np.nan, fracRange)
+    return (upper, lower, fracRange)
+
+def ulp(r, dtype=np.float64):
+    '''
+    ulp(r, dtype=np.float64)
+    
+    Function to find the spacing of the representable numbers (the unit in the last
+    place) at every value in an array (r) of floating point numbers of a given type,
+    from the exponent of each value.
+    Outputs the spacings.
+    '''
+    r = np.asarray(r, dtype=dtype)
+    info = np.finfo(dtype)
+    mant, exp = np.frexp(r) #r = mant*2**exp with 0.5 <= |mant| < 1
+    exp = np.where(r == 0, info.minexp+1, exp) #frexp gives zero the exponent 0, but it is spaced like the subnormals
+    exp = np.maximum(exp, info.minexp+1) #subnormal numbers all have the smallest spacing
+    return np.ldexp(np.ones_like(r), exp-info.nmant-1) #one unit in the last binary place of the mantissa
+
 def near(r):
     '''
     near(r)
@@ -10,23 +56,10 @@ def near(r):
     Also finds the upper and lower difference within which real numbers are rounded to
     the given floating point value and expresses it as a fractional range
     Outputs the upper number, lower number and the fractional rounding range.
+    For whole arrays of values use nearArray.
     '''
-    x = r + r/4 #selects a value slightly higher than input number
-    upper = float('NaN') #create variable 'upper' to hold nearest representable number higher than r
-    #perform a binary search style algorithm until we 'run out' of numbers
-    while x != r and x != upper: #condition only met when there are no floats between our values
-        upper = x #stores the previous value of x
-        x = (x+r)/2 #sets the next value of x to the midpoint
-    y = r - r/4 #selects a value slightly lower than input number
-    lower = float('NaN') #create variable 'lower' to hold nearest representable number lower than r
-    #perform a binary search style algorithm until we 'run out' of numbers
-    while y != r and y != lower: #condition only met when there are no floats between our values
-        lower = y #stores the previous value of y
-        y = (y+r)/2 #sets the next value of x to the midpoint
-    difU = (upper - r)/2 #finds the range above r that rounds to r
-    difL = (r-lower)/2 #finds the range below r that rounds to r
-    fracRange = (difU+difL)/r #finds the range that rounds to r as a fraction of r
-    return (upper, lower, fracRange)
+    upper, lower, fracRange = nearArray(r) #finds the neighbours of r
+    return (float(upper), float(lower), float(fracRange))
 
 def nearCheck(r):
     '''
@@ -44,44 +77,59 @@ def nearCheck(r):
         raise TypeError('Near Function Failed') #if not an error is raised
     return
 
-'''
-This section of code returns the results for the question and runs a check
-to validate the program.
-'''
-nearCheck(0.25) #this performs the check that my function is working properly
-upper, lower, fracRange = near(0.25) #this Performs the function
-print('Upper from 0.25:',upper) #prints the upper from 0.25
-print('Lower from 0.25:',lower) #prints the lower from 0.25
-print('Fractional Range Rounding to 0.25:\n', fracRange) #prints the fractional range rounding to 0.25
-upper1, lower1, fracRange1 = near(upper) #performs the function on the number higher than 0.25
-print('Upper from the upper from 0.25:',upper1) #prints the upper the upper from 0.25
-print('Lower from the lower from 0.25:',lower1) #prints the lower the upper from 0.25
-print('Fractional Range Rounding to next representable real number higher than 0.25:\n',fracRange1) #prints the fractional range rounding to the number higher than 0.25
-upper2, lower2, fracRange2 = near(lower) #performs the function on the number lower than 0.25
-print('Upper from the lower from 0.25:',upper2) #prints the upper the lower from 0.25
-print('Lower from the lower from 0.25:',lower2) #prints the lower the lower from 0.25
-print('Fractional Range Rounding to next representable real number lower than 0.25:\n',fracRange2) #prints the fractional range rounding to the number lower than 0.25
+def answers():
+    '''
+    answers()
+    
+    This function runs the check to validate the program and finds the results for
+    the question, without printing or plotting them.
+    Outputs a dictionary of the results.
+    '''
+    res = {}
+    nearCheck(0.25) #this performs the check that my function is working properly
+    res['upper'], res['lower'], res['fracRange'] = near(0.25) #this Performs the function
+    res['upper1'], res['lower1'], res['fracRange1'] = near(res['upper']) #performs the function on the number higher than 0.25
+    res['upper2'], res['lower2'], res['fracRange2'] = near(res['lower']) #performs the function on the number lower than 0.25
+    #the graph shows how fractional error range changes with increasing numbers
+    res['x'] = sp.linspace(0.06251,1.999999,10000) #create a big set of numbers to put through the function
+    res['x2'] = [2,1,2**-1,2**-2,2**-3,2**-4] #create some powers of 2s to go through the function
+    res['FracRanges'] = nearArray(res['x'])[2] #runs the function on big set of numbers
+    res['FracRanges2'] = nearArray(res['x2'])[2] #runs the function on the powers of two
+    return res
+
+def report(res):
+    '''
+    report(res)
+    
+    This function prints the results (res) from answers().
+    '''
+    print('Upper from 0.25:',res['upper']) #prints the upper from 0.25
+    print('Lower from 0.25:',res['lower']) #prints the lower from 0.25
+    print('Fractional Range Rounding to 0.25:\n', res['fracRange']) #prints the fractional range rounding to 0.25
+    print('Upper from the upper from 0.25:',res['upper1']) #prints the upper the upper from 0.25
+    print('Lower from the lower from 0.25:',res['lower1']) #prints the lower the upper from 0.25
+    print('Fractional Range Rounding to next representable real number higher than 0.25:\n',res['fracRange1']) #prints the fractional range rounding to the number higher than 0.25
+    print('Upper from the lower from 0.25:',res['upper2']) #prints the upper the lower from 0.25
+    print('Lower from the lower from 0.25:',res['lower2']) #prints the lower the lower from 0.25
+    print('Fractional Range Rounding to next representable real number lower than 0.25:\n',res['fracRange2']) #prints the fractional range rounding to the number lower than 0.25
+
+def plots(res):
+    '''
+    plots(res)
+    
+    This function produces the graph from the results (res) from answers().
+    '''
+    plt.figure()
+    plt.plot(res['x'],res['FracRanges'],'.') #plots all the fractional ranges
+    plt.plot(res['x2'],res['FracRanges2'],'x', label = 'Powers of Two') #plots all the fractional ranges for the powers of two
+    plt.grid()
+    plt.legend(frameon=False)
+    plt.xlabel('Number')
+    plt.ylabel('Fractional Error')
+    plt.title('Fractional Error for Rounding to Representable Numbers')
 
-'''
-This section of code produces the graph.
-The aim of this is to show how fractional error range changes with increasing numbers.
-'''
-x = sp.linspace(0.06251,1.999999,10000) #create a big set of numbers to put through the function
-x2 = [2,1,2**-1,2**-2,2**-3,2**-4] #create some powers of 2s to go through the function
-FracRanges = [] #create a list to store the fractional ranges
-FracRanges2 = [] #create a list to store the fractional ranges of the powers of 2s
-for i in range(len(x)):
-    upper, lower, fracRange = near(x[i]) #runs the function on big set of numbers
-    FracRanges.append(fracRange) #stores the fractional ranges
-for i in range(len(x2)):
-    upper, lower, fracRange = near(x2[i])#runs the function on the powers of two
-    FracRanges2.append(fracRange) #stores the fractional ranges
-plt.figure()
-plt.plot(x,FracRanges,'.') #plots all the fractional ranges
-plt.plot(x2,FracRanges2,'x', label = 'Powers of Two') #plots all the fractional ranges for the powers of two
-plt.grid()
-plt.legend(frameon=False)
-plt.xlabel('Number')
-plt.ylabel('Fractional Error')
-plt.title('Fractional Error for Rounding to Representable Numbers')
-plt.show()
+if __name__ == '__main__':
+    res = answers()
+    report(res)
+    plots(res)
+    plt.show()
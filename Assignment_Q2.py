@@ -1,105 +1,927 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+import heapq
+import os
 import scipy as sp
+import scipy.linalg as spl
 import numpy as np
+import Instrument
 
-def LU(A):
+parallelSize = 2**18 #the smallest right-hand side (in elements) worth splitting between workers
+
+@Instrument.timed('LU')
+def LU(A, pivot=False, bs=64, dtype=np.float64):
     '''
-    LU(A)
+    LU(A, pivot=False, bs=64, dtype=np.float64)
     
-    Function to perform LU Decomposition on a matrix (A) using the Crout algorithm.
+    Function to perform LU Decomposition on a matrix (A) using a right-looking
+    blocked algorithm.
     L[i][i] set to 1 (Doolittle).
+    Columns are factorised bs at a time with row-vectorised updates, then the rest
+    of the matrix is updated with a single matrix product per block (bs >= n gives
+    the plain unblocked algorithm).
+    If pivot is True partial pivoting is used and the permutation vector (P) is also
+    output, such that A[P] = L.U.
+    The decomposition is found in the floating point type dtype (float32 halves the
+    memory and time for a less accurate result).
     Outputs Lower (L), Upper (U) and result (Res) matrices.
     '''
     n = len(A) #the value of n for the nxn matrix A
-    U = sp.zeros([n,n]) #creates the nxn matrix to hold the upper matrix
-    L = sp.zeros([n,n]) #creates the nxn matrix to hold the lower matrix
-    for j in range (n):
-        L[j][j] = 1.0 #sets the diagonal in the lower matrix to have values of 1
-        for i in range(j+1): #itterates through upper matrix in order
-            U[i][j] = A[i][j] - sum(L[i][k]*U[k][j] for k in range(n)) #equation for calculating the upper matrix values (Crout's algorithm)
-        for i in range(j+1,n): #itterates through lower matrix in order
-            L[i][j] = (A[i][j] - sum(L[i][k]*U[k][j] for k in range(n)))/U[j][j] #equation for calculating the lower matrix values (Crout's algorithm)
-    LUCheck(A,L,U) #runs the check function to make sure everything is working properly
-    Res = U
-    for i in range(n):
-        for j in range(n):
-            if j<i:
-                Res[i][j] = L[i][j]
+    Res = np.array(A, dtype=dtype) #copy of A that is overwritten with L and U in place
+    P = np.arange(n) #permutation vector recording the row swaps
+    for k0 in range(0, n, bs): #iterates over the blocks of columns
+        k1 = min(k0+bs, n) #end of the current block
+        for k in range(k0, k1): #factorises the panel one column at a time
+            if pivot:
+                p = k + np.argmax(np.abs(Res[k:,k])) #finds the largest pivot in the column
+                if p != k:
+                    Res[[k,p]] = Res[[p,k]] #swaps the whole rows
+                    P[[k,p]] = P[[p,k]] #records the swap
+            if Res[k][k] != 0:
+                Res[k+1:,k] /= Res[k][k] #calculates column k of the lower matrix
+            elif np.any(Res[k+1:,k]):
+                raise TypeError('LU Function Failed: Zero Pivot') #the elimination cannot continue
+            #a zero column has nothing to eliminate, so A is singular and U[k][k] = 0
+            Res[k+1:,k+1:k1] -= np.outer(Res[k+1:,k], Res[k,k+1:k1]) #updates the rest of the panel
+        if k1 < n:
+            Res[k0:k1,k1:] = spl.solve_triangular(Res[k0:k1,k0:k1], Res[k0:k1,k1:], lower=True, unit_diagonal=True) #calculates the block row of the upper matrix
+            Res[k1:,k1:] -= np.matmul(Res[k1:,k0:k1], Res[k0:k1,k1:]) #updates the trailing matrix with one matrix product
+    Instrument.count('LU', flops=2*n**3/3) #the work of the elimination
+    L = np.tril(Res,-1) + np.eye(n, dtype=Res.dtype) #extracts the lower matrix with unit diagonal
+    U = np.triu(Res) #extracts the upper matrix
+    LUCheck(np.asarray(A)[P],L,U) #runs the check function to make sure everything is working properly
+    if pivot:
+        return (L,U,Res,P)
     return (L,U,Res)
 
+class LUFactor:
+    '''
+    LUFactor(A, pivot=True, bs=64, dtype=np.float64)
+    
+    Class holding the LU decomposition of a matrix (A) so it can be reused.
+    The matrix is factorised once when the object is created and the packed result
+    (Res) and permutation vector (P) are stored.
+    The solve, det and inv methods then only perform substitutions, and solutions
+    with many columns can be split between a pool of threads or processes.
+    '''
+    def __init__(self, A, pivot=True, bs=64, dtype=np.float64):
+        self.n = len(A) #the value of n for the nxn matrix A
+        if pivot:
+            self.L, self.U, self.Res, self.P = LU(A, pivot=True, bs=bs, dtype=dtype) #runs LU decomposition with pivoting
+        else:
+            self.L, self.U, self.Res = LU(A, bs=bs, dtype=dtype) #runs LU decomposition
+            self.P = np.arange(self.n) #no rows are swapped
+        
+    @Instrument.timed('LUFactor.solve')
+    def solve(self, b, workers=None, pool='thread'):
+        '''
+        solve(b, workers=None, pool='thread')
+        
+        Solves A.x=b for x given a solution (b) by forwards and backwards substitution.
+        b can be a single vector or an nxk matrix of k solutions.
+        The columns are independent, so when b is large (at least parallelSize
+        elements) they are split between workers threads (pool='thread') or
+        processes (pool='process'), all using the same factorisation.
+        workers=None uses every core and workers=1 solves in this thread.
+        The substitutions are made in the type of the factorisation.
+        Outputs x.
+        '''
+        if pool not in ('thread', 'process'):
+            raise TypeError('Invalid Pool') #if an invalid pool name is given an error is raised
+        b = np.asarray(b, dtype=self.Res.dtype) #makes sure b is the same type as the factorisation
+        Instrument.count('LUFactor.solve', flops=2*self.n*b.size) #two substitutions per solution
+        workers = min(workers or os.cpu_count() or 1, b.shape[1] if b.ndim == 2 else 1)
+        if workers > 1 and b.size >= parallelSize:
+            return self.solveParallel(b, workers, pool)
+        return self.substitute(b)
+    
+    def substitute(self, b):
+        #with L.U.x=P.b we can say L.y=P.b and U.x=y
+        y = spl.solve_triangular(self.Res, b[self.P], lower=True, unit_diagonal=True) #forwards substitution for y
+        return spl.solve_triangular(self.Res, y) #backwards substitution for x
+    
+    def solveParallel(self, b, workers, pool):
+        '''
+        solveParallel(b, workers, pool)
+        
+        Solves A.x=b for an nxk matrix b by splitting its columns into one block per
+        worker.
+        Threads share the factorisation and write their blocks of x in place.
+        Processes instead find the factorisation, b and x in shared memory buffers,
+        so none of them are copied to the workers.
+        Outputs x.
+        '''
+        spans = [(c[0], c[-1]+1) for c in np.array_split(np.arange(b.shape[1]), workers)] #the columns for each worker
+        if pool == 'thread':
+            x = np.empty(b.shape, dtype=self.Res.dtype)
+            def part(span):
+                x[:,span[0]:span[1]] = self.substitute(b[:,span[0]:span[1]])
+            with ThreadPoolExecutor(max_workers=workers) as threads:
+                list(threads.map(part, spans))
+            return x
+        shared = {} #the shared memory buffers, by name
+        try:
+            for name, a in (('Res', self.Res), ('P', self.P), ('b', b), ('x', np.empty(b.shape, dtype=self.Res.dtype))):
+                shared[name] = (SharedMemory(create=True, size=max(a.nbytes, 1)), a.shape, a.dtype.str)
+                np.ndarray(a.shape, a.dtype, buffer=shared[name][0].buf)[...] = a
+            spec = {name: (shm.name, shape, dtype) for name, (shm, shape, dtype) in shared.items()}
+            with ProcessPoolExecutor(max_workers=workers) as processes:
+                list(processes.map(solveShared, [spec]*len(spans), spans))
+            shm, shape, dtype = shared['x']
+            return np.ndarray(shape, dtype, buffer=shm.buf).copy()
+        finally:
+            for shm, shape, dtype in shared.values():
+                shm.close()
+                shm.unlink() #frees the buffer
+    
+    def det(self):
+        '''
+        det()
+        
+        Finds the determinant from the product of the diagonal elements of U.
+        Each row swap made while pivoting changes the sign.
+        Outputs determinant (d).
+        '''
+        d = np.prod(np.diag(self.Res)) #calculates product of diagonal elements of upper matrix
+        seen = np.zeros(self.n, dtype=bool) #marks the rows visited in the permutation
+        for i in range(self.n):
+            j = i
+            while not seen[j]: #follows each cycle of the permutation
+                seen[j] = True
+                j = self.P[j]
+                if j != i:
+                    d = -d #a cycle of length k is k-1 swaps
+        return d
+    
+    def inv(self, workers=None, pool='thread'):
+        '''
+        inv(workers=None, pool='thread')
+        
+        Finds the inverse by solving A.inv(A)=I for every column of I at once, split
+        between workers as in solve.
+        Outputs the inverse (inv).
+        '''
+        return self.solve(np.eye(self.n), workers, pool)
+
+def solveShared(spec, span):
+    '''
+    solveShared(spec, span)
+    
+    Solves for the columns span[0] to span[1] of x in a worker process, where spec
+    gives the name, shape and type of the shared memory buffers holding the
+    factorisation (Res and P), b and x.
+    '''
+    shms = {name: SharedMemory(name=shmName) for name, (shmName, shape, dtype) in spec.items()}
+    try:
+        arrays = {name: np.ndarray(spec[name][1], spec[name][2], buffer=shm.buf) for name, shm in shms.items()}
+        Res, P, b, x = arrays['Res'], arrays['P'], arrays['b'], arrays['x']
+        y = spl.solve_triangular(Res, b[P,span[0]:span[1]], lower=True, unit_diagonal=True) #forwards substitution for y
+        x[:,span[0]:span[1]] = spl.solve_triangular(Res, y) #backwards substitution for the block of x
+        del arrays, Res, P, b, x #the buffers cannot be closed while arrays use them
+    finally:
+        for shm in shms.values():
+            shm.close()
+
+class Banded:
+    '''
+    Banded(band, l, u)
+    
+    Class storing an nxn banded matrix with l diagonals below and u diagonals above
+    the main diagonal in O(n) memory.
+    Row i of band holds the non-zero part of row i of the matrix, so that
+    band[i][j-i+l] = A[i][j].
+    '''
+    def __init__(self, band, l, u):
+        self.band = np.array(band, dtype=float) #the (n, l+u+1) array of diagonals
+        self.l = l #number of lower diagonals
+        self.u = u #number of upper diagonals
+        self.n = len(self.band) #the value of n for the nxn matrix
+        
+    def __len__(self):
+        return self.n
+    
+    @classmethod
+    def tri(cls, lower, diag, upper):
+        '''
+        tri(lower, diag, upper)
+        
+        Creates a tridiagonal matrix from its diagonals, where lower[i] = A[i+1][i]
+        and upper[i] = A[i][i+1].
+        '''
+        n = len(diag) #the value of n for the nxn matrix
+        band = np.zeros([n,3]) #array to hold the three diagonals
+        band[1:,0] = lower
+        band[:,1] = diag
+        band[:-1,2] = upper
+        return cls(band, 1, 1)
+    
+    @classmethod
+    def fromDense(cls, A, l, u):
+        '''
+        fromDense(A, l, u)
+        
+        Creates a banded matrix from the band of a full matrix (A).
+        '''
+        n = len(A) #the value of n for the nxn matrix A
+        band = np.zeros([n,l+u+1]) #array to hold the diagonals
+        for k in range(-l, u+1):
+            d = np.diagonal(A, k) #diagonal k of A
+            if k < 0:
+                band[-k:,k+l] = d
+            else:
+                band[:n-k,k+l] = d
+        return cls(band, l, u)
+    
+    def dense(self):
+        '''
+        dense()
+        
+        Outputs the full nxn matrix.
+        '''
+        A = np.zeros([self.n,self.n]) #the full matrix
+        for k in range(-self.l, self.u+1):
+            if k < 0:
+                A[np.arange(-k,self.n), np.arange(self.n+k)] = self.band[-k:,k+self.l] #fills diagonal k
+            else:
+                A[np.arange(self.n-k), np.arange(k,self.n)] = self.band[:self.n-k,k+self.l]
+        return A
+    
+    def dot(self, x):
+        '''
+        dot(x)
+        
+        Multiplies the matrix by a vector or nxk matrix (x) in O(n) operations.
+        Outputs A.x.
+        '''
+        x = np.asarray(x, dtype=float)
+        y = np.zeros(x.shape) #variable to hold the product
+        for k in range(-self.l, self.u+1): #adds the contribution of each diagonal
+            if k < 0:
+                y[-k:] += (self.band[-k:,k+self.l] * x[:self.n+k].T).T
+            else:
+                y[:self.n-k] += (self.band[:self.n-k,k+self.l] * x[k:].T).T
+        return y
+
+@Instrument.timed('solveBanded')
+def solveBanded(A, b):
+    '''
+    solveBanded(A, b)
+    
+    Function to solve A.x=b for x given a banded matrix (A) and solution (b) in
+    O(n) operations and memory, using Gaussian elimination without pivoting.
+    Tridiagonal matrices use the Thomas algorithm.
+    b can be a single vector or an nxk matrix of k solutions.
+    Outputs x.
+    '''
+    n, l, u = A.n, A.l, A.u
+    b = np.array(b, dtype=float) #copy of b that is overwritten during elimination
+    if l == 1 and u == 1: #the Thomas algorithm for tridiagonal matrices
+        a = A.band[:,0].tolist() #the lower diagonal
+        d = A.band[:,1].tolist() #the main diagonal
+        c = A.band[:,2].tolist() #the upper diagonal
+        r = b.tolist() if b.ndim == 1 else list(b) #plain floats are much faster to loop over
+        cp = [0.0]*n #the modified upper diagonal
+        if d[0] == 0:
+            raise TypeError('Banded Solve Failed: Zero Pivot')
+        cp[0] = c[0]/d[0]
+        r[0] = r[0]/d[0]
+        for i in range(1,n): #forwards sweep
+            m = d[i] - a[i]*cp[i-1] #the pivot for row i
+            if m == 0:
+                raise TypeError('Banded Solve Failed: Zero Pivot')
+            cp[i] = c[i]/m
+            r[i] = (r[i] - a[i]*r[i-1])/m
+        for i in range(n-2,-1,-1): #backwards substitution
+            r[i] = r[i] - cp[i]*r[i+1]
+        x = np.array(r)
+    else: #general banded elimination
+        W = A.band.copy() #copy of the band that is overwritten during elimination
+        for k in range(n-1):
+            if W[k][l] == 0:
+                raise TypeError('Banded Solve Failed: Zero Pivot')
+            for i in range(k+1, min(k+l,n-1)+1): #eliminates the rows below the pivot
+                f = W[i][k-i+l]/W[k][l]
+                W[i][k-i+l:k-i+l+u+1] -= f*W[k][l:l+u+1]
+                b[i] = b[i] - f*b[k]
+        if W[n-1][l] == 0:
+            raise TypeError('Banded Solve Failed: Zero Pivot')
+        x = np.zeros((n+u,) + b.shape[1:]) #x padded with zeros past the end of the matrix
+        for k in range(n-1,-1,-1): #backwards substitution
+            x[k] = (b[k] - np.dot(W[k][l+1:], x[k+1:k+u+1]))/W[k][l]
+        x = x[:n]
+    Instrument.count('solveBanded', flops=(2*l+1)*(u+1)*b.size) #about (2l+1)(u+1) per row per solution
+    return x
+
+class CSR:
+    '''
+    CSR(data, indices, indptr, shape)
+    
+    Class storing a sparse matrix in compressed sparse row form, in memory
+    proportional to its number of non-zero elements (nnz).
+    The non-zero elements of row i are data[indptr[i]:indptr[i+1]], in the columns
+    indices[indptr[i]:indptr[i+1]] (in increasing order).
+    The transpose in this form is the compressed sparse column form of the matrix.
+    '''
+    def __init__(self, data, indices, indptr, shape):
+        self.data = np.asarray(data, dtype=float) #the non-zero elements
+        self.indices = np.asarray(indices, dtype=np.intp) #the column of each element
+        self.indptr = np.asarray(indptr, dtype=np.intp) #where each row starts in data
+        self.shape = tuple(shape) #the number of rows and columns
+        self.n = self.shape[0] #the number of rows
+        
+    def __len__(self):
+        return self.n
+    
+    @property
+    def nnz(self):
+        return len(self.data)
+    
+    @classmethod
+    def fromCOO(cls, rows, cols, vals, shape):
+        '''
+        fromCOO(rows, cols, vals, shape)
+        
+        Creates a sparse matrix from lists of the row, column and value of each
+        element. Elements given more than once are added together.
+        '''
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        keys, where = np.unique(rows*shape[1] + cols, return_inverse=True) #sorts by row then column
+        data = np.bincount(where.ravel(), weights=np.asarray(vals, dtype=float).ravel(), minlength=len(keys)) #adds any repeated elements
+        counts = np.bincount(keys//shape[1], minlength=shape[0]) #the number of elements in each row
+        return cls(data, keys % shape[1], np.concatenate(([0], np.cumsum(counts))), shape)
+    
+    @classmethod
+    def fromDense(cls, A):
+        '''
+        fromDense(A)
+        
+        Creates a sparse matrix from the non-zero elements of a full matrix (A).
+        '''
+        A = np.asarray(A, dtype=float)
+        rows, cols = np.nonzero(A)
+        return cls.fromCOO(rows, cols, A[rows, cols], A.shape)
+    
+    @classmethod
+    def fromBanded(cls, B):
+        '''
+        fromBanded(B)
+        
+        Creates a sparse matrix from the non-zero elements of a Banded matrix (B).
+        '''
+        rows = np.repeat(np.arange(B.n), B.l+B.u+1) #the row of each element of the band
+        cols = rows + np.tile(np.arange(-B.l, B.u+1), B.n) #the column of each element
+        vals = B.band.ravel()
+        keep = (cols >= 0) & (cols < B.n) & (vals != 0)
+        return cls.fromCOO(rows[keep], cols[keep], vals[keep], (B.n, B.n))
+    
+    def rowIndex(self):
+        return np.repeat(np.arange(self.n), np.diff(self.indptr)) #the row of each element
+    
+    def dense(self):
+        '''
+        dense()
+        
+        Outputs the full matrix.
+        '''
+        A = np.zeros(self.shape) #the full matrix
+        A[self.rowIndex(), self.indices] = self.data
+        return A
+    
+    def dot(self, x):
+        '''
+        dot(x)
+        
+        Multiplies the matrix by a vector or matrix (x) in O(nnz) operations.
+        Outputs A.x.
+        '''
+        x = np.asarray(x, dtype=float)
+        y = np.zeros((self.n,) + x.shape[1:]) #variable to hold the product
+        full = np.diff(self.indptr) > 0 #the rows with any elements
+        if self.nnz:
+            prod = (self.data * x[self.indices].T).T #each element times its part of x
+            y[full] = np.add.reduceat(prod, self.indptr[:-1][full]) #sums each row
+        return y
+    
+    def transpose(self):
+        '''
+        transpose()
+        
+        Outputs the transpose of the matrix (the compressed sparse column form of A).
+        '''
+        return CSR.fromCOO(self.indices, self.rowIndex(), self.data, self.shape[::-1])
+    
+    def permute(self, p):
+        '''
+        permute(p)
+        
+        Reorders the rows and columns of a square matrix by the permutation vector
+        (p), so that the result B has B[i][j] = A[p[i]][p[j]].
+        '''
+        q = np.argsort(p) #the inverse permutation, where each row and column moves to
+        return CSR.fromCOO(q[self.rowIndex()], q[self.indices], self.data, self.shape)
+
+def rcm(A):
+    '''
+    rcm(A)
+    
+    Finds the reverse Cuthill-McKee ordering of a square sparse matrix (A), which
+    reduces its bandwidth (and so the fill-in of its LU decomposition) by numbering
+    the rows in breadth first order through the graph of the non-zero elements,
+    starting each connected part from a far away (pseudo-peripheral) row.
+    Outputs the permutation vector (p).
+    '''
+    n = len(A)
+    rows, cols = A.rowIndex(), A.indices
+    off = rows != cols #the diagonal is not part of the graph
+    G = CSR.fromCOO(np.concatenate((rows[off], cols[off])), np.concatenate((cols[off], rows[off])),
+                    np.ones(2*off.sum()), (n, n)) #the symmetric pattern of A + A^T
+    ptr, adj = G.indptr.tolist(), G.indices.tolist()
+    degree = np.diff(G.indptr).tolist()
+    def bfs(start, mark): #breadth first search from start, outputs the levels
+        levels, seen = [[start]], {start}
+        while True:
+            nxt = []
+            for i in levels[-1]:
+                for j in sorted(adj[ptr[i]:ptr[i+1]], key=degree.__getitem__): #neighbours with the lowest degree first
+                    if j not in seen and not mark[j]:
+                        seen.add(j)
+                        nxt.append(j)
+            if not nxt:
+                return levels
+            levels.append(nxt)
+    mark = [False]*n #the rows already ordered
+    order = []
+    for first in np.argsort(degree, kind='stable').tolist(): #starts each part from a row with the lowest degree
+        if mark[first]:
+            continue
+        start, levels = first, bfs(first, mark)
+        for _ in range(5): #moves the start to the far end of the part while that makes the search deeper
+            far = min(levels[-1], key=degree.__getitem__)
+            deeper = bfs(far, mark)
+            if len(deeper) <= len(levels):
+                break
+            start, levels = far, deeper
+        for level in levels:
+            for i in level:
+                mark[i] = True
+                order.append(i)
+    return np.array(order[::-1], dtype=np.intp)
+
+class SparseLU:
+    '''
+    SparseLU(A, ordering='rcm', fill=True)
+    
+    Class holding the LU decomposition of a square sparse matrix (A) so it can be
+    reused, with L and U stored as CSR matrices.
+    The rows and columns are first reordered by the permutation vector (P) from
+    rcm (or not at all with ordering=None) to reduce the fill-in, so that
+    A[P][:,P] = L.U.
+    Each row is eliminated using only the non-zero elements of the rows of U above
+    it. Like the banded solver no pivoting is used, so A should be diagonally
+    dominant or symmetric positive definite.
+    If fill is False any fill-in is dropped, keeping only the pattern of A, which
+    gives the incomplete factorisation ILU(0) used to precondition iterative solvers.
+    The solve, det and inv methods then only perform sparse substitutions.
+    '''
+    @Instrument.timed('SparseLU')
+    def __init__(self, A, ordering='rcm', fill=True):
+        if ordering not in ('rcm', None):
+            raise TypeError('Invalid Ordering') #if an invalid ordering name is given an error is raised
+        if not isinstance(A, CSR):
+            A = CSR.fromDense(A)
+        n = self.n = len(A) #the value of n for the nxn matrix A
+        self.P = rcm(A) if ordering == 'rcm' else np.arange(n) #the fill reducing order
+        B = A.permute(self.P)
+        ptr, idx, val = B.indptr.tolist(), B.indices.tolist(), B.data.tolist() #plain numbers are much faster to loop over
+        Lc, Lv, Uc, Uv = [None]*n, [None]*n, [None]*n, [None]*n #the columns and values of each row of L and U (off the diagonal)
+        d = [0.0]*n #the diagonal of U
+        for i in range(n):
+            w = dict(zip(idx[ptr[i]:ptr[i+1]], val[ptr[i]:ptr[i+1]])) #row i, updated as it is eliminated
+            heap = [k for k in w if k < i] #the columns still to eliminate, smallest first
+            heapq.heapify(heap)
+            lc, lv = [], []
+            while heap:
+                k = heapq.heappop(heap)
+                lik = w.pop(k)/d[k] #the multiple of row k of U to take away
+                lc.append(k)
+                lv.append(lik)
+                for j, ukj in zip(Uc[k], Uv[k]):
+                    if j in w:
+                        w[j] = w[j] - lik*ukj
+                    elif fill: #fill-in
+                        w[j] = -lik*ukj
+                        if j < i:
+                            heapq.heappush(heap, j)
+            if w.get(i, 0) == 0:
+                raise TypeError('Sparse LU Failed: Zero Pivot') #the elimination cannot continue
+            d[i] = w.pop(i)
+            Uc[i] = sorted(w)
+            Uv[i] = [w[j] for j in Uc[i]]
+            Lc[i], Lv[i] = lc, lv
+        self.rows = (Lc, Lv, d, Uc, Uv)
+        self.levels = None #the substitution levels, found on the first solve
+        self.L = self.fromRows(Lc, Lv, [1.0]*n, True) #L with its unit diagonal
+        self.U = self.fromRows(Uc, Uv, d, False)
+        Instrument.count('SparseLU', fill=self.L.nnz + self.U.nnz - n - B.nnz) #the elements created by the elimination
+        
+    def fromRows(self, cols, vals, diag, lower):
+        n = self.n
+        rows = [i for i in range(n) for _ in range(len(cols[i])+1)] #the row of each element, with the diagonal
+        c = [j for i in range(n) for j in ((cols[i] + [i]) if lower else ([i] + cols[i]))]
+        v = [a for i in range(n) for a in ((vals[i] + [diag[i]]) if lower else ([diag[i]] + vals[i]))]
+        counts = np.array([len(cols[i])+1 for i in range(n)])
+        return CSR(v, c, np.concatenate(([0], np.cumsum(counts))), (n, n)) #already in row then column order
+        
+    def schedule(self, cols, vals, order):
+        '''
+        schedule(cols, vals, order)
+        
+        Groups the rows of L (or U) into levels, taken in order, where each row only
+        depends on rows in earlier levels, so all of the rows in a level can be
+        substituted at once.
+        Outputs a list of the rows of each level, the rows among them with elements,
+        and the columns, values and start of each row of those elements, or None if
+        the levels are too narrow (under 32 rows on average) to be faster than
+        substituting one row at a time.
+        '''
+        level = [0]*self.n
+        limit = self.n//32 #the most levels worth using
+        for i in order:
+            level[i] = 1 + max([level[j] for j in cols[i]], default=-1)
+            if level[i] >= limit:
+                return None
+        count = max(level, default=-1) + 1 #the number of levels
+        levels = []
+        byLevel = np.argsort(level, kind='stable') #the rows sorted by level
+        ends = np.cumsum(np.bincount(level, minlength=count))
+        for rows in np.split(byLevel, ends[:-1]):
+            updated = [i for i in rows.tolist() if cols[i]] #only rows with elements need updating
+            sizes = [len(cols[i]) for i in updated]
+            levels.append((rows, np.array(updated, dtype=np.intp), np.array([j for i in updated for j in cols[i]], dtype=np.intp),
+                           np.array([v for i in updated for v in vals[i]]), np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.intp)))
+        return levels
+        
+    @Instrument.timed('SparseLU.solve')
+    def solve(self, b):
+        '''
+        solve(b)
+        
+        Solves A.x=b for x given a solution (b) by sparse forwards and backwards
+        substitution.
+        When many rows do not depend on each other (as for ILU(0) of a matrix from a
+        grid) the rows are substituted a level at a time with array operations,
+        otherwise one at a time.
+        b can be a single vector or an nxk matrix of k solutions.
+        Outputs x.
+        '''
+        Lc, Lv, d, Uc, Uv = self.rows
+        b = np.asarray(b, dtype=float)[self.P] #b in the new order
+        if self.levels is None: #the levels are found on the first solve
+            self.levels = (self.schedule(Lc, Lv, range(self.n)), self.schedule(Uc, Uv, range(self.n-1,-1,-1)))
+        lower, upper = self.levels
+        if lower is not None and upper is not None:
+            r = b.copy()
+            for rows, updated, cols, vals, starts in lower: #forwards substitution for L.y=b
+                if len(updated):
+                    r[updated] -= np.add.reduceat((vals * r[cols].T).T, starts)
+            d = np.array(d)
+            for rows, updated, cols, vals, starts in upper: #backwards substitution for U.x=y
+                if len(updated):
+                    r[updated] -= np.add.reduceat((vals * r[cols].T).T, starts)
+                r[rows] = (r[rows].T/d[rows]).T
+        else:
+            r = b.tolist() if b.ndim == 1 else list(b)
+            for i in range(self.n): #forwards substitution for L.y=b
+                s = r[i]
+                for k, l in zip(Lc[i], Lv[i]):
+                    s = s - l*r[k]
+                r[i] = s
+            for i in range(self.n-1,-1,-1): #backwards substitution for U.x=y
+                s = r[i]
+                for j, u in zip(Uc[i], Uv[i]):
+                    s = s - u*r[j]
+                r[i] = s/d[i]
+        x = np.zeros(b.shape)
+        x[self.P] = np.array(r) #returns x to the original order
+        return x
+    
+    def det(self):
+        '''
+        det()
+        
+        Finds the determinant from the product of the diagonal elements of U
+        (reordering the rows and columns the same way does not change it).
+        Outputs determinant (d).
+        '''
+        return np.prod(self.rows[2])
+    
+    def inv(self):
+        '''
+        inv()
+        
+        Finds the (full) inverse by solving A.inv(A)=I for every column of I at once.
+        Outputs the inverse (inv).
+        '''
+        return self.solve(np.eye(self.n))
+
+class BatchLU:
+    '''
+    BatchLU(A, pivot=True)
+    
+    Class holding the LU decompositions of a stack of many small nxn matrices (A,
+    with shape (batch, n, n)), all found at once with every operation vectorised
+    over the batch, so the Python overhead is paid once per column rather than once
+    per system.
+    With pivot True partial pivoting is used, recording the permutation vectors (P)
+    such that A[k][P[k]] = L[k].U[k].
+    The packed L and U of each system are stored in Res, with the determinant of
+    each system (det) and whether it is singular (singular, a zero pivot).
+    The solve method solves every system at once.
+    '''
+    @Instrument.timed('BatchLU')
+    def __init__(self, A, pivot=True):
+        Res = np.array(A, dtype=float) #copy of A that is overwritten with L and U in place
+        if Res.ndim != 3 or Res.shape[1] != Res.shape[2]:
+            raise TypeError('BatchLU Needs A Stack Of Square Matrices') #the input must have shape (batch, n, n)
+        m, n = Res.shape[:2] #the number of systems and their size
+        rows = np.arange(m) #the index of each system
+        P = np.tile(np.arange(n), (m,1)) #the permutation vector of each system
+        sign = np.ones(m) #the sign of each permutation
+        singular = np.zeros(m, dtype=bool)
+        for k in range(n):
+            if pivot:
+                p = k + np.argmax(np.abs(Res[:,k:,k]), axis=1) #the largest pivot in column k of each system
+                swap = p != k
+                Res[rows,k], Res[rows,p] = Res[rows,p], Res[rows,k].copy() #swaps the rows (a no-op where p = k)
+                P[rows,k], P[rows,p] = P[rows,p], P[rows,k].copy()
+                sign[swap] = -sign[swap]
+            pivots = Res[:,k,k]
+            zero = pivots == 0
+            singular |= zero
+            Res[:,k+1:,k] /= np.where(zero, 1, pivots)[:,None] #column k of the lower matrices (left alone where singular)
+            Res[:,k+1:,k+1:] -= Res[:,k+1:,k,None]*Res[:,None,k,k+1:] #updates the rest of every matrix
+        self.n = n
+        self.Res = Res
+        self.P = P
+        self.singular = singular #systems with a zero pivot, which have no unique solution
+        self.det = sign*np.prod(np.diagonal(Res, axis1=1, axis2=2), axis=1) #the determinant of each system
+        Instrument.count('BatchLU', systems=m, flops=m*2*n**3/3)
+        
+    def solve(self, b):
+        '''
+        solve(b)
+        
+        Solves every system A[k].x[k]=b[k] at once by forwards and backwards
+        substitution, for a (batch, n) array of solutions (b).
+        Singular systems give nan.
+        Outputs x, with shape (batch, n).
+        '''
+        b = np.asarray(b, dtype=float)
+        y = np.take_along_axis(b, self.P, axis=1) #P.b for every system
+        for i in range(1, self.n): #forwards substitution for L.y=P.b
+            y[:,i] -= np.einsum('kj,kj->k', self.Res[:,i,:i], y[:,:i])
+        x = y
+        for i in range(self.n-1, -1, -1): #backwards substitution for U.x=y
+            x[:,i] = (x[:,i] - np.einsum('kj,kj->k', self.Res[:,i,i+1:], x[:,i+1:]))/self.Res[:,i,i]
+        x[self.singular] = np.nan
+        return x
+
+def solveBatch(A, b, pivot=True):
+    '''
+    solveBatch(A, b, pivot=True)
+    
+    Function to solve many small systems A[k].x[k]=b[k] at once, for a stack of
+    matrices (A, with shape (batch, n, n)) and solutions (b, with shape (batch, n)).
+    The checks are run once for the whole batch.
+    Outputs x (nan for singular systems), the determinant of each system (det) and
+    whether each system is singular (singular).
+    '''
+    F = BatchLU(A, pivot)
+    with np.errstate(divide='ignore', invalid='ignore'): #singular systems divide by zero
+        x = F.solve(b)
+    batchCheck(np.asarray(A, dtype=float), x, np.asarray(b, dtype=float), F.singular) #runs check function to make sure everything is working correctly
+    return (x, F.det, F.singular)
+
 def dt(A):
     '''
     dt(A)
     
     Function to find the determinant of a matrix (A) from LU decomposition.
+    If A is a CSR matrix the sparse LU decomposition is used instead.
     Outputs determinant (d).
     '''
-    n = len(A) #the value of n for the nxn matrix A
-    L,U, Res = LU(A) #runs LU decomposition
-    d = 1 #creates variable for out determinant
-    for i in range(n):
-        d = d*U[i][i] #calculates product of diagonal elements of upper matrix
+    if isinstance(A, CSR):
+        d = SparseLU(A).det() #runs sparse LU decomposition and finds the determinant
+        dtCheck(A.dense(),d) #runs check function to make sure everything is working correctly
+        return d
+    d = LUFactor(A).det() #runs LU decomposition and finds the determinant
     dtCheck(A,d) #runs check function to make sure everything is working correctly
     return d
 
-def solve(A,b):
+def solve(A,b,workers=None,pool='thread',mixed=False):
     '''
-    solve(A,b)
+    solve(A,b,workers=None,pool='thread',mixed=False)
     
     Function to solve A.x=b for x given a matrix (A) and solution (b).
     Uses backwards and forwards substitution with LU decomposition.
+    b can be a single vector or an nxk matrix of k solutions.
+    If A is a Banded matrix the O(n) banded solver is used instead, and if it is a
+    CSR matrix the sparse LU decomposition.
+    To solve many times with the same A use LUFactor(A).solve(b) (or
+    SparseLU(A).solve(b)) instead.
+    Many solutions for a full matrix are split between workers threads or
+    processes (pool) as in LUFactor.solve.
+    If mixed is True a full matrix is decomposed in float32 and the solution refined
+    to float64 accuracy, as in solveMixed.
     Outputs x.
     '''
-    n = len(A) #the value of n for the nxn matrix A
-    L,U, Res = LU(A) #runs LU decomposition
-    #with L.U.x=b we can say L.y=b and U.x=y
-    y = sp.zeros(n) #column vector to hold our x values
-    x = sp.zeros(n) #column vector to hold our y values
-    y[0]=b[0]/L[0][0] #equation for y0
-    for i in range(1,n):
-        y[i] = (b[i]-sum(L[i][j]*y[j] for j in range(i)))/L[i][i] #equation for solving the elements of y
-    x[n-1]=y[n-1]/(U[n-1][n-1]) #equation for x0
-    for i in range(n-2,-1,-1):
-        x[i] = (y[i]-sum(U[i][j]*x[j] for j in range(i+1,n)))/U[i][i] #equation for solving the elements of x
+    if isinstance(A, Banded):
+        x = solveBanded(A,b) #runs the banded elimination
+        bandedCheck(A,x,b) #runs check function to make sure everything is working correctly
+        return x
+    if isinstance(A, CSR):
+        x = SparseLU(A).solve(b) #runs sparse LU decomposition and substitutions
+        sparseCheck(A,x,b) #runs check function to make sure everything is working correctly
+        return x
+    if mixed:
+        return solveMixed(A,b)[0] #runs the mixed precision solve (which checks itself)
+    x = LUFactor(A).solve(b, workers, pool) #runs LU decomposition and substitutions
     solveCheck(A,x,b) #runs check function to make sure everything is working correctly
     return x
     
-def inv(A):
+@Instrument.timed('solveMixed')
+def solveMixed(A, b, maxiter=10):
     '''
-    inv(A)
+    solveMixed(A, b, maxiter=10)
+    
+    Function to solve A.x=b for x given a matrix (A) and solution (b) in mixed
+    precision: A is decomposed in float32 (half the memory and about half the time
+    of float64), then the solution is improved by iterative refinement, solving
+    A.d=r for the residual r=b-A.x (found in float64) with the float32 factors and
+    adding d to x, until the backward error |b-A.x|/(|A||x|+|b|) (largest over the
+    rows) is at float64 rounding level.
+    If the refinement stalls (the error stops falling), does not finish within
+    maxiter iterations or the float32 decomposition fails, a float64 decomposition
+    is used instead.
+    b can be a single vector or an nxk matrix of k solutions.
+    Outputs x and a dictionary of:
+    iterations - the number of refinement iterations made
+    backwardError - the backward error of x
+    history - the backward error before each iteration and at the end
+    fallback - whether the float64 decomposition was used
+    '''
+    A = np.asarray(A, dtype=float)
+    b = np.asarray(b, dtype=float)
+    n = len(A)
+    target = np.sqrt(n)*np.finfo(float).eps #the backward error of a float64 solve
+    absA = np.abs(A)
+    def backward(x, r): #the largest backward error of any row
+        with np.errstate(divide='ignore', invalid='ignore'):
+            err = np.where(r == 0, 0.0, np.abs(r)/(np.matmul(absA, np.abs(x)) + np.abs(b))) #a row with no residual has no error (even 0/0)
+        return np.max(err) if err.size else 0.0
+    history, fallback, k = [], False, 0
+    try:
+        with np.errstate(over='ignore', invalid='ignore'):
+            F = LUFactor(A, dtype=np.float32) #the cheap decomposition
+        if not np.all(np.isfinite(F.Res)):
+            raise TypeError('LU Function Failed: Overflow') #A does not fit in float32
+        x = F.solve(b).astype(float)
+        while True:
+            r = b - np.matmul(A, x) #the residual in float64
+            history.append(backward(x, r))
+            if history[-1] <= target:
+                break
+            if k == maxiter or not np.isfinite(history[-1]) or (k > 0 and history[-1] > 0.5*history[-2]): #stalled
+                fallback = True
+                break
+            x = x + F.solve(r) #the refinement step
+            k = k + 1
+    except TypeError: #the float32 decomposition failed
+        fallback = True
+    if fallback:
+        x = LUFactor(A).solve(b) #the full float64 decomposition
+        history.append(backward(x, b - np.matmul(A, x)))
+    Instrument.count('solveMixed', iterations=k, fallbacks=int(fallback))
+    solveCheck(A,x,b) #runs check function to make sure everything is working correctly
+    return (x, {'iterations': k, 'backwardError': history[-1], 'history': history, 'fallback': fallback})
+
+def inv(A,workers=None,pool='thread'):
+    '''
+    inv(A,workers=None,pool='thread')
     
     Function to find the inverse of a matrix (A) using LU decompostion.
+    The matrix is only decomposed once for all the columns, which are split between
+    workers threads or processes (pool) as in LUFactor.solve.
+    If A is a CSR matrix the sparse LU decomposition is used instead (the inverse
+    is still a full matrix).
     Outputs the inverse (inv)
     '''
-    n = len(A) #the value of n for the nxn matrix A
-    L,U, Res = LU(A) #runs LU decomposition
-    I = sp.zeros([n,n]) #creates nxn matrix that will become the identity matrix
-    inv = sp.zeros([n,n]) #creates nxn matrix that will become the inverse matrix
-    for i in range(n):
-        I[i][i] = 1.0 #makes I the identity matrix
-    for j in range(n):
-        Ii = sp.zeros(n) #column vector that will be column j of the identity matrix
-        for i in range(n):
-            Ii[i] = I[i][j] #sets Ii to be column j of the identity matrix
-        #now for each column we can say A.inv(A)[j]=I[j]
-        invi = solve(A,Ii) #solve the equation with our function
-        for i in range(n):
-            inv[i][j] = invi[i] #assembles the columns into our matrix
+    if isinstance(A, CSR):
+        inv = SparseLU(A).inv() #runs sparse LU decomposition and solves for every column of I
+        invCheck(A.dense(),inv) #runs check function to make sure everything is working correctly
+        return inv
+    inv = LUFactor(A).inv(workers, pool) #runs LU decomposition and solves for every column of I
     invCheck(A,inv) #runs check function to make sure everything is working correctly
     return inv
         
+class CheckMetrics:
+    '''
+    CheckMetrics()
+    
+    Class counting, for each check function, how many times it was called (calls),
+    how many times it was actually run under the validation policy (runs) and how
+    many times it failed (failures).
+    '''
+    def __init__(self):
+        self.calls = {} #number of calls of each check
+        self.runs = {} #number of checks actually performed
+        self.failures = {} #number of failed checks
+        
+    def count(self, counter, name):
+        counter[name] = counter.get(name, 0) + 1 #adds one to the count for the check
+        
+    def reset(self):
+        self.__init__() #clears all of the counts
+        
+    def __repr__(self):
+        return 'CheckMetrics(calls=%s, runs=%s, failures=%s)' % (self.calls, self.runs, self.failures)
+
+Check = {'mode': 'always', 'every': 10, 'vectors': 3, 'strict': True} #the global validation policy
+Metrics = CheckMetrics() #the global record of the checks
+rng = np.random.default_rng() #random generator for the cheap checks
+
+def setCheck(mode='always', every=10, vectors=3, strict=True):
+    '''
+    setCheck(mode='always', every=10, vectors=3, strict=True)
+    
+    Sets the validation policy used by the check functions.
+    'off' never runs the checks, 'always' runs the full checks on every call,
+    'sampled' runs the full checks on every Nth call (every) and 'cheap' runs
+    randomised residual checks with a number of random vectors (vectors) on every call.
+    If strict is True a failed check raises an Error, otherwise it is only counted
+    in Metrics.
+    '''
+    if mode not in ('off', 'always', 'sampled', 'cheap'):
+        raise TypeError('Invalid Mode') #if an invalid mode name is given an error is raised
+    Check.update(mode=mode, every=every, vectors=vectors, strict=strict) #updates the policy
+    return
+
+def runCheck(name):
+    '''
+    runCheck(name)
+    
+    Decides whether the check called name should run under the validation policy.
+    Outputs the kind of check to run ('full' or 'cheap') or None to skip it.
+    '''
+    Metrics.count(Metrics.calls, name) #records the call
+    mode = Check['mode']
+    if mode == 'off':
+        return None
+    if mode == 'sampled' and (Metrics.calls[name]-1) % Check['every'] != 0:
+        return None #only every Nth call is checked
+    Metrics.count(Metrics.runs, name) #records that the check was run
+    if mode == 'cheap':
+        return 'cheap'
+    return 'full'
+
+def failCheck(name, message):
+    '''
+    failCheck(name, message)
+    
+    Records a failed check in Metrics and raises an Error with the message if the
+    policy is strict.
+    '''
+    Metrics.count(Metrics.failures, name) #records the failure
+    if Check['strict']:
+        raise TypeError(message) #if strict an error is raised
+    return
+
+@Instrument.timed('LUCheck')
 def LUCheck(A,L,U):
     '''
     LUCheck(A,L,U)
     
-    Checks the LU function is working correctly by confirming L.U=A.
+    Checks the LU function is working correctly by confirming L.U=A (to within
+    the rounding error of the elimination).
+    In cheap mode this is only confirmed for the product with a few random vectors
+    (Freivalds' algorithm), which costs O(n^2) rather than O(n^3).
     If not an Error is raised.
     '''
+    kind = runCheck('LU')
+    if kind is None:
+        return
     n = len(A) #the value of n for the nxn matrix A
-    A1 = sp.matmul(L,U) #multiplies L and U (should give A)
-    for i in range (n):
-        for j in range (n):
-            if abs(A[i][j]-A1[i][j]) > 1e-14: #ensures the product of L and U is ~ A
-                raise TypeError('LU Function Failed') #if not an error is raised
+    eps = n*np.finfo(np.result_type(L, U)).eps #rounding error factor for the elimination (in the type of the factors)
+    if kind == 'cheap':
+        v = rng.standard_normal((n, Check['vectors'])) #random vectors to multiply by
+        dif = np.abs(np.matmul(A,v) - np.matmul(L,np.matmul(U,v))) #A.v - L.(U.v) (should be 0)
+        bound = eps*np.matmul(np.abs(L),np.matmul(np.abs(U),np.abs(v))) #rounding error bound for the product
+    else:
+        dif = np.abs(A - sp.matmul(L,U)) #A - L.U (should be 0)
+        bound = eps*np.matmul(np.abs(L),np.abs(U)) #rounding error bound for the elimination
+    if np.any((dif > 1e-14) & (dif > bound)): #ensures the product of L and U is ~ A
+        failCheck('LU', 'LU Function Failed') #if not an error is raised
     return
 
 def dtCheck(A,d):
@@ -108,11 +930,20 @@ def dtCheck(A,d):
     
     Checks the dt function is working correctly by comparing determinant 
     calculated determinant (d) to numpy function.
+    In cheap mode the determinant is only checked to be finite, as the factors it
+    comes from have already been checked by LUCheck.
     If not an Error is raised.
     '''
+    kind = runCheck('dt')
+    if kind is None:
+        return
+    if kind == 'cheap':
+        if not np.isfinite(d): #ensures the determinant is a number
+            failCheck('dt', 'Det Function Failed') #if not an error is raised
+        return
     det = np.linalg.det(A) #calculates determinant with nump function
     if abs(det-d) > 1e-8: #ensures our determinant value matches the true value
-        raise TypeError('Det Function Failed') #if not an error is raised
+        failCheck('dt', 'Det Function Failed') #if not an error is raised
     return
 
 def solveCheck(A,x,b):
@@ -121,16 +952,30 @@ def solveCheck(A,x,b):
     
     Checks the solve function is working correctly by confirming A.x=b and by
     comparing calculated x to numpy function
+    In cheap mode only A.x=b is confirmed, for a few random combinations of the
+    columns of x when there are several solutions (allowing the same error in each
+    column as the full check).
     If not an Error is raised.
     '''
-    n = len(A) #the value of n for the nxn matrix A
+    kind = runCheck('solve')
+    if kind is None:
+        return
+    x = np.asarray(x) #makes sure x and b are arrays
+    b = np.asarray(b)
+    if kind == 'cheap':
+        tol = 1e-14
+        if x.ndim == 2:
+            v = rng.standard_normal((x.shape[1], Check['vectors'])) #random combinations of the columns
+            x = np.matmul(x,v)
+            b = np.matmul(b,v)
+            tol = tol*np.sum(np.abs(v), axis=0) #the largest error of a combination of columns each within 1e-14
+        if np.any(np.abs(np.dot(A,x) - b) > tol): #checks A.x - b = 0
+            failCheck('solve', 'Solve Function Failed') #if not an error is raised
+        return
     check = np.dot(A,x) - b  #calculates A.x - b (should be 0)
     true = np.linalg.solve(A, b) #calculates x with numpy function
-    for i in range(n):
-        if abs(check[i]) > 1e-14: #checks A.x - b = 0
-            raise TypeError('Solve Function Failed') #if not an error is raised
-        if abs(true[i]-x[i]) > 1e-14: #checks my x matches the numpy x
-            raise TypeError('Solve Function Failed') #if not an error is raised
+    if np.any(np.abs(check) > 1e-14) or np.any(np.abs(true-x) > 1e-14): #checks A.x - b = 0 and my x matches the numpy x
+        failCheck('solve', 'Solve Function Failed') #if not an error is raised
     return
 
 def invCheck(A,inv):
@@ -138,21 +983,87 @@ def invCheck(A,inv):
     invCheck(A,inv)
     
     Checks the inv function is working correctly by making sure inv(A).A=I
+    In cheap mode this is only confirmed for a few random vectors, A.(inv(A).v)=v.
     If not an Error is raised.
     '''
+    kind = runCheck('inv')
+    if kind is None:
+        return
     n = len(A) #the value of n for the nxn matrix A
-    check = sp.matmul(A,inv) #calculates A.inv(A) (should be identity matrix)
-    for i in range(n):
-        if (check[i][i] - 1) > 1e-14: #checks diagonals are 1
-            raise TypeError('Inv Function Failed') #if not an error is raised
-        for j in range(n):
-            if i!=j:
-                if check[i][j] > 1e-14: #checks non-diagonals are 0
-                    raise TypeError('Inv Function Failed')#if not an error is raised
+    if kind == 'cheap':
+        v = rng.standard_normal((n, Check['vectors'])) #random vectors to multiply by
+        check = np.matmul(A,np.matmul(inv,v)) - v #calculates A.inv(A).v - v (should be 0)
+    else:
+        check = sp.matmul(A,inv) - np.eye(n) #calculates A.inv(A) - I (should be 0)
+    if np.any(np.abs(check) > 1e-14): #checks diagonals are 1 and non-diagonals are 0
+        failCheck('inv', 'Inv Function Failed') #if not an error is raised
+    return
+
+def bandedCheck(A,x,b):
+    '''
+    bandedCheck(A,x,b)
+    
+    Checks the banded solve is working correctly by confirming A.x=b (to within
+    rounding error) for a banded matrix (A), using the O(n) banded product.
+    If not an Error is raised.
+    '''
+    kind = runCheck('banded')
+    if kind is None:
+        return
+    Ax = A.dot(x) #calculates A.x
+    AxAbs = Banded(np.abs(A.band), A.l, A.u).dot(np.abs(x)) #calculates |A|.|x|
+    bound = 4*(A.l+A.u+1)*np.finfo(float).eps*(AxAbs + np.abs(b)) #rounding error bound for the elimination
+    dif = np.abs(Ax - b) #calculates A.x - b (should be 0)
+    if np.any((dif > 1e-14) & (dif > bound)): #checks A.x - b = 0
+        failCheck('banded', 'Banded Solve Failed') #if not an error is raised
+    return
+
+def sparseCheck(A,x,b):
+    '''
+    sparseCheck(A,x,b)
+    
+    Checks the sparse solve is working correctly by confirming A.x=b (to within
+    rounding error) for a CSR matrix (A), using the O(nnz) sparse product.
+    If not an Error is raised.
+    '''
+    kind = runCheck('sparse')
+    if kind is None:
+        return
+    Ax = A.dot(x) #calculates A.x
+    AxAbs = CSR(np.abs(A.data), A.indices, A.indptr, A.shape).dot(np.abs(x)) #calculates |A|.|x|
+    k = np.diff(A.indptr).max() if A.nnz else 1 #the most elements in a row
+    bound = 4*k*np.finfo(float).eps*(AxAbs + np.abs(b)) #rounding error bound for the elimination
+    dif = np.abs(Ax - b) #calculates A.x - b (should be 0)
+    if np.any((dif > 1e-14) & (dif > bound)): #checks A.x - b = 0
+        failCheck('sparse', 'Sparse Solve Failed') #if not an error is raised
+    return
+
+def batchCheck(A,x,b,singular):
+    '''
+    batchCheck(A,x,b,singular)
+    
+    Checks the batched solve is working correctly by confirming A[k].x[k]=b[k] (to
+    within the rounding error of the elimination) for every system that is not
+    singular, all at once.
+    In cheap mode only a few randomly chosen systems are checked.
+    If not an Error is raised.
+    '''
+    kind = runCheck('batch')
+    if kind is None:
+        return
+    ok = np.flatnonzero(~singular) #the systems with a solution
+    if kind == 'cheap':
+        ok = rng.choice(ok, min(len(ok), Check['vectors']), replace=False) if len(ok) else ok
+    A, x, b = A[ok], x[ok], b[ok]
+    n = A.shape[1] if A.ndim == 3 else 0
+    dif = np.abs(np.einsum('kij,kj->ki', A, x) - b) #A.x - b for every system (should be 0)
+    bound = 4*n*np.finfo(float).eps*(np.einsum('kij,kj->ki', np.abs(A), np.abs(x)) + np.abs(b)) #rounding error bound for the elimination
+    if np.any((dif > 1e-14) & (dif > bound)): #checks A.x - b = 0
+        failCheck('batch', 'Batch Solve Failed') #if not an error is raised
     return
 
 '''
-This section of the code produces the results for the question.
+This section of the code holds the data and produces the results for the question.
 The checks are activated throughout the functions themselves.
 '''
 A = sp.array([[3,1,0,0,0],
@@ -161,7 +1072,42 @@ A = sp.array([[3,1,0,0,0],
               [0,0,-22,31,-25],
               [0,0,0,-35,61]]) #our input matrix
 b = sp.array([2,5,-4,8,9]) #the 'b' for our A.x=b equation
-L,U, Res = LU(A) #run LU decompetition
-x = solve(A, b) #solve for x
-Det = dt(A) #find the determinant
-Inv = inv(A) #find the inverse matrix
+
+def answers():
+    '''
+    answers()
+    
+    This function finds the results for the question, without printing them.
+    Outputs a dictionary of the results.
+    '''
+    res = {}
+    res['L'], res['U'], res['Res'] = LU(A) #run LU decompetition
+    res['x'] = solve(A, b) #solve for x
+    res['Det'] = dt(A) #find the determinant
+    res['Inv'] = inv(A) #find the inverse matrix
+    return res
+
+def report(res):
+    '''
+    report(res)
+    
+    This function prints the results (res) from answers().
+    '''
+    print('Result for (a):\n',res['Res'])
+    print('L:\n',res['L'])
+    print('U:\n',res['U'])
+    print('Det:\n', res['Det'])
+    print('x:\n',res['x'])
+    print('Inv:\n',res['Inv'])
+
+def plots(res):
+    '''
+    plots(res)
+    
+    There are no graphs for this question.
+    '''
+    return
+
+if __name__ == '__main__':
+    report(answers())
+
@@ -1,25 +1,168 @@
+import itertools
 import scipy as sp
+import numpy as np
 import Assignment_Q2 as Q2
+import Instrument
 from scipy.interpolate import CubicSpline
 import matplotlib.pyplot as plt
 
+def weights(dif):
+    '''
+    weights(dif)
+    
+    Finds the barycentric weights 1/prod(dif) along each row of the scaled
+    differences (dif).
+    A product that overflows or underflows part way through (for a thousand or more
+    points) is found from the sum of the logarithms instead.
+    Outputs the weights.
+    '''
+    with np.errstate(over='ignore', under='ignore', divide='ignore'):
+        partial = np.abs(np.cumprod(dif, axis=1)) #the product so far along each row
+        w = 1/np.prod(dif, axis=1)
+        bad = np.any((partial > np.finfo(float).max) | (partial < np.finfo(float).tiny), axis=1) #rows where the product left the normal range (and lost precision)
+        if np.any(bad):
+            d = dif[bad]
+            w[bad] = np.prod(np.sign(d), axis=1)*np.exp(-np.sum(np.log(np.abs(d)), axis=1))
+    return w
+
+class LagrangeModel:
+    '''
+    LagrangeModel(x,y)
+    
+    Class holding the Lagrange polynomial through the tabulated data set x and y in
+    barycentric form.
+    The weights (w) are found once in O(n^2) when the object is created, then each
+    value is evaluated in O(n) with the second (true) barycentric formula.
+    The differences between the points are scaled by a quarter of the range of x
+    (C), which cancels in the formula but stops the weights over or underflowing
+    for large n.
+    Calling the object on an array of values t outputs the polynomial at each value.
+    '''
+    def __init__(self, x, y):
+        self.x = np.array(x, dtype=float) #the data points
+        self.y = np.array(y, dtype=float) #the values at the data points
+        n = len(self.x) #calculates the number of data points
+        self.C = (self.x.max()-self.x.min())/4 if n > 1 else 1.0 #the scale of the differences
+        dif = (self.x[:,None]-self.x[None,:])/self.C #the scaled differences between every pair of points
+        dif[np.arange(n),np.arange(n)] = 1 #leaves out j = i from the product
+        self.w = weights(dif) #calculates the weights
+        
+    def add(self, xnew, ynew):
+        '''
+        add(xnew, ynew)
+        
+        Adds a new data point to the polynomial, updating the weights in O(n).
+        '''
+        dif = (self.x-xnew)/self.C #the scaled differences to the new point
+        if np.any(dif == 0):
+            raise TypeError('Duplicate Data Point') #the polynomial cannot pass through two values at one point
+        self.w = np.append(self.w/dif, weights(-dif[None,:])) #updates the old weights and finds the new one
+        self.x = np.append(self.x, xnew)
+        self.y = np.append(self.y, ynew)
+        
+    @Instrument.timed('LagrangeModel')
+    def __call__(self, t, chunk=2**20):
+        t = np.asarray(t, dtype=float)
+        f = np.zeros(t.shape) #creates variable to hold the function
+        tf, ff = t.reshape(-1), f.reshape(-1)
+        m = max(1, chunk//len(self.x)) #number of values per chunk so the temporary arrays stay small
+        for k in range(0, len(tf), m):
+            tk = tf[k:k+m]
+            dif = tk[:,None]-self.x[None,:] #the differences between the values and the data points
+            exact = dif == 0 #values that are exactly on a data point
+            dif[exact] = 1 #avoids dividing by zero
+            q = self.w/dif
+            ff[k:k+m] = np.dot(q,self.y)/np.sum(q, axis=1) #calculates the barycentric formula
+            row, col = np.nonzero(exact)
+            ff[k+row] = self.y[col] #the polynomial passes through the data points
+        Instrument.count('LagrangeModel', flops=5*len(self.x)*t.size) #a difference, division, two sums and a product per point
+        return f
+
 def LagInt(t,x,y):
     '''
     LagInt(t,x,y)
     
     This function performs Lagrangian interpolation on tabulated data set x and
     y.
+    To evaluate the same polynomial many times use LagrangeModel(x,y) instead.
     Outputs the functional value (summed) for a given x.
     '''
-    n = len(x) #calculates the number of data points
-    summed = 0 #creates variable to hold function
-    for i in range(0,n):
-        prod = 1 #creates variable to hold product part of equation
-        for j in range(0,n):
-            if j != i:
-                prod = prod * ((t-x[j])/(x[i]-x[j])) #calculate product part of equations
-        summed = summed + prod*y[i] #calculates function
-    return summed
+    return LagrangeModel(x,y)(t)
+
+class CubicSplineModel:
+    '''
+    CubicSplineModel(x,y)
+    
+    Class holding a natural cubic spline through the tabulated data set x and y.
+    The second derivatives are solved for once when the object is created and the
+    spline on each interval is stored as a cubic in (t-x[i]), with coefficients
+    a, b, c and d.
+    Calling the object on an array of values t outputs the spline at each value.
+    '''
+    def __init__(self, x, y):
+        self.x = np.asarray(x, dtype=float) #the knots
+        self.y = np.asarray(y, dtype=float) #the values at the knots
+        x, y = self.x, self.y
+        n = len(x) #calculates the number of data points
+        if n < 2:
+            raise TypeError('Cubic Spline Needs At Least Two Data Points') #a spline needs at least one interval
+        diffs = np.zeros(n) #creates column vector to hold second differentials
+        h = x[1:]-x[:-1] #the widths of the intervals
+        if n > 2: #with two points the natural spline is a straight line, so the second differentials stay 0
+            #the tridiagonal matrix that multiples the column vector of second derivatives is stored by its diagonals
+            A = Q2.Banded.tri(h[1:-1]/6, (x[2:]-x[:-2])/3, h[1:-1]/6)
+            b = (y[2:]-y[1:-1])/h[1:]-(y[1:-1]-y[:-2])/h[:-1] #calculates the values of b
+            diffs[1:-1] = Q2.solve(A,b) #calculates the values of the second differentials (f0'' and fn'' are 0)
+        self.diffs = diffs
+        #the coefficients of the cubic on each interval, found by expanding the A, B, C, D form in (t-x[i])
+        self.a = y[:-1]
+        self.b = (y[1:]-y[:-1])/h - h*(2*diffs[:-1]+diffs[1:])/6
+        self.c = diffs[:-1]/2
+        self.d = (diffs[1:]-diffs[:-1])/(6*h)
+        #a table of the first interior knot in each of n equal buckets spanning the knots, to start the search from
+        self.inner = np.append(x[1:-1], np.inf) #the interior knots, with a sentinel at the end
+        self.scale = (n-1)/(x[-1]-x[0]) if n > 2 and x[-1] > x[0] else 0.0 #buckets per unit of t
+        kb = self.bucket(x[1:-1]) #the bucket of each interior knot (non-decreasing as the knots are sorted)
+        self.start = np.searchsorted(kb, np.arange(n-1)) #the number of interior knots in earlier buckets
+        self.crowded = n > 2 and np.max(np.diff(np.append(self.start, n-2))) > 16 #too many knots in a bucket to step through
+        
+    def bucket(self, t):
+        with np.errstate(invalid='ignore'): #nan and inf are put in the first or last bucket
+            b = ((t - self.x[0])*self.scale).astype(np.intp)
+        return np.clip(b, 0, len(self.x)-2, out=b)
+        
+    def interval(self, t):
+        '''
+        interval(t)
+        
+        Finds the interval each value of t is in.
+        Each value starts from the first interior knot in its bucket, which can only
+        be below it (a knot above t is never in an earlier bucket), then steps
+        forwards past any knots below it, only revisiting the values that moved.
+        With evenly spread knots this takes one or two steps instead of the log2(n)
+        steps of a binary search; if the knots are crowded into a few buckets a
+        binary search is used instead.
+        Values outside the knots use the first or last interval.
+        Outputs the index of the interval (i).
+        '''
+        t = np.asarray(t, dtype=float)
+        Instrument.count('CubicSplineModel', searches=t.size)
+        if self.crowded:
+            return np.searchsorted(self.inner[:-1], t) #the number of interior knots below each value
+        tf = t.reshape(-1)
+        i = self.start[self.bucket(tf)]
+        idx = np.flatnonzero(self.inner[i] < tf) #the values with another knot below them
+        while idx.size:
+            i[idx] += 1
+            idx = idx[self.inner[i[idx]] < tf[idx]]
+        return i.reshape(t.shape)
+        
+    @Instrument.timed('CubicSplineModel')
+    def __call__(self, t):
+        t = np.asarray(t, dtype=float)
+        i = self.interval(t) #finds the interval each value of t is in
+        s = t - self.x[i] #the distance into the interval
+        return self.a[i] + s*(self.b[i] + s*(self.c[i] + s*self.d[i])) #calculates the cubic spline function
 
 def CubSpline(t,x,y):
     '''
@@ -27,40 +170,61 @@ def CubSpline(t,x,y):
     
     This function performs cubic Spline interpolation on tabulated data set x and
     y.
+    To evaluate the same spline many times use CubicSplineModel(x,y) instead.
     Outputs the functional value (f) for a given x.
     '''
-    n = len(x) #calculates the number of data points
-    A = sp.zeros([n-2,n-2]) #creates matrix to hold values for the tridiagonal matrix that multiples the column vector of second derivatives
-    b = sp.zeros(n-2) #creates column vector to hold solutions to the second differential matrix equation
-    f = sp.zeros(len(t)) #creates variablle to hold the function
-    diffs = sp.zeros(n) #creates column vector to hold second differentials
-    j = 0 #sets up initial j value (for the position in A)
-    i = 1 #sets up initial i value (for the equation of x)
-    while j < n-2 and i < n-1:
-        A[j][j] = ((x[i+1]-x[i-1])/3)
-        if j!=0:
-            A[j][j-1] = ((x[i]-x[i-1])/6)
-        if j!=n-3:
-            A[j][j+1] = ((x[i+1]-x[i])/6)
-        #the three equations above populate the matrix A with the appropriate values
-        b[j] = ((y[i+1]-y[i])/(x[i+1]-x[i])-(y[i]-y[i-1])/(x[i]-x[i-1])) #calculates the values of b
-        j = j + 1 #iterates over j
-        i = i + 1 #iterates over i at the same time as j
-    diffcalc = Q2.solve(A,b) #calculates the values of the second differentials (without f0'' and fn'')
-    for i in range(1,n-1):
-        diffs[i] = diffcalc[i-1] #sets f0'' and fn'' to 0
-    for j in range(len(t)):    
-        i = 0
-        while t[j] > x[i]:
-            i = i+1 #finds the interval a value of x is in
-        i = i-1
-        A = (x[i+1]-t[j])/(x[i+1]-x[i])
-        B = 1-A
-        C = ((A**3-A)*(x[i+1]-x[i])**2)/6
-        D = ((B**3-B)*(x[i+1]-x[i])**2)/6
-        #the three equations above are the coefficients for the cubic spline funtion
-        f[j] = A*y[i]+B*y[i+1]+C*diffs[i]+D*diffs[i+1] #calculates the cubic spline function
-    return f
+    return CubicSplineModel(x,y)(t)
+
+def chunks(t, chunk=2**20):
+    '''
+    chunks(t, chunk=2**20)
+    
+    Generator splitting the values t into arrays of at most chunk values.
+    t can be an array, a memory-mapped array (only one chunk is read from disk at a
+    time) or any iterable of numbers.
+    '''
+    if hasattr(t, 'shape'): #arrays are sliced directly
+        for k in range(0, len(t), chunk):
+            yield np.asarray(t[k:k+chunk], dtype=float)
+        return
+    it = iter(t)
+    while True:
+        block = np.fromiter(itertools.islice(it, chunk), dtype=float) #reads the next chunk of values
+        if len(block) == 0:
+            return
+        yield block
+
+def evalStream(model, t, chunk=2**20):
+    '''
+    evalStream(model, t, chunk=2**20)
+    
+    Generator evaluating an interpolation model (a CubicSplineModel or
+    LagrangeModel) on the values t chunk by chunk, so memory use is bounded by the
+    chunk size rather than the number of values.
+    Yields the functional values for each chunk.
+    '''
+    for tk in chunks(t, chunk):
+        yield model(tk)
+
+def evalInto(model, t, out, chunk=2**20):
+    '''
+    evalInto(model, t, out, chunk=2**20)
+    
+    Evaluates an interpolation model on the values t chunk by chunk, writing the
+    results straight into the array out (for example an np.memmap on disk).
+    Outputs out.
+    '''
+    k = 0 #position in the output
+    for fk in evalStream(model, t, chunk):
+        if k + len(fk) > len(out):
+            raise TypeError('Output Length Does Not Match Input') #if the output is too short an error is raised
+        out[k:k+len(fk)] = fk #writes the chunk
+        k = k + len(fk)
+    if k != len(out):
+        raise TypeError('Output Length Does Not Match Input') #if the output is the wrong size an error is raised
+    if hasattr(out, 'flush'):
+        out.flush() #writes a memory-mapped output to disk
+    return out
 
 def CubSplineTest():
     '''
@@ -69,53 +233,87 @@ def CubSplineTest():
     This function tests the cubic spline function by putting in a third-order polynomial.
     The third order polynomial should be the same as the cubic spline outputted,
     except for effects at boundary conditions.
-    A graph is displayed and the error is checked to be below a certain threshold.
+    The error is checked to be below a certain threshold and the values are output
+    so a graph can be displayed.
     '''
     t = sp.linspace(-6,6,5001) #create a set of values t
     x = sp.linspace(-10,10,15) #these are the x values we will sample on our function
     y = 1/3 * x**3  + 3*x**2 #the y values we will sample for our function
     yt = 1/3 * t**3  + 3*t**2 #the y values of the the original function
     c = CubSpline(t,x,y) #run the cubic spline function
-    plt.figure()
-    plt.title('Cubic Spline Test')
-    plt.plot(t,c, label = 'Cubic Spline', color = 'blue') #plot the cubic spline
-    plt.plot(t,yt,'--',dashes = (10,10), color = 'red', label = 'Third Order Polynomial') #plot over the expected function
-    plt.legend(loc='upper left', frameon=False)
-    plt.xlim(-6,6)
-    plt.show()
-    for i in range(len(t)):
-        if abs(c[i]-yt[i]) > 0.1:
-            raise TypeError('Cubic Spline Failed') #reais error if difference is above threshold
-    return
+    if np.any(np.abs(c-yt) > 0.1):
+        raise TypeError('Cubic Spline Failed') #reais error if difference is above threshold
+    return (t, c, yt)
     
     
 
 x = sp.array([-0.75,-0.5,-0.35,-0.1,0.05,0.1,0.23,0.29,0.48,0.6,0.92,1.05,1.5]) #our input x
 y = sp.array([0.1,0.3,0.47,0.66,0.6,0.54,0.3,0.15,-0.32,-0.54,-0.6,-0.47,-0.08]) #our input y
-t = sp.linspace(-.75,1.5,1000) #the ts to plot against
-
-fig, axs = plt.subplots(2) #create subplots
-fig.tight_layout(pad=3.0) 
-fig.suptitle('Interpolation Plots')
-
-axs[0].set_ylim(-120,10)
-axs[0].set_xlabel('x')
-axs[0].set_ylabel('y')
-axs[0].plot(x,y,'x')
-axs[0].plot(t,LagInt(t,x,y), label = 'Lagrangian Polynomial', color = 'blue') #plot the langrangian
-axs[0].plot(x,y,'x')
-axs[0].plot(t,CubSpline(t,x,y),label = 'Cubic Spline', color = 'red') #plot the cubic spline
-axs[0].legend(loc='lower left', frameon=False)
-
-axs[1].set_ylim(-1,1)
-axs[1].set_xlabel('x')
-axs[1].set_ylabel('y')
-c = CubicSpline(x,y,bc_type='natural') #the built in cubic spline function with natural BCs
-axs[1].plot(x,y,'x')
-axs[1].plot(t,LagInt(t,x,y), label = 'Lagrangian Polynomial', color = 'blue') #plot the langrangian
-axs[1].plot(x,y,'x')
-axs[1].plot(t,CubSpline(t,x,y),label = 'Cubic Spline', color = 'red') #plot the cubic spline
-axs[1].plot(t,c(t),'--',dashes=(5, 15),label = 'Scipy Cubic Spline', color = 'black')
-axs[1].legend(loc='upper right', frameon=False)
-
-CubSplineTest() #run the test function
\ No newline at end of file
+
+def answers():
+    '''
+    answers()
+    
+    This function runs the test and finds the interpolations for the question,
+    without plotting them.
+    Outputs a dictionary of the results.
+    '''
+    res = {}
+    t = sp.linspace(-.75,1.5,1000) #the ts to plot against
+    res['t'] = t
+    res['lagrange'] = LagrangeModel(x,y)(t) #the Lagrange polynomial used for both plots
+    res['spline'] = CubicSplineModel(x,y)(t) #the cubic spline used for both plots
+    res['scipy'] = CubicSpline(x,y,bc_type='natural')(t) #the built in cubic spline function with natural BCs
+    res['test'] = CubSplineTest() #run the test function
+    return res
+
+def report(res):
+    '''
+    report(res)
+    
+    There are no printed results for this question.
+    '''
+    return
+
+def plots(res):
+    '''
+    plots(res)
+    
+    This function produces the graphs from the results (res) from answers().
+    '''
+    t = res['t']
+    fig, axs = plt.subplots(2) #create subplots
+    fig.tight_layout(pad=3.0) 
+    fig.suptitle('Interpolation Plots')
+
+    axs[0].set_ylim(-120,10)
+    axs[0].set_xlabel('x')
+    axs[0].set_ylabel('y')
+    axs[0].plot(x,y,'x')
+    axs[0].plot(t,res['lagrange'], label = 'Lagrangian Polynomial', color = 'blue') #plot the langrangian
+    axs[0].plot(x,y,'x')
+    axs[0].plot(t,res['spline'],label = 'Cubic Spline', color = 'red') #plot the cubic spline
+    axs[0].legend(loc='lower left', frameon=False)
+
+    axs[1].set_ylim(-1,1)
+    axs[1].set_xlabel('x')
+    axs[1].set_ylabel('y')
+    axs[1].plot(x,y,'x')
+    axs[1].plot(t,res['lagrange'], label = 'Lagrangian Polynomial', color = 'blue') #plot the langrangian
+    axs[1].plot(x,y,'x')
+    axs[1].plot(t,res['spline'],label = 'Cubic Spline', color = 'red') #plot the cubic spline
+    axs[1].plot(t,res['scipy'],'--',dashes=(5, 15),label = 'Scipy Cubic Spline', color = 'black')
+    axs[1].legend(loc='upper right', frameon=False)
+
+    tt, c, yt = res['test']
+    plt.figure()
+    plt.title('Cubic Spline Test')
+    plt.plot(tt,c, label = 'Cubic Spline', color = 'blue') #plot the cubic spline
+    plt.plot(tt,yt,'--',dashes = (10,10), color = 'red', label = 'Third Order Polynomial') #plot over the expected function
+    plt.legend(loc='upper left', frameon=False)
+    plt.xlim(-6,6)
+
+if __name__ == '__main__':
+    res = answers()
+    plots(res)
+    plt.show()
@@ -1,7 +1,12 @@
+from collections import OrderedDict
+import hashlib
 import scipy as sp
-import scipy.signal as spf
+import scipy.fft as spfft
+import scipy.special as sps
 import numpy as np
 import matplotlib.pyplot as plt
+import Signals
+import Instrument
 
 
 def tophat(t):
@@ -9,15 +14,9 @@ def tophat(t):
     tophat(t)
     
     This is the rect function returning the values (h) at points (t).
+    The function returns 4 for 5 <= t <= 7 and 0 elsewhere.
     '''
-    n=len(t) #find the the number of data points
-    h = sp.zeros(n) #variable to hold values of function
-    for i in range(n):
-        if t[i]<=7 and t[i]>=5:
-            h[i] = 4 #function returns 4 in non-zero region
-        else:
-            h[i] = 0 #function returns 0 elsewhere
-    return h
+    return Signals.generate('rect', t, start=5, stop=7, amp=4)
 
 def gauss(t):
     '''
@@ -25,26 +24,168 @@ def gauss(t):
     
     This is the gaussian function returning the values (g) at points (t).
     '''
-    n=len(t)  #find the the number of data points
-    g = sp.zeros(n) #variable to hold values of function
-    for i in range(n):
-        g[i] = (1/(sp.sqrt(2*sp.pi)))*sp.exp((-1*t[i]**2)/4) #outputs values of the gaussian
-    return g
+    return Signals.generate('gauss', t, amp=1/np.sqrt(2*np.pi), var=2)
+
+spectra = OrderedDict() #cached Fourier transforms of the signals, most recently used last
+spectraSize = 16 #the number of transforms kept in the cache
+
+def fastLen(n, pow2=False):
+    '''
+    fastLen(n, pow2=False)
+    
+    Finds the smallest length of at least n that the real FFT is fast for (a product
+    of small primes), or the next power of two if pow2 is True.
+    '''
+    if pow2:
+        return 1 << (int(n)-1).bit_length() #the next power of two
+    return spfft.next_fast_len(int(n), real=True)
+
+def spectrum(s, nfft):
+    '''
+    spectrum(s, nfft)
+    
+    Finds the real FFT of a signal (s) zero padded to length nfft.
+    Transforms are cached by the contents of the signal and nfft, so signals that
+    are convolved more than once are only transformed once.
+    '''
+    s = np.ascontiguousarray(s, dtype=float)
+    key = (hashlib.sha1(s.tobytes()).hexdigest(), len(s), nfft) #identifies the signal and padding
+    if key in spectra:
+        spectra.move_to_end(key) #marks the transform as recently used
+        return spectra[key]
+    F = np.fft.rfft(s, nfft) #the FFT of the zero padded signal
+    Instrument.count('fft', calls=1, flops=2.5*nfft*np.log2(nfft)) #about 5N.log2(N)/2 for a real FFT
+    spectra[key] = F
+    if len(spectra) > spectraSize:
+        spectra.popitem(last=False) #removes the least recently used transform
+    return F
+
+@Instrument.timed('fftConv')
+def fftConv(s1, s2, dt=1, pow2=False):
+    '''
+    fftConv(s1, s2, dt=1, pow2=False)
+    
+    Finds the linear convolution of two signals (s1 and s2) sampled with time step dt
+    using real FFTs.
+    Both signals are zero padded to at least len(s1)+len(s2)-1 so the convolution
+    does not wrap around, and the sum is multiplied by dt so it approximates the
+    convolution integral.
+    Outputs the len(s1)+len(s2)-1 values of the convolution (c), the first of which
+    is at the sum of the start times of the two signals.
+    '''
+    n = len(s1)+len(s2)-1 #the length of the linear convolution
+    nfft = fastLen(n, pow2) #the padded length for the FFTs
+    fc = spectrum(s1, nfft)*spectrum(s2, nfft) #applies convolution theorem
+    c = np.fft.irfft(fc, nfft)[:n] #takes the inverse FFT and removes the padding
+    Instrument.count('fft', calls=1, flops=2.5*nfft*np.log2(nfft))
+    return c*dt
+
+class StreamConv:
+    '''
+    StreamConv(kernel, block=None, method='add', dt=1)
+    
+    Class convolving an unbounded stream of samples with a fixed kernel (for example
+    the gaussian) block by block, with bounded memory.
+    The spectrum of the kernel is found once. The input is split into blocks of
+    block samples, each of which is convolved with real FFTs and joined to the
+    previous block by overlap-add (method='add') or overlap-save (method='save').
+    Samples are passed in with push, which outputs every finished output sample,
+    and flush outputs the rest at the end of the stream.
+    Together the outputs are the linear convolution, as from fftConv.
+    '''
+    def __init__(self, kernel, block=None, method='add', dt=1):
+        if method not in ('add', 'save'):
+            raise TypeError('Invalid Method') #if an invalid method name is given an error is raised
+        self.m = len(kernel) #the length of the kernel
+        self.block = block if block is not None else max(4*self.m, 1024) #the number of input samples per block
+        self.nfft = fastLen(self.block+self.m-1) #the padded length for the FFTs
+        self.K = spectrum(kernel, self.nfft)*dt #the spectrum of the kernel
+        self.method = method
+        self.pending = np.zeros(0) #input samples waiting for a full block
+        self.overlap = np.zeros(self.m-1) #tail of the last block (add) or last input samples (save)
+        self.fed = 0 #the number of samples pushed since the stream started
+        
+    def process(self, x):
+        '''
+        process(x)
+        
+        Convolves one block of input (x) and outputs the len(x) finished samples.
+        '''
+        B = len(x)
+        if self.method == 'add':
+            y = np.fft.irfft(np.fft.rfft(x, self.nfft)*self.K, self.nfft)[:B+self.m-1] #linear convolution of the block
+            y[:self.m-1] += self.overlap #adds the tail of the previous block
+            self.overlap = y[B:].copy() #keeps this block's tail for the next one
+            return y[:B]
+        seg = np.concatenate((self.overlap, x)) #the previous m-1 samples followed by the block
+        y = np.fft.irfft(np.fft.rfft(seg, self.nfft)*self.K, self.nfft) #circular convolution of the segment
+        self.overlap = seg[len(seg)-(self.m-1):] #keeps the last m-1 samples for the next block
+        return y[self.m-1:self.m-1+B] #the first m-1 values wrap around so are discarded
+        
+    def push(self, x):
+        '''
+        push(x)
+        
+        Adds the samples x to the stream.
+        Outputs the output samples finished so far (one per complete block of input).
+        '''
+        x = np.asarray(x, dtype=float).ravel()
+        self.fed = self.fed + len(x)
+        self.pending = np.concatenate((self.pending, x))
+        out = []
+        while len(self.pending) >= self.block: #convolves every complete block
+            out.append(self.process(self.pending[:self.block]))
+            self.pending = self.pending[self.block:]
+        return np.concatenate(out) if out else np.zeros(0)
+    
+    def flush(self):
+        '''
+        flush()
+        
+        Ends the stream, convolving any samples left over.
+        Outputs the remaining output samples, which are empty if no samples were
+        pushed (the convolution of an empty signal is empty).
+        '''
+        if self.fed == 0:
+            return np.zeros(0)
+        out = self.process(self.pending) if len(self.pending) else np.zeros(0) #the last, incomplete block
+        self.pending = np.zeros(0)
+        if self.method == 'add':
+            tail = self.overlap #the tail of the last block is already convolved
+        else:
+            zeros = [np.zeros(min(self.block, self.m-1-k)) for k in range(0, self.m-1, self.block)] #blocks of zeros to finish the convolution
+            tail = np.concatenate([self.process(z) for z in zeros] + [np.zeros(0)]) #pushes the zeros through
+        self.overlap = np.zeros(self.m-1)
+        self.fed = 0 #the object can start a new stream
+        return np.concatenate((out, tail))
+    
+    def stream(self, chunks):
+        '''
+        stream(chunks)
+        
+        Generator convolving an iterable of chunks of samples, yielding the output
+        as it is finished and the rest at the end.
+        '''
+        for x in chunks:
+            y = self.push(x)
+            if len(y):
+                yield y
+        yield self.flush()
 
+@Instrument.timed('conv')
 def conv(t):
     '''
     conv(t)
     
     This is the function to convolve the gaussian and rect functions ussing FFTs.
     It outputs data for the fourier transfroms as well as the convolution.
+    The convolution is output at the same times (t) as the input functions.
     '''
     n = len(t) #find the the number of data points
     timestep = (t[1]-t[0]) #find the timestep between data points
     
     s1 = gauss(t) #our signal one is the gaussian
-    np.pad(s1,(0,n-1),'constant') #pad signal one with n-1 zeroes to the right
     s2 = tophat(t) #our signal two is the rect function
-    np.pad(s2,(0,n-1),'constant') #pad signal two with n-1 zeroes to the right
     Fg = np.fft.fft(s1, norm = 'ortho') #find the FFT os signal one
     Ft = np.fft.fft(s2, norm = 'ortho') #find the FFT os signal two
     
@@ -54,58 +195,92 @@ def conv(t):
     xt = np.fft.fftshift(np.fft.fftfreq(n, d = timestep)) #finds the frequancies for the fourier transform plot
     yt = np.abs(np.fft.fftshift(Ft)) #this shifts the data into the order we'd expect/want for graphing
     
-    fc = Ft*Fg #applies convolution theorem
-    c1 = np.fft.ifft(fc) #takes the inverse FFT
-    c = np.fft.fftshift(c1).real #this shifts the data into the order we'd expect/want for graphing
+    cl = fftConv(s1, s2, dt = timestep) #the linear convolution, starting at time 2*t[0]
+    m = int(round(-t[0]/timestep)) #the position of time t[0] in the linear convolution
+    c = np.zeros(n) #variable to hold the convolution at times t
+    lo, hi = max(0, -m), min(n, len(cl)-m) #the part of t covered by the linear convolution
+    c[lo:hi] = cl[lo+m:hi+m]
 
     return (xg,yg,xt,yt, c)
 
-'''
-The following code plots the results for the questions as well as the true convolution
-to compare my results against.
-'''
-
-t = sp.linspace(-20,20,41) #the selected amount of sampling
-xg,yg,xt,yt,c = conv(t) #run the convolution function
-fig, axs = plt.subplots(4) #create subplots
-fig.tight_layout(pad=3.0)
-
-
-axs[2].plot(t,c, color = 'forestgreen', label = 'Convolution (g*h)(t)') #plot the convolution I calculated
-axs[2].set_xlim(-12,12)
-axs[2].set_xlabel('t (s)')
-axs[2].set_title('Convolution with Time Step = 0.1s')
-
-t = sp.linspace(-20,20,4001) #the selected amount of sampling
-xg,yg,xt,yt,c = conv(t) #run the convolution function
-
-axs[0].plot(t,gauss(t), color = 'cornflowerblue', label = 'Gauss Function') #plot the gauss
-axs[0].plot(t,tophat(t), color = 'darkorange', label = 'Rect Function') #plot the tophat function
-axs[0].set_xlabel('t (s)')
-axs[0].legend(loc='upper left', frameon=False)
-axs[0].set_xlim(-12,12)
-axs[0].set_title('Input Functions')
-
-axs[1].plot(xg,yg, color = 'cornflowerblue', label = 'Modulus of Fourier Transfrom of g') #plot the fourier transform of the gaussian
-axs[1].plot(xt,yt, color = 'darkorange', label = 'Modulus of Fourier Transfrom of h') #plot the fourier transform of the tophat
-axs[1].set_xlim(-3.6,3.6)
-axs[1].legend(loc='upper left', frameon=False)
-axs[1].set_xlabel('ω (s$^-$$^1$)')
-axs[1].set_title('Modulus of Fourier Transforms')
-
-axs[3].plot(t,c, color = 'forestgreen', label = 'Convolution (g*h)(t)') #plot the convolution I calculated
-axs[3].set_xlim(-12,12)
-axs[3].set_xlabel('t (s)')
-axs[3].set_title('Convolution with Time Step = 0.01s')
-#I now plot the built in convolution with very high sampling rate so I can assume it is the true value
-t = sp.linspace(-20,20,40001) #very high sampling rate so we can assume this convolution is the true value
-t1 = sp.linspace(-40,40,80001) #t values to plot the built in convolution against
-y = spf.fftconvolve(gauss(t),tophat(t))/len(t) #find the built in convolution 
-axs[3].plot(t1,y, '--', dashes = (5,15), color = 'red', label = 'True Convolution') #plot the convolution built in
-axs[3].legend(loc='upper left', frameon=False)
-axs[2].plot(t1,y, '--', dashes = (5,15), color = 'red', label = 'True Convolution') #plot the convolution built in
-axs[2].legend(loc='upper left', frameon=False)
-plt.show()
+def exact(t):
+    '''
+    exact(t)
+    
+    This is the analytic convolution of the gaussian and rect functions, returning
+    the values (c) at points (t).
+    '''
+    return 2*np.sqrt(2)*(sps.erf((t-5)/2) - sps.erf((t-7)/2))
+
+def answers():
+    '''
+    answers()
+    
+    This function finds the convolutions for the question with time steps of 1s and
+    0.01s, and the true convolution to compare against, without plotting them.
+    Outputs a dictionary of the results.
+    '''
+    res = {}
+    t = sp.linspace(-20,20,41) #the selected amount of sampling
+    res['t1s'] = t
+    res['c1s'] = conv(t)[4] #run the convolution function
+    t = sp.linspace(-20,20,4001) #the selected amount of sampling
+    res['t'] = t
+    res['xg'],res['yg'],res['xt'],res['yt'],res['c'] = conv(t) #run the convolution function
+    res['g'], res['h'] = gauss(t), tophat(t) #the input functions
+    res['ttrue'] = sp.linspace(-20,20,4001) #t values to plot the analytic convolution against
+    res['true'] = exact(res['ttrue']) #find the analytic convolution
+    return res
+
+def report(res):
+    '''
+    report(res)
+    
+    There are no printed results for this question.
+    '''
+    return
+
+def plots(res):
+    '''
+    plots(res)
+    
+    This function plots the results (res) from answers() as well as the true
+    convolution to compare my results against.
+    '''
+    fig, axs = plt.subplots(4) #create subplots
+    fig.tight_layout(pad=3.0)
+
+    axs[2].plot(res['t1s'],res['c1s'], color = 'forestgreen', label = 'Convolution (g*h)(t)') #plot the convolution I calculated
+    axs[2].set_xlim(-12,12)
+    axs[2].set_xlabel('t (s)')
+    axs[2].set_title('Convolution with Time Step = 0.1s')
+
+    t = res['t']
+    axs[0].plot(t,res['g'], color = 'cornflowerblue', label = 'Gauss Function') #plot the gauss
+    axs[0].plot(t,res['h'], color = 'darkorange', label = 'Rect Function') #plot the tophat function
+    axs[0].set_xlabel('t (s)')
+    axs[0].legend(loc='upper left', frameon=False)
+    axs[0].set_xlim(-12,12)
+    axs[0].set_title('Input Functions')
 
+    axs[1].plot(res['xg'],res['yg'], color = 'cornflowerblue', label = 'Modulus of Fourier Transfrom of g') #plot the fourier transform of the gaussian
+    axs[1].plot(res['xt'],res['yt'], color = 'darkorange', label = 'Modulus of Fourier Transfrom of h') #plot the fourier transform of the tophat
+    axs[1].set_xlim(-3.6,3.6)
+    axs[1].legend(loc='upper left', frameon=False)
+    axs[1].set_xlabel('ω (s$^-$$^1$)')
+    axs[1].set_title('Modulus of Fourier Transforms')
 
+    axs[3].plot(t,res['c'], color = 'forestgreen', label = 'Convolution (g*h)(t)') #plot the convolution I calculated
+    axs[3].set_xlim(-12,12)
+    axs[3].set_xlabel('t (s)')
+    axs[3].set_title('Convolution with Time Step = 0.01s')
+    #I now plot the analytic convolution to compare against
+    axs[3].plot(res['ttrue'],res['true'], '--', dashes = (5,15), color = 'red', label = 'True Convolution') #plot the analytic convolution
+    axs[3].legend(loc='upper left', frameon=False)
+    axs[2].plot(res['ttrue'],res['true'], '--', dashes = (5,15), color = 'red', label = 'True Convolution') #plot the analytic convolution
+    axs[2].legend(loc='upper left', frameon=False)
 
+if __name__ == '__main__':
+    res = answers()
+    plots(res)
+    plt.show()
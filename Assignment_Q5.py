@@ -1,5 +1,11 @@
 import scipy as sp
+import numpy as np
 import matplotlib.pyplot as plt
+import Signals
+import ODE
+import ErrorAnalysis
+import Convergence
+import Instrument
 
 params = {
    'axes.labelsize': 12,
@@ -8,9 +14,9 @@ params = {
    'xtick.labelsize': 10,
    'ytick.labelsize': 10,
    'figure.figsize': [15, 15]
-   } 
-plt.rcParams.update(params)
+   } #the plot settings for this question
 
+@Instrument.timed('ImpDiv')
 def ImpDiv(t, Vin, Vinh, method):
     '''
     ImpDiv(t, Vin, Vinh, method)
@@ -21,51 +27,41 @@ def ImpDiv(t, Vin, Vinh, method):
     fourth-orde Runge-Kutta (RB4) which need to be chosen between when running the function.
     The inupt Vinh is the function of Vin(t+h/2) where h is time spacing to allow the 
     Runge-Kutta method to work.
+    Vin and Vinh can also be 2-D arrays with one input signal per row, in which case
+    every signal is integrated at once and the output has one row per signal.
+    t can then also have one row per signal, so each can have its own time spacing.
+    The method 'LTI' uses the exact update of the linear divider equation when Vin is
+    constant over each step (Vinh equal to Vin), and RK4 otherwise.
     '''
-    n = len(Vin) #finds the number of samples of the input function
-    Vout = sp.zeros(n) #create variable to hold the output voltage
-    h = t[1]-t[0] #finds the time spacing
-    Vout[0] = 1 #for the initial value Vout=Vin as time isn't changing in this period
-    for i in range(0,3):
-        fa = Vin[i] - Vout[i]
-        fb = Vinh[i] - (Vout[i] + h*fa/2)
-        fc = Vinh[i] - (Vout[i] + h*fb/2)
-        fd = Vin[i+1] - (Vout[i] + h*fc)
-        Vout[i+1] = (Vout[i] + (h/6) * (fa + 2*fb + 2*fc +fd)) #Use Runge-Kutta to get first few values for AB4
-    if method == 'AB4': #for the fourth-order Adams-Bashforth method
-        for i in range(3,n-1):
-            fa = (Vin[i] - Vout[i])
-            fb = (Vin[i-1]-Vout[i-1])
-            fc = (Vin[i-2]-Vout[i-2])
-            fd = (Vin[i-3]-Vout[i-3])
-            Vout[i+1] = (Vout[i] + (h/24) * (55*fa-59*fb+37*fc-9*fd)) #these equations itteratively excecute the AB4 method
-        return Vout
-    if method == 'RK4':#for the fourth-order Runge-Kutta method
-        for i in range(3,n-1):
-            fa = Vin[i] - Vout[i]
-            fb = Vinh[i] - (Vout[i] + h*fa/2)
-            fc = Vinh[i] - (Vout[i] + h*fb/2)
-            fd = Vin[i+1] - (Vout[i] + h*fc)
-            Vout[i+1] = (Vout[i] + (h/6) * (fa + 2*fb + 2*fc +fd)) #these equations itteratively excecute the RB4 method
-        return Vout
-    else:
+    if method not in ('AB4', 'RK4', 'LTI'):
         raise TypeError('Invalid Method') #if the function is run with an invalid method name an error is raised
-    return
+    t = np.asarray(t, dtype=float)
+    if method == 'LTI': #the divider is dVout/dt = -Vout + Vin
+        Vin2d, Vinh2d = np.atleast_2d(Vin), np.atleast_2d(Vinh) #one row per signal
+        t2d = np.broadcast_to(t, Vin2d.shape) #the times for each signal
+        Vout = [ODE.lti(-1, 1, t2d[k], Vin2d[k], 1, uh=Vinh2d[k])[:,0] for k in range(len(Vin2d))]
+        return np.reshape(Vout, np.shape(Vin))
+    Vin = np.asarray(Vin, dtype=float).T #the signals are stored one per column so each time step is a row
+    Vinh = np.asarray(Vinh, dtype=float).T
+    n = len(Vin) #finds the number of samples of the input function
+    evals = 4*(n-1) if method == 'RK4' else 4*min(3,n-1) + max(0,n-4) #the right-hand side evaluations per signal
+    Instrument.count('ImpDiv', evals=evals*Vin[0].size, steps=n-1)
+    t = t.T if t.ndim > 1 else t.reshape((-1,) + (1,)*(Vin.ndim-1)) #shared times are one column
+    t = np.broadcast_to(t, Vin.shape) #the times of each signal, one column per signal
+    u = ODE.Tabulated(t, Vin, Vinh) #the input voltage at the sample times and half steps
+    f = lambda ti, Vout: u(ti) - Vout #dVout/dt = Vin - Vout for every signal at once
+    Vout0 = np.ones(Vin.shape[1:]) #for the initial value Vout=Vin as time isn't changing in this period
+    solver = ODE.ab4 if method == 'AB4' else ODE.rk4 #RK4 also starts AB4
+    return solver(f, t, Vout0).T
 
 def Vin1(t):
     '''
     Vin1(t)
     
     This function creates the Vin values for question 5(c) on the assignment.
+    V is 1 in negative t and 0 in positive t.
     '''
-    n = len(t) #finds the number of samples
-    y = sp.zeros(n) #creates variable to hold signal
-    for i in range(n):
-        if t[i]<0:
-            y[i] = 1 #sets V to 1 in negative t
-        else:
-            y[i] = 0 #sets V to 0 in positivee t
-    return y
+    return Signals.generate('step', t, t0=0, before=1, after=0)
 
 def Vin2(t,T):
     '''
@@ -75,19 +71,28 @@ def Vin2(t,T):
     It is a square function.
     It can be assigned a specific period, T.
     '''
-    n = len(t) #finds the number of samples
-    y = sp.zeros(n) #creates variable to hold signal
-    for i in range(n):
-        if t[i]<0:
-            y[i] = 1 #in negative time, V is 1
-        else:
-            if int(2*(t[i]/T))%(2) == 0: #creates periodicity of square function
-                y[i]=0
-            else:
-                y[i]=1
-    return y
+    return Signals.generate('square', t, T=T, amp=1, before=1)
      
      
+def divider(Vin):
+    '''
+    divider(Vin)
+    
+    This function creates the right-hand side of the impedance divider equation,
+    f(t, Vout) = Vin(t) - Vout, for a given input voltage function (Vin) so the
+    divider can be solved with any of the solvers in the ODE module.
+    '''
+    return ODE.Linear(-1, 1, Vin) #dVout/dt = -Vout + Vin(t)
+
+def Vout1(t):
+    '''
+    Vout1(t)
+    
+    This function gives the analytic output voltage for Vin1, the signal from 5(c),
+    which is an exponential decay from t = 0.
+    '''
+    return np.exp(-np.asarray(t)) #the expected exponential decay function
+
 def ErrorV1(Vout, t):
     '''
     ErrorV1(Vout,t)
@@ -95,115 +100,137 @@ def ErrorV1(Vout, t):
     This function finds the mean error of the method when it solves Vin1, the signal from
     5(c).
     It does this by comparing values to the analytically calculated output expected.
-    It will output the mean error.
-    '''
-    errors = [] #create variable to hold the errors
-    for i in range(1,len(t)):
-        expect = sp.exp(-t) #the expected exponential decay function
-        err = abs(Vout[i] - expect[i])/expect[i] #the difference between the expected and calculated values
-        errors.append(err) #stores error values
-    MeanErr = sp.average(errors) #calculates the mean of the errors
+    It will output the mean error and the errors at each time after t[0].
+    The full set of statistics is given by ErrorAnalysis.stats.
+    '''
+    expect = Vout1(np.asarray(t)[1:]) #the expected exponential decay function (found once)
+    errors = ErrorAnalysis.relErr(Vout[1:], expect) #the relative differences between the expected and calculated values
+    MeanErr = np.mean(errors) #calculates the mean of the errors
     return (MeanErr, errors)
   
        
-t = sp.linspace(0,40,401) #the selected amount of sampling
-h = t[1]-t[0] #find the timespacing
-
-Vinf = Vin1(t) #the first input voltage
-Vinfh = Vin1(t+h/2) #the first input voltage at points Vin(t+h/2) for the Runge-Kutta method
-Vout1R = ImpDiv(t,Vinf,Vinfh, method='RK4') #find Vout with RK4
-MeanErr, errors = ErrorV1(Vout1R,t)
-print('Mean Relative Error from RB4 h = 0.1s:', MeanErr) #prints the mean error
-
-#This code is identical and repeats the above for h = 0.05s
-t = sp.linspace(0,40,801)
-h = t[1]-t[0]
-
-Vinf = Vin1(t)
-Vinfh = Vin1(t+h/2)
-Vout1R = ImpDiv(t,Vinf,Vinfh, method='RK4')
-
-MeanErr, errors = ErrorV1(Vout1R,t)
-print('Mean Relative Error from RB4 h = 0.05s:',MeanErr)
-
-#This code is identical and repeats the above for h = 0.025s
-fig, axs = plt.subplots(2,2)
-fig.tight_layout(pad=9.0)
-   
-t = sp.linspace(0,40,1601)
-tplot = sp.linspace(-10,0,801)
-h = t[1]-t[0]
-
-Vinf = Vin1(t)
-Vinfh = Vin1(t+h/2)
-Vout1A = ImpDiv(t,Vinf,Vinfh, method='AB4')
-Vout1R = ImpDiv(t,Vinf,Vinfh, method='RK4')
-te1 = sp.linspace(-4,0,1000)
-te2 = sp.linspace(0,10,1000)
-exp1 = te1**0
-exp2 = sp.exp(-te2)
-
-Vins = Vin2(t, 2)
-Vinsh = Vin2(t+h/2, 2)
-Vout2 = ImpDiv(t,Vins,Vinsh,method='RK4')
-
-MeanErr, errors = ErrorV1(Vout1R,t)
-print('Mean Relative Error from RB4 h = 0.025s:',MeanErr)
-
-axs[0,0].plot(t,Vinf, color = 'cornflowerblue', label = 'Vin')
-axs[0,0].plot(tplot,Vin1(tplot), color = 'cornflowerblue')
-axs[0,0].plot(t,Vout1A , label = 'Vout by AB4',color = 'darkorange')
-axs[0,0].plot(te1,exp1,'--',dashes=(5, 15), label = 'Expected',color='red')
-axs[0,0].plot(te2,exp2,'--',dashes=(5, 15), color='red')
-axs[0,0].legend(loc='upper right', frameon=False)
-axs[0,0].set_xlim(-1,6)
-axs[0,0].set_ylim(0,1.1)
-axs[0,0].set_xlabel('t̂ (s)')
-axs[0,0].set_ylabel('Voltage (V0)')
-axs[0,0].set_title('Voltage Input 1 using Fourth-Order Adams-Bashforth Method')
-
-axs[0,1].plot(t,Vinf, color = 'cornflowerblue', label = 'Vin')
-axs[0,1].plot(tplot,Vin1(tplot), color = 'cornflowerblue')
-axs[0,1].plot(t,Vout1R, label = 'Vout by RK4', color = 'green')
-axs[0,1].plot(te1,exp1,'--',dashes=(5, 15), label = 'Expected',color='red')
-axs[0,1].plot(te2,exp2,'--',dashes=(5, 15), color='red')
-axs[0,1].legend(loc='upper right', frameon=False)
-axs[0,1].set_xlim(-1,6)
-axs[0,1].set_ylim(0,1.1)
-axs[0,1].set_xlabel('t̂ (s)')
-axs[0,1].set_ylabel('Voltage (V0)')
-axs[0,1].set_title('Voltage Input 1 using Fourth-Order Runge-Kutta Method')
-
-axs[1,0].plot(t,Vins, label = 'Vin', color = 'cornflowerblue')
-axs[1,0].plot(tplot,Vin2(tplot,2), color = 'cornflowerblue')
-axs[1,0].plot(t,Vout2 , label = 'Vout by RB4',color = 'green')
-axs[1,0].legend(loc='upper right', frameon=False)
-axs[1,0].set_xlim(-1,10)
-axs[1,0].set_ylim(0,1.5)
-axs[1,0].set_xlabel('t̂ (s)')
-axs[1,0].set_ylabel('Voltage (V0)')
-axs[1,0].set_title('Voltage Input 2 with T = 2RC using Fourth-Order Runge-Kutta Method')
-
-Vins = Vin2(t, 0.5)
-Vinsh = Vin2(t+h/2, 0.5)
-Vout2 = ImpDiv(t,Vins,Vinsh,method='RK4')
-
-axs[1,1].plot(t,Vins, label = 'Vin', color = 'cornflowerblue')
-axs[1,1].plot(tplot,Vin2(tplot,0.5), color = 'cornflowerblue')
-axs[1,1].plot(t,Vout2 , label = 'Vout by RB4',color = 'green')
-axs[1,1].legend(loc='upper right', frameon=False)
-axs[1,1].set_xlim(-1,10)
-axs[1,1].set_ylim(0,1.5)
-axs[1,1].set_xlabel('t̂ (s)')
-axs[1,1].set_ylabel('Voltage (V0)')
-axs[1,1].set_title('Voltage Input 2 with T = RC/2 using Fourth-Order Runge-Kutta Method')
-
-plt.figure()
-plt.plot(t[1:],errors)
-plt.xlim(0,40)
-plt.grid()
-plt.ylim(0,1.4e-7)
-plt.xlabel('t̂ (s)')
-plt.ylabel('Relative Error')
-plt.title('Relative Error with Time')
-
+def answers():
+    '''
+    answers()
+    
+    This function finds the results for the question, without printing or plotting
+    them.
+    Outputs a dictionary of the results.
+    '''
+    res = {}
+    #the convergence of RK4 for Vin1 is found for h = 0.1s, 0.05s and 0.025s in parallel
+    problem = Convergence.Problem(divider(Signals.step), 1, (0,40), exact=Vout1) #the divider with the first input voltage
+    res['conv'] = Convergence.study('RK4', problem, [0.1,0.05,0.025], tol=1e-6)
+
+    #The plots use h = 0.025s
+    t = sp.linspace(0,40,1601)
+    h = t[1]-t[0]
+    res['t'] = t
+    Vinf = Vin1(t)
+    Vinfh = Vin1(t+h/2)
+    res['Vout1A'] = ImpDiv(t,Vinf,Vinfh, method='AB4')
+    res['Vout1R'] = ImpDiv(t,Vinf,Vinfh, method='RK4')
+    res['Vout2T2'] = ImpDiv(t,Vin2(t, 2),Vin2(t+h/2, 2),method='RK4')
+    res['Vout2T05'] = ImpDiv(t,Vin2(t, 0.5),Vin2(t+h/2, 0.5),method='RK4')
+    MeanErr, res['errors'] = ErrorV1(res['Vout1R'],t) #the errors with time for the plot
+
+    #the same problem solved with the adaptive Dormand-Prince method, which chooses its own steps
+    sol = ODE.dopri(divider(Signals.step), (0,40), 1, rtol=1e-9, atol=1e-22)
+    res['MeanErrD'] = ErrorV1(sol(t)[:,0],t)[0]
+    res['nfevD'] = sol.nfev
+    res['nfevR'] = 4*(len(t)-1)
+
+    #the exact update for the linear divider, which holds for the piecewise constant input
+    res['MeanErrL'] = ErrorV1(ImpDiv(t,Vinf,Vinfh, method='LTI'),t)[0]
+    return res
+
+def report(res):
+    '''
+    report(res)
+    
+    This function prints the results (res) from answers().
+    '''
+    conv = res['conv']
+    for hk, MeanErr in zip(conv['steps'], conv['errors']):
+        print('Mean Relative Error from RB4 h = %gs:' % hk, MeanErr) #prints the mean error
+    print('Observed order of accuracy:', conv['order'])
+    print('Largest step with mean relative error below 1e-6:', conv['best'], '(predicted:', conv['predicted'], ')')
+    print('Mean Relative Error from adaptive DOPRI5:',res['MeanErrD'],'using',res['nfevD'],'evaluations (RK4 h = 0.025s uses',res['nfevR'],')')
+    print('Mean Relative Error from exact LTI update h = 0.025s:',res['MeanErrL'])
+
+def plots(res):
+    '''
+    plots(res)
+    
+    This function produces the graphs from the results (res) from answers().
+    '''
+    with plt.rc_context(params): #uses the plot settings for this question
+        t = res['t']
+        tplot = sp.linspace(-10,0,801)
+        te1 = sp.linspace(-4,0,1000)
+        te2 = sp.linspace(0,10,1000)
+        exp1 = te1**0
+        exp2 = sp.exp(-te2)
+        Vinf = Vin1(t)
+
+        fig, axs = plt.subplots(2,2)
+        fig.tight_layout(pad=9.0)
+
+        axs[0,0].plot(t,Vinf, color = 'cornflowerblue', label = 'Vin')
+        axs[0,0].plot(tplot,Vin1(tplot), color = 'cornflowerblue')
+        axs[0,0].plot(t,res['Vout1A'] , label = 'Vout by AB4',color = 'darkorange')
+        axs[0,0].plot(te1,exp1,'--',dashes=(5, 15), label = 'Expected',color='red')
+        axs[0,0].plot(te2,exp2,'--',dashes=(5, 15), color='red')
+        axs[0,0].legend(loc='upper right', frameon=False)
+        axs[0,0].set_xlim(-1,6)
+        axs[0,0].set_ylim(0,1.1)
+        axs[0,0].set_xlabel('t̂ (s)')
+        axs[0,0].set_ylabel('Voltage (V0)')
+        axs[0,0].set_title('Voltage Input 1 using Fourth-Order Adams-Bashforth Method')
+
+        axs[0,1].plot(t,Vinf, color = 'cornflowerblue', label = 'Vin')
+        axs[0,1].plot(tplot,Vin1(tplot), color = 'cornflowerblue')
+        axs[0,1].plot(t,res['Vout1R'], label = 'Vout by RK4', color = 'green')
+        axs[0,1].plot(te1,exp1,'--',dashes=(5, 15), label = 'Expected',color='red')
+        axs[0,1].plot(te2,exp2,'--',dashes=(5, 15), color='red')
+        axs[0,1].legend(loc='upper right', frameon=False)
+        axs[0,1].set_xlim(-1,6)
+        axs[0,1].set_ylim(0,1.1)
+        axs[0,1].set_xlabel('t̂ (s)')
+        axs[0,1].set_ylabel('Voltage (V0)')
+        axs[0,1].set_title('Voltage Input 1 using Fourth-Order Runge-Kutta Method')
+
+        axs[1,0].plot(t,Vin2(t, 2), label = 'Vin', color = 'cornflowerblue')
+        axs[1,0].plot(tplot,Vin2(tplot,2), color = 'cornflowerblue')
+        axs[1,0].plot(t,res['Vout2T2'] , label = 'Vout by RB4',color = 'green')
+        axs[1,0].legend(loc='upper right', frameon=False)
+        axs[1,0].set_xlim(-1,10)
+        axs[1,0].set_ylim(0,1.5)
+        axs[1,0].set_xlabel('t̂ (s)')
+        axs[1,0].set_ylabel('Voltage (V0)')
+        axs[1,0].set_title('Voltage Input 2 with T = 2RC using Fourth-Order Runge-Kutta Method')
+
+        axs[1,1].plot(t,Vin2(t, 0.5), label = 'Vin', color = 'cornflowerblue')
+        axs[1,1].plot(tplot,Vin2(tplot,0.5), color = 'cornflowerblue')
+        axs[1,1].plot(t,res['Vout2T05'] , label = 'Vout by RB4',color = 'green')
+        axs[1,1].legend(loc='upper right', frameon=False)
+        axs[1,1].set_xlim(-1,10)
+        axs[1,1].set_ylim(0,1.5)
+        axs[1,1].set_xlabel('t̂ (s)')
+        axs[1,1].set_ylabel('Voltage (V0)')
+        axs[1,1].set_title('Voltage Input 2 with T = RC/2 using Fourth-Order Runge-Kutta Method')
+
+        plt.figure()
+        plt.plot(t[1:],res['errors'])
+        plt.xlim(0,40)
+        plt.grid()
+        plt.ylim(0,1.4e-7)
+        plt.xlabel('t̂ (s)')
+        plt.ylabel('Relative Error')
+        plt.title('Relative Error with Time')
+
+if __name__ == '__main__':
+    res = answers()
+    report(res)
+    plots(res)
+    plt.show()
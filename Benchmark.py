@@ -0,0 +1,313 @@
+'''
+This module benchmarks the numerical kernels of the questions.
+Each kernel is run over a log-scale sweep of problem sizes, recording the wall time,
+the peak memory and the number of memory blocks left allocated, and the empirical
+complexity exponent is fitted from the times.
+The same sweep is run for a NumPy/SciPy reference implementation for comparison.
+Each run is appended to a JSON history file so regressions between versions can be
+found, e.g. 'python Benchmark.py LU solve --quick'.
+'''
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+import numpy as np
+import scipy
+import scipy.linalg as spl
+import scipy.interpolate as spi
+import scipy.signal as sps
+import scipy.sparse as spsp
+import scipy.sparse.linalg as spsl
+import Assignment_Q1 as Q1
+import Assignment_Q2 as Q2
+import Assignment_Q3 as Q3
+import Assignment_Q4 as Q4
+import Assignment_Q5 as Q5
+import Signals
+import Krylov
+
+history = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks.json') #the default history file
+
+def sizes(lo, hi, num):
+    '''
+    sizes(lo, hi, num)
+
+    Outputs num problem sizes evenly spaced on a log scale from lo to hi.
+    '''
+    return sorted(set(int(round(n)) for n in np.geomspace(lo, hi, num)))
+
+class Case:
+    '''
+    Case(name, setup, func, full, quick, reference=None, cold=None)
+
+    Class describing a benchmark: setup(n) outputs the arguments for problem size n,
+    func is the kernel and reference the NumPy/SciPy implementation, both called with
+    those arguments.
+    full and quick are the sizes of the full and quick sweeps.
+    cold is called before every timed call (untimed) to empty any caches, so the
+    times are for computing the result from scratch.
+    '''
+    def __init__(self, name, setup, func, full, quick, reference=None, cold=None):
+        self.name = name
+        self.setup = setup
+        self.func = func
+        self.full = full
+        self.quick = quick
+        self.reference = reference
+        self.cold = cold
+
+def measure(func, args, cold=None, budget=0.2, repeat=3):
+    '''
+    measure(func, args, cold=None, budget=0.2, repeat=3)
+
+    Times func(*args), calling it at least repeat times and until budget seconds
+    have passed (at most 100 times), and finds its memory use in one more call
+    traced with tracemalloc.
+    Outputs the best wall time (s), the peak memory allocated during the call
+    (bytes) and the number of memory blocks still allocated after it.
+    '''
+    best, spent, calls = np.inf, 0.0, 0
+    while calls < repeat or (spent < budget and calls < 100):
+        if cold is not None:
+            cold()
+        start = time.perf_counter()
+        func(*args)
+        took = time.perf_counter() - start
+        best, spent, calls = min(best, took), spent + took, calls + 1
+    if cold is not None:
+        cold()
+    tracemalloc.start() #traced separately as tracing slows the kernels down
+    before = tracemalloc.take_snapshot()
+    base = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    res = func(*args)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    del res
+    return (best, peak, blocks)
+
+def exponent(n, times, floor=1e-4):
+    '''
+    exponent(n, times, floor=1e-4)
+
+    Fits times = C*n^p over the sizes whose times are above floor seconds (below it
+    the times are mostly overhead).
+    Outputs the exponent p, or None if there are fewer than two such sizes.
+    '''
+    n, times = np.asarray(n, dtype=float), np.asarray(times, dtype=float)
+    ok = times > floor
+    if ok.sum() < 2:
+        return None
+    return float(np.polyfit(np.log(n[ok]), np.log(times[ok]), 1)[0])
+
+def sweep(func, case, n, budget):
+    '''
+    sweep(func, case, n, budget)
+
+    Measures func over the sizes n of the case.
+    Outputs a dictionary of the sizes, times, peaks, blocks and the fitted exponent.
+    '''
+    res = {'sizes': list(n), 'time': [], 'peak': [], 'blocks': []}
+    for size in n:
+        best, peak, blocks = measure(func, case.setup(size), case.cold, budget)
+        res['time'].append(best)
+        res['peak'].append(peak)
+        res['blocks'].append(blocks)
+    res['exponent'] = exponent(res['sizes'], res['time'])
+    return res
+
+def matrix(n):
+    rng = np.random.default_rng(0)
+    return rng.random((n,n))/n + np.eye(n) #diagonally dominant, so well conditioned (and det does not overflow)
+
+def stack(n):
+    rng = np.random.default_rng(0) #n small systems the size of A in Q2
+    return (rng.standard_normal((n, 5, 5)) + 5*np.eye(5), rng.standard_normal((n, 5)))
+
+def scattered(n):
+    rng = np.random.default_rng(0) #a diagonally dominant pentadiagonal matrix with its rows and columns shuffled
+    i = np.arange(n)
+    rows = np.concatenate([i[max(0,-k):n-max(0,k)] for k in range(-2, 3)])
+    cols = np.concatenate([i[max(0,-k):n-max(0,k)]+k for k in range(-2, 3)])
+    vals = np.where(rows == cols, 6.0, -1.0) + 0.1*rng.random(len(rows))
+    p = rng.permutation(n)
+    return (Q2.CSR.fromCOO(p[rows], p[cols], vals, (n, n)), np.ones(n))
+
+def poisson(n):
+    m = int(round(np.sqrt(n))) #the 2-D Poisson matrix on an m x m grid
+    i = np.arange(m*m)
+    rows, cols = [i], [i]
+    for step, ok in ((1, i % m < m-1), (m, i < m*(m-1))): #the neighbours to the right and above
+        rows += [i[ok], i[ok]+step]
+        cols += [i[ok]+step, i[ok]]
+    vals = np.concatenate([np.full(m*m, 4.0)] + [np.full(len(r), -1.0) for r in rows[1:]])
+    return (Q2.CSR.fromCOO(np.concatenate(rows), np.concatenate(cols), vals, (m*m, m*m)), np.ones(m*m))
+
+def chebyshev(n):
+    x = np.cos(np.pi*(2*np.arange(n)+1)/(2*n)) #nodes that keep high order interpolation stable
+    return (np.linspace(-1, 1, 10000), x, np.sin(3*x))
+
+def knots(n):
+    x = np.linspace(0, 10, n)
+    return (np.linspace(0, 10, n), x, np.sin(x))
+
+def grid(n):
+    return (np.linspace(-20, 20, n),)
+
+def divider(n):
+    t = np.linspace(0, 40, n)
+    h = t[1]-t[0]
+    return (t, Q5.Vin1(t), Q5.Vin1(t+h/2))
+
+def emptyCaches():
+    Signals.cache.clear()
+    Q4.spectra.clear()
+
+cases = [Case('near', lambda n: (np.random.default_rng(0).random(n),), Q1.nearArray,
+              sizes(1e3, 1e7, 9), sizes(1e3, 1e6, 4),
+              reference=lambda r: (np.nextafter(r, np.inf), np.nextafter(r, 0), np.spacing(r)/r)),
+         Case('LU', lambda n: (matrix(n),), lambda A: Q2.LU(A, pivot=True),
+              sizes(32, 1024, 6), sizes(32, 256, 4), reference=spl.lu_factor),
+         Case('solve', lambda n: (matrix(n), np.ones(n)), Q2.solve,
+              sizes(32, 1024, 6), sizes(32, 256, 4), reference=np.linalg.solve),
+         Case('mixed', lambda n: (matrix(n), np.ones(n)), lambda A, b: Q2.solveMixed(A, b)[0],
+              sizes(32, 1024, 6), sizes(32, 256, 4), reference=np.linalg.solve),
+         Case('inv', lambda n: (matrix(n),), Q2.inv,
+              sizes(32, 1024, 6), sizes(32, 256, 4), reference=np.linalg.inv),
+         Case('dt', lambda n: (matrix(n),), Q2.dt,
+              sizes(32, 1024, 6), sizes(32, 256, 4), reference=np.linalg.det),
+         Case('batch', stack, lambda A, b: Q2.solveBatch(A, b)[0], sizes(1e2, 1e6, 9), sizes(1e2, 1e5, 4),
+              reference=lambda A, b: np.linalg.solve(A, b[...,None])[...,0]),
+         Case('sparse', scattered, Q2.solve, sizes(1e2, 1e5, 7), sizes(1e2, 1e4, 3),
+              reference=lambda A, b: spsl.spsolve(spsp.csr_matrix((A.data, A.indices, A.indptr), shape=A.shape).tocsc(), b)),
+         Case('cg', poisson, lambda A, b: Krylov.cg(A, b, tol=1e-8)[0], sizes(1e2, 1e5, 7), sizes(1e2, 1e4, 3),
+              reference=lambda A, b: spsl.cg(spsp.csr_matrix((A.data, A.indices, A.indptr), shape=A.shape), b, rtol=1e-8)[0]),
+         Case('LagInt', chebyshev, Q3.LagInt, sizes(8, 1024, 8), sizes(8, 128, 4),
+              reference=lambda t, x, y: spi.BarycentricInterpolator(x, y)(t)),
+         Case('CubSpline', knots, Q3.CubSpline, sizes(1e2, 1e6, 9), sizes(1e2, 1e5, 4),
+              reference=lambda t, x, y: spi.CubicSpline(x, y, bc_type='natural')(t)),
+         Case('conv', grid, Q4.conv, sizes(1e3, 1e7, 9), sizes(1e3, 1e6, 4),
+              reference=lambda t: sps.fftconvolve(Signals.gauss(t, 1/np.sqrt(2*np.pi), var=2), Signals.rect(t, 5, 7, 4),
+                                                  mode='same')*(t[1]-t[0]),
+              cold=emptyCaches),
+         Case('ImpDiv', divider, lambda t, Vin, Vinh: Q5.ImpDiv(t, Vin, Vinh, 'RK4'),
+              sizes(1e2, 1e5, 7), sizes(1e2, 1e4, 3),
+              reference=lambda t, Vin, Vinh: sps.lsim((-1, 1, 1, 0), Vin, t, X0=[1])[1])] #the kernels and their reference implementations
+
+def commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(names=None, quick=False, reference=True, budget=0.2):
+    '''
+    run(names=None, quick=False, reference=True, budget=0.2)
+
+    Runs the benchmarks called names (default all) over their full or quick sweeps,
+    with the checks of Q2 turned off so only the kernels are timed.
+    Outputs a record of the run: the date, version and the results of each case,
+    with the reference results under 'reference' unless reference is False.
+    '''
+    chosen = [case for case in cases if names is None or case.name in names]
+    check = dict(Q2.Check)
+    Q2.setCheck('off')
+    results = {}
+    try:
+        for case in chosen:
+            n = case.quick if quick else case.full
+            results[case.name] = sweep(case.func, case, n, budget)
+            if reference and case.reference is not None:
+                results[case.name]['reference'] = sweep(case.reference, case, n, budget)
+    finally:
+        Q2.Check.update(check) #the previous checks are restored
+    return {'date': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': commit(),
+            'python': platform.python_version(), 'numpy': np.__version__, 'scipy': scipy.__version__,
+            'quick': quick, 'cases': results}
+
+def load(path=history):
+    '''
+    load(path=history)
+
+    Outputs the list of runs in the history file (empty if there is none).
+    '''
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def save(record, path=history):
+    '''
+    save(record, path=history)
+
+    Appends the record of a run to the history file.
+    '''
+    runs = load(path)
+    runs.append(record)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(runs, f, indent=1)
+    os.replace(path + '.tmp', path)
+
+def regressions(runs, threshold=1.25):
+    '''
+    regressions(runs, threshold=1.25)
+
+    Compares the last run with the most recent earlier run of the same kind (full or
+    quick), over the sizes they share.
+    Outputs a dictionary of the cases whose median time ratio (new/old) is above
+    threshold, and the ratio.
+    '''
+    if not runs:
+        return {}
+    new = runs[-1]
+    old = next((run for run in reversed(runs[:-1]) if run['quick'] == new['quick']), None)
+    if old is None:
+        return {}
+    slower = {}
+    for name, res in new['cases'].items():
+        if name not in old['cases']:
+            continue
+        before = dict(zip(old['cases'][name]['sizes'], old['cases'][name]['time']))
+        ratios = [t/before[n] for n, t in zip(res['sizes'], res['time']) if n in before]
+        if ratios and np.median(ratios) > threshold:
+            slower[name] = float(np.median(ratios))
+    return slower
+
+def report(record):
+    '''
+    report(record)
+
+    Prints the results of a run as a table.
+    '''
+    print('Benchmarks at', record['commit'], 'on', record['date'])
+    for name, res in record['cases'].items():
+        ref = res.get('reference')
+        p = res['exponent']
+        q = ref['exponent'] if ref else None
+        print('\n%s: time ~ n^%s%s' % (name, 'n/a' if p is None else '%.2f' % p,
+              '' if ref is None else ' (reference n^%s)' % ('n/a' if q is None else '%.2f' % q)))
+        print('  %10s %12s %12s %8s %12s %8s' % ('n', 'time (s)', 'ref (s)', 'ratio', 'peak (MB)', 'blocks'))
+        for k, n in enumerate(res['sizes']):
+            t = res['time'][k]
+            r = ref['time'][k] if ref else np.nan
+            print('  %10d %12.3e %12.3e %8.2f %12.3f %8d' % (n, t, r, t/r, res['peak'][k]/2**20, res['blocks'][k]))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks the numerical kernels.')
+    parser.add_argument('cases', nargs='*', help='the kernels to run (default all): ' + ' '.join(case.name for case in cases))
+    parser.add_argument('--quick', action='store_true', help='use the smaller sweeps')
+    parser.add_argument('--no-reference', action='store_true', help='skip the NumPy/SciPy references')
+    parser.add_argument('--history', default=history, help='the JSON history file')
+    args = parser.parse_args()
+    record = run(args.cases or None, args.quick, not args.no_reference)
+    report(record)
+    save(record, args.history)
+    for name, ratio in regressions(load(args.history)).items():
+        print('Regression: %s is %.2f times slower than the previous run' % (name, ratio))
@@ -0,0 +1,241 @@
+'''
+This module is an on-disk cache for the results of expensive functions, so they
+are not recomputed on every run.
+Results are stored under a key made from a hash of the function's name, its code
+(and the code of the project functions and modules it uses) and its inputs, so a
+change to any of these gives a new key.
+Each result is stored in its own folder: the NumPy arrays in it (on their own or
+inside dicts, lists and tuples, such as the results of answers()) are stored as
+.npy files and loaded memory-mapped, and everything else is pickled. The least
+recently used results are removed when the cache gets bigger than maxBytes.
+'''
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import shutil
+import sys
+import types
+import numpy as np
+
+directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache') #where results are stored
+maxBytes = 2**30 #the largest size of the cache in bytes
+here = os.path.dirname(os.path.abspath(__file__)) #the project directory; only code here is hashed
+
+def inProject(obj):
+    '''
+    inProject(obj)
+
+    Checks whether a function, class or module is defined in a file in the project.
+    '''
+    try:
+        path = inspect.getsourcefile(obj)
+    except TypeError:
+        return False
+    return path is not None and os.path.dirname(os.path.abspath(path)) == here
+
+def codeHash(func):
+    '''
+    codeHash(func)
+
+    Finds a hash of the code of a function, together with the code of every project
+    function and class it refers to (followed recursively), the source of every
+    project module it refers to, the source of every project module imported by
+    these modules or by the modules the functions are defined in (so a change to
+    ODE.py changes the hash of Convergence.study, which reaches ODE.rk4 through a
+    dict) and the values of the module level arrays, numbers, strings, tuples and
+    lists it refers to (such as the matrix in Q2).
+    Outputs the hash as a hex string.
+    '''
+    h = hashlib.sha1()
+    seen = set()
+    def names(code): #every global name used by a code object and the code nested in it
+        found = set(code.co_names)
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                found |= names(const)
+        return found
+    def imports(module): #the project modules a module imports, with import or from ... import
+        for name, value in sorted(vars(module).items(), key=lambda item: item[0]):
+            if inspect.ismodule(value):
+                yield value
+            elif (inspect.isfunction(value) or inspect.isclass(value)) and value.__module__ != module.__name__:
+                yield sys.modules.get(value.__module__)
+    def visit(obj):
+        if id(obj) in seen:
+            return
+        seen.add(id(obj))
+        if isinstance(obj, (np.ndarray, np.generic, int, float, complex, str, bytes, tuple, list)):
+            h.update(pickle.dumps(obj, protocol=4)) #module level data used by the code
+            return
+        if not (inspect.ismodule(obj) or inspect.isfunction(obj) or inspect.isclass(obj)) or not inProject(obj):
+            return #other objects (caches, counters, libraries) do not change the results
+        if inspect.ismodule(obj):
+            with open(inspect.getsourcefile(obj), 'rb') as f:
+                h.update(f.read()) #a module is hashed by its whole source
+            for module in imports(obj):
+                visit(module)
+            return
+        h.update(inspect.getsource(obj).encode())
+        for module in imports(sys.modules[obj.__module__]): #the code it uses may be reached without naming its module
+            visit(module)
+        if inspect.isclass(obj):
+            members = [m for m in vars(obj).values() if inspect.isfunction(m)]
+        else:
+            members = [inspect.unwrap(obj)] #decorated functions are followed through to their own code
+        for m in members:
+            for name in sorted(names(m.__code__)):
+                if name in m.__globals__:
+                    visit(m.__globals__[name])
+    visit(func)
+    return h.hexdigest()
+
+def key(func, args, kwargs):
+    '''
+    key(func, args, kwargs)
+
+    Finds the cache key of a call of func with the given arguments.
+    Arrays are hashed by their type, shape and contents, anything else by its pickle.
+    '''
+    h = hashlib.sha1()
+    h.update((func.__module__ + '.' + func.__qualname__).encode()) #the function identity
+    h.update(codeHash(func).encode()) #the code version
+    for arg in list(args) + sorted(kwargs.items()):
+        if isinstance(arg, np.ndarray):
+            arr = np.ascontiguousarray(arg)
+            h.update(str((arr.dtype.str, arr.shape)).encode())
+            h.update(arr.tobytes())
+        else:
+            h.update(pickle.dumps(arg, protocol=4))
+    return h.hexdigest()
+
+def folder(func):
+    return os.path.join(directory, func.__module__ + '.' + func.__qualname__) #each function has its own folder
+
+class Stored:
+    '''
+    Stored(index)
+
+    Class marking where the array saved as index.npy goes in a cached result.
+    '''
+    def __init__(self, index):
+        self.index = index
+
+def split(obj, arrays):
+    '''
+    split(obj, arrays)
+
+    Replaces every NumPy array in a result (on its own or inside dicts, lists and
+    tuples) by a Stored marker, appending the arrays to the list arrays.
+    Outputs the result with the markers.
+    '''
+    if isinstance(obj, np.ndarray) and obj.dtype != object:
+        arrays.append(obj)
+        return Stored(len(arrays)-1)
+    if type(obj) is dict:
+        return {k: split(v, arrays) for k, v in obj.items()}
+    if type(obj) in (list, tuple):
+        return type(obj)(split(v, arrays) for v in obj)
+    return obj
+
+def join(obj, path):
+    '''
+    join(obj, path)
+
+    Replaces every Stored marker in a result by its array from the folder path,
+    loaded memory-mapped.
+    Outputs the result.
+    '''
+    if isinstance(obj, Stored):
+        return np.load(os.path.join(path, '%d.npy' % obj.index), mmap_mode='r')
+    if type(obj) is dict:
+        return {k: join(v, path) for k, v in obj.items()}
+    if type(obj) in (list, tuple):
+        return type(obj)(join(v, path) for v in obj)
+    return obj
+
+def cached(func, *args, **kwargs):
+    '''
+    cached(func, *args, **kwargs)
+
+    Calls func with the given arguments, or loads the result from the cache if the
+    same call has been made before with the same code.
+    Outputs the result.
+    '''
+    path = os.path.join(folder(func), key(func, args, kwargs))
+    index = os.path.join(path, 'result.pkl') #the result with its arrays replaced by markers
+    if os.path.exists(index):
+        os.utime(index) #marks the result as recently used
+        with open(index, 'rb') as f:
+            return join(pickle.load(f), path)
+    res = func(*args, **kwargs)
+    tmp = path + '.%d.tmp' % os.getpid() #written under a temporary name so other processes never see half a result
+    os.makedirs(tmp, exist_ok=True)
+    arrays = []
+    skeleton = split(res, arrays)
+    for i, a in enumerate(arrays):
+        np.save(os.path.join(tmp, '%d.npy' % i), a)
+    with open(os.path.join(tmp, 'result.pkl'), 'wb') as f:
+        pickle.dump(skeleton, f, protocol=4)
+    try:
+        os.replace(tmp, path)
+    except OSError: #another process stored the same result first
+        shutil.rmtree(tmp, ignore_errors=True)
+    evict()
+    return res
+
+def memo(func):
+    '''
+    memo(func)
+
+    Decorator caching the results of func on disk with cached.
+    The decorated function has a clear() method to remove its results.
+    '''
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return cached(func, *args, **kwargs)
+    wrapper.clear = lambda: clear(func)
+    return wrapper
+
+def files():
+    '''
+    files()
+
+    Finds every result in the cache.
+    Outputs a list of (last used time, size, folder).
+    '''
+    found = []
+    if not os.path.isdir(directory):
+        return found
+    for root, dirs, names in os.walk(directory):
+        if 'result.pkl' in names and not root.endswith('.tmp'):
+            st = os.stat(os.path.join(root, 'result.pkl'))
+            size = sum(os.path.getsize(os.path.join(root, name)) for name in names)
+            found.append((st.st_mtime, size, root))
+    return found
+
+def evict():
+    '''
+    evict()
+
+    Removes the least recently used results until the cache is no bigger than
+    maxBytes.
+    '''
+    found = sorted(files()) #oldest first
+    total = sum(size for mtime, size, path in found)
+    for mtime, size, path in found:
+        if total <= maxBytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total = total - size
+
+def clear(func=None):
+    '''
+    clear(func=None)
+
+    Removes every cached result of func, or the whole cache if func is None.
+    '''
+    for mtime, size, path in files():
+        if func is None or os.path.dirname(path) == folder(func):
+            shutil.rmtree(path, ignore_errors=True)
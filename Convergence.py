@@ -0,0 +1,113 @@
+'''
+This module runs convergence studies of the fixed step ODE methods.
+A problem is solved with a ladder of step sizes (in parallel), and the errors are
+used to find the observed order of accuracy, Richardson extrapolated results and
+the largest step size that meets a target tolerance.
+'''
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+import ODE
+import ErrorAnalysis
+import Instrument
+
+methods = {'RK4': ODE.rk4, 'AB4': ODE.ab4} #the methods that can be studied
+orders = {'RK4': 4, 'AB4': 4} #the theoretical order of each method
+
+class Problem:
+    '''
+    Problem(f, y0, tspan, exact=None)
+
+    Class describing an ODE problem dy/dt = f(t, y) from tspan[0] to tspan[1],
+    starting from y0.
+    exact is the analytic solution as a function of t, if it is known.
+    '''
+    def __init__(self, f, y0, tspan, exact=None):
+        self.f = f
+        self.y0 = np.atleast_1d(np.asarray(y0, dtype=float))
+        self.tspan = tspan
+        self.exact = exact
+
+    def grid(self, h):
+        '''
+        grid(h)
+
+        Outputs the evenly spaced times from tspan[0] to tspan[1] with step h.
+        '''
+        n = int(round((self.tspan[1]-self.tspan[0])/h)) #the number of steps
+        return np.linspace(self.tspan[0], self.tspan[1], n+1)
+
+def run(method, problem, h):
+    '''
+    run(method, problem, h)
+
+    Solves the problem with the method ('RK4' or 'AB4') and step h.
+    Outputs the times (t), the first component of the solution (y) and, if the
+    exact solution is known, the mean relative error after t[0] (as ErrorV1 in Q5).
+    '''
+    t = problem.grid(h)
+    y = methods[method](problem.f, t, problem.y0)[:,0] #the first component of the solution
+    err = None
+    if problem.exact is not None:
+        err = ErrorAnalysis.stats(y[1:], problem.exact(t[1:]))['meanRel']
+    return (t, y, err)
+
+def tallied(method, problem, h):
+    '''
+    tallied(method, problem, h)
+
+    Runs run in a worker process.
+    Outputs its results and the instrumentation tallies of the run.
+    '''
+    Instrument.reset()
+    return (run(method, problem, h), Instrument.snapshot())
+
+def study(method, problem, steps, tol=None, workers=None):
+    '''
+    study(method, problem, steps, tol=None, workers=None)
+
+    Runs a convergence study of the method ('RK4' or 'AB4') on the problem for the
+    ladder of step sizes (steps), running the step sizes on a pool of workers
+    processes (workers=1 runs them in turn).
+    Outputs a dictionary of:
+    steps - the step sizes, largest first
+    errors - the mean relative error for each step (if the exact solution is known)
+    final - the result at tspan[1] for each step
+    order - the observed order of accuracy between each pair of neighbouring steps,
+    from the errors if known, otherwise from the differences of the final results
+    richardson - the Richardson extrapolation of the final result from each pair of
+    neighbouring steps, using the theoretical order
+    best - the largest step in the ladder with error below tol (None if none)
+    predicted - the step predicted to just meet tol from the observed order
+    '''
+    if method not in methods:
+        raise TypeError('Invalid Method') #if an invalid method name is given an error is raised
+    steps = sorted(steps, reverse=True) #largest step first
+    workers = workers or max(1, min(len(steps), os.cpu_count() or 1)) #at most one worker per step size
+    if workers == 1: #a pool of one worker would only add the cost of starting it
+        results = [run(method, problem, h) for h in steps]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool: #the step sizes are independent so run in parallel
+            done = list(pool.map(tallied, [method]*len(steps), [problem]*len(steps), steps))
+        results = [res for res, tallies in done]
+        for res, tallies in done:
+            Instrument.merge(tallies) #the tallies from the worker processes
+    h = np.array(steps)
+    final = np.array([y[-1] for t, y, err in results]) #the results at the end time
+    errors = np.array([err for t, y, err in results]) if problem.exact is not None else None
+    r = h[:-1]/h[1:] #the ratio of each pair of neighbouring steps
+    if errors is not None:
+        order = np.log(errors[:-1]/errors[1:])/np.log(r)
+    else:
+        d = np.abs(np.diff(final)) #the differences between the final results
+        order = np.log(d[:-1]/d[1:])/np.log(r[1:])
+    p = orders[method]
+    richardson = final[1:] + (final[1:]-final[:-1])/(r**p - 1) #removes the leading error term
+    best, predicted = None, None
+    if tol is not None and errors is not None:
+        ok = h[errors <= tol] #the steps that meet the tolerance
+        best = ok.max() if len(ok) else None
+        if len(order) and order[-1] > 0:
+            predicted = h[-1]*(tol/errors[-1])**(1/order[-1]) #from error = C*h^order
+    return {'steps': h, 'errors': errors, 'final': final, 'order': order,
+            'richardson': richardson, 'best': best, 'predicted': predicted}
@@ -0,0 +1,80 @@
+'''
+This module holds the error analysis used to compare numerical results with an
+analytic reference.
+All of the error measures are found in one vectorised pass, and ErrorStats can
+accumulate them over a result that arrives in chunks.
+'''
+import numpy as np
+
+def absErr(values, reference, out=None):
+    '''
+    absErr(values, reference, out=None)
+
+    Finds the absolute errors |values - reference|, written into out if it is given.
+    '''
+    out = np.subtract(values, reference, out=out)
+    return np.abs(out, out=out)
+
+def relErr(values, reference, out=None):
+    '''
+    relErr(values, reference, out=None)
+
+    Finds the relative errors |values - reference|/|reference|, written into out if
+    it is given (out must not be reference, which is still needed for the division).
+    '''
+    out = absErr(values, reference, out=out)
+    return np.divide(out, np.abs(reference), out=out)
+
+class ErrorStats:
+    '''
+    ErrorStats()
+
+    Class accumulating error statistics against a reference over one or more chunks
+    of values.
+    update adds a chunk, and result outputs the number of values (n) and the
+    maximum, root mean square and mean of the absolute and relative errors.
+    '''
+    def __init__(self):
+        self.n = 0 #the number of values so far
+        self.sums = np.zeros(4) #sums of the absolute error, its square, the relative error and its square
+        self.maxAbs = 0.0 #the largest absolute error so far
+        self.maxRel = 0.0 #the largest relative error so far
+
+    def update(self, values, reference):
+        '''
+        update(values, reference)
+
+        Adds a chunk of values and their reference values to the statistics.
+        '''
+        err = absErr(values, reference) #the absolute errors of the chunk
+        if err.size == 0:
+            return self
+        self.n = self.n + err.size
+        self.maxAbs = max(self.maxAbs, err.max())
+        self.sums[0] += err.sum()
+        self.sums[1] += np.dot(err.ravel(), err.ravel())
+        np.divide(err, np.abs(reference), out=err) #turns the chunk into relative errors in place
+        self.maxRel = max(self.maxRel, err.max())
+        self.sums[2] += err.sum()
+        self.sums[3] += np.dot(err.ravel(), err.ravel())
+        return self
+
+    def result(self):
+        '''
+        result()
+
+        Outputs a dictionary of the statistics of all the values so far.
+        '''
+        n = max(self.n, 1)
+        return {'n': self.n,
+                'maxAbs': self.maxAbs, 'rmsAbs': np.sqrt(self.sums[1]/n), 'meanAbs': self.sums[0]/n,
+                'maxRel': self.maxRel, 'rmsRel': np.sqrt(self.sums[3]/n), 'meanRel': self.sums[2]/n}
+
+def stats(values, reference):
+    '''
+    stats(values, reference)
+
+    Finds the error statistics of values against their reference values in one pass.
+    Outputs the dictionary from ErrorStats.result.
+    '''
+    return ErrorStats().update(values, reference).result()
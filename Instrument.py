@@ -0,0 +1,160 @@
+'''
+This module records where the time goes inside the numerical kernels.
+Functions decorated with timed, and blocks of code inside section, have their
+calls and (inclusive) wall time tallied under a name, and count adds tallies of
+work done, such as flops or evaluations of an ODE right-hand side.
+Recording is off unless the INSTRUMENT environment variable is set (to anything
+but 0) or enable() is called; while it is off the decorators only check a flag.
+When it is switched on by INSTRUMENT a summary table is printed at exit, and if
+INSTRUMENT_LOG names a file the tallies are also written to it as JSON lines.
+'''
+import atexit
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+
+on = os.environ.get('INSTRUMENT', '') not in ('', '0') #whether anything is recorded
+tallies = {} #the tallies of each name: calls, time and any counts
+
+def enable():
+    global on
+    on = True
+
+def disable():
+    global on
+    on = False
+
+def reset():
+    '''
+    reset()
+
+    Removes all of the tallies.
+    '''
+    tallies.clear()
+
+def tally(name):
+    if name not in tallies:
+        tallies[name] = {'calls': 0, 'time': 0.0}
+    return tallies[name]
+
+def count(name, **amounts):
+    '''
+    count(name, **amounts)
+
+    Adds amounts to the named tallies, e.g. count('LU', flops=2*n**3/3).
+    Does nothing while recording is off.
+    '''
+    if not on:
+        return
+    entry = tally(name)
+    for key, amount in amounts.items():
+        entry[key] = entry.get(key, 0) + amount
+
+def timed(name=None):
+    '''
+    timed(name=None)
+
+    Decorator tallying the calls and wall time of a function under name (default
+    the function's qualified name).
+    '''
+    def decorate(func):
+        label = name or func.__qualname__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not on:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                entry = tally(label)
+                entry['calls'] += 1
+                entry['time'] += time.perf_counter() - start
+        return wrapper
+    return decorate
+
+@contextlib.contextmanager
+def section(name):
+    '''
+    section(name)
+
+    Context manager tallying the wall time of a block of code under name.
+    '''
+    if not on:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry = tally(name)
+        entry['calls'] += 1
+        entry['time'] += time.perf_counter() - start
+
+def snapshot():
+    '''
+    snapshot()
+
+    Outputs a copy of the tallies, e.g. to send from a worker process.
+    '''
+    return {name: dict(entry) for name, entry in tallies.items()}
+
+def merge(other):
+    '''
+    merge(other)
+
+    Adds the tallies from a snapshot (e.g. from a worker process) to these ones.
+    '''
+    for name, entry in other.items():
+        mine = tally(name)
+        for key, amount in entry.items():
+            mine[key] = mine.get(key, 0) + amount
+
+def records():
+    '''
+    records()
+
+    Outputs the tallies as a list of dictionaries, one per name, with the name,
+    process id and time they were taken.
+    '''
+    now = time.time()
+    return [dict(entry, name=name, pid=os.getpid(), at=now) for name, entry in sorted(tallies.items())]
+
+def log(path):
+    '''
+    log(path)
+
+    Appends the tallies to a file as JSON lines, one record per name.
+    '''
+    with open(path, 'a') as f:
+        for record in records():
+            f.write(json.dumps(record) + '\n')
+
+def table():
+    '''
+    table()
+
+    Outputs the tallies as a summary table, slowest first, with the rate of any
+    flops counted.
+    '''
+    lines = ['%-28s %8s %12s %12s  %s' % ('name', 'calls', 'total (s)', 'mean (ms)', 'counts')]
+    for name, entry in sorted(tallies.items(), key=lambda item: -item[1]['time']):
+        counts = {key: amount for key, amount in entry.items() if key not in ('calls', 'time')}
+        text = ' '.join('%s=%.4g' % item for item in sorted(counts.items()))
+        if 'flops' in counts and entry['time'] > 0:
+            text = text + ' (%.3g GFLOP/s)' % (counts['flops']/entry['time']/1e9)
+        mean = 1e3*entry['time']/entry['calls'] if entry['calls'] else 0.0
+        lines.append('%-28s %8d %12.4f %12.4f  %s' % (name, entry['calls'], entry['time'], mean, text))
+    return '\n'.join(lines)
+
+def summary():
+    if tallies:
+        print('\n' + table(), file=sys.stderr)
+    if os.environ.get('INSTRUMENT_LOG'):
+        log(os.environ['INSTRUMENT_LOG'])
+
+if on: #switched on from the environment, so the results are reported at exit
+    atexit.register(summary)
@@ -0,0 +1,236 @@
+'''
+This module holds iterative (Krylov subspace) solvers for A.x=b, an alternative to
+the direct LU solve in Q2 when an answer to a tolerance is enough.
+cg is the conjugate gradient method for symmetric positive definite A and gmres
+is the restarted GMRES method for any A.
+A can be a full matrix, a Banded or CSR matrix from Q2, or an Operator that only
+knows how to multiply by a vector (matrix-free).
+Both can be preconditioned with Jacobi (the diagonal) or ILU0 (the incomplete LU
+decomposition from Q2's SparseLU), and both report the residual after every
+iteration.
+'''
+import numpy as np
+import Assignment_Q2 as Q2
+import Instrument
+
+class Operator:
+    '''
+    Operator(matvec, n, diag=None)
+
+    Class describing an nxn matrix only by a function (matvec) that multiplies a
+    vector by it, so the matrix never has to be stored.
+    diag can give its diagonal, for the Jacobi preconditioner.
+    '''
+    def __init__(self, matvec, n, diag=None):
+        self.matvec = matvec
+        self.n = n
+        self.diag = None if diag is None else np.asarray(diag, dtype=float)
+
+    def __len__(self):
+        return self.n
+
+    def dot(self, x):
+        return self.matvec(x)
+
+def operator(A):
+    '''
+    operator(A)
+
+    Outputs A as an object with a dot method: Operators, Banded and CSR matrices
+    already have one, and full matrices are wrapped in an Operator.
+    '''
+    if hasattr(A, 'dot') and not isinstance(A, np.ndarray):
+        return A
+    A = np.asarray(A, dtype=float)
+    return Operator(A.dot, len(A), np.diag(A))
+
+def diagonal(A):
+    '''
+    diagonal(A)
+
+    Outputs the diagonal of a full, Banded or CSR matrix, or an Operator given one.
+    '''
+    if isinstance(A, Q2.CSR):
+        d = np.zeros(len(A))
+        on = A.rowIndex() == A.indices #the elements on the diagonal
+        d[A.indices[on]] = A.data[on]
+        return d
+    if isinstance(A, Q2.Banded):
+        return A.band[:,A.l].copy()
+    if isinstance(A, Operator):
+        if A.diag is None:
+            raise TypeError('Operator Has No Diagonal') #the Jacobi preconditioner needs the diagonal
+        return A.diag
+    return np.diag(np.asarray(A, dtype=float)).copy()
+
+class Jacobi:
+    '''
+    Jacobi(A)
+
+    Class holding the Jacobi preconditioner of A, its diagonal.
+    solve(r) outputs an approximation of the solution of A.z=r by dividing by it.
+    '''
+    def __init__(self, A):
+        self.d = diagonal(A)
+        if np.any(self.d == 0):
+            raise TypeError('Jacobi Preconditioner Failed: Zero Diagonal')
+
+    def solve(self, r):
+        return r/self.d
+
+class ILU0:
+    '''
+    ILU0(A)
+
+    Class holding the ILU(0) preconditioner of a full, Banded or CSR matrix (A): the
+    LU decomposition from Q2.SparseLU keeping only the pattern of A (no fill-in).
+    solve(r) outputs an approximation of the solution of A.z=r by sparse forwards
+    and backwards substitution.
+    '''
+    def __init__(self, A):
+        if isinstance(A, Q2.Banded):
+            A = Q2.CSR.fromBanded(A)
+        elif not isinstance(A, Q2.CSR):
+            A = Q2.CSR.fromDense(A)
+        self.LU = Q2.SparseLU(A, ordering=None, fill=False)
+
+    def solve(self, r):
+        return self.LU.solve(r)
+
+class Identity:
+    def solve(self, r):
+        return r
+
+def preconditioner(M, A):
+    '''
+    preconditioner(M, A)
+
+    Outputs the preconditioner called M ('jacobi', 'ilu0' or None) for A, or M
+    itself if it is already an object with a solve method.
+    '''
+    if M is None:
+        return Identity()
+    if hasattr(M, 'solve'):
+        return M
+    if M == 'jacobi':
+        return Jacobi(A)
+    if M == 'ilu0':
+        return ILU0(A)
+    raise TypeError('Invalid Preconditioner') #if an invalid preconditioner name is given an error is raised
+
+@Instrument.timed('cg')
+def cg(A, b, x0=None, tol=1e-10, maxiter=None, M=None):
+    '''
+    cg(A, b, x0=None, tol=1e-10, maxiter=None, M=None)
+
+    Solves A.x=b for symmetric positive definite A with the (preconditioned)
+    conjugate gradient method, starting from x0 (default 0), until the residual
+    |b-A.x| is at most tol*|b| or maxiter iterations (default 10n) have been made.
+    M is the preconditioner ('jacobi', 'ilu0', None or an object with a solve
+    method), which should also be symmetric positive definite.
+    Outputs x and a dictionary of:
+    converged - whether the tolerance was met
+    iterations - the number of iterations made
+    residuals - the relative residual |b-A.x|/|b| before each iteration and at the end
+    matvecs - the number of products with A
+    '''
+    op = operator(A)
+    P = preconditioner(M, A)
+    b = np.asarray(b, dtype=float)
+    n = len(b)
+    maxiter = 10*n if maxiter is None else maxiter
+    x = np.zeros(n) if x0 is None else np.array(x0, dtype=float)
+    r = b - op.dot(x) if x0 is not None else b.copy() #the residual
+    matvecs = int(x0 is not None)
+    norm = np.linalg.norm(b) or 1.0 #the residuals are relative to |b|
+    residuals = [np.linalg.norm(r)/norm]
+    z = P.solve(r)
+    p = z.copy() #the search direction
+    rz = np.dot(r, z)
+    k = 0
+    while residuals[-1] > tol and k < maxiter:
+        Ap = op.dot(p)
+        matvecs = matvecs + 1
+        pAp = np.dot(p, Ap)
+        if pAp <= 0:
+            raise TypeError('CG Failed: Matrix Not Positive Definite') #CG only works for positive definite A
+        alpha = rz/pAp #the step along the search direction
+        x = x + alpha*p
+        r = r - alpha*Ap
+        residuals.append(np.linalg.norm(r)/norm)
+        z = P.solve(r)
+        rzNew = np.dot(r, z)
+        p = z + (rzNew/rz)*p #the next direction, conjugate to the previous ones
+        rz = rzNew
+        k = k + 1
+    Instrument.count('cg', iterations=k, matvecs=matvecs)
+    return (x, {'converged': bool(residuals[-1] <= tol), 'iterations': k, 'residuals': residuals, 'matvecs': matvecs})
+
+@Instrument.timed('gmres')
+def gmres(A, b, x0=None, tol=1e-10, restart=30, maxiter=None, M=None):
+    '''
+    gmres(A, b, x0=None, tol=1e-10, restart=30, maxiter=None, M=None)
+
+    Solves A.x=b with the right preconditioned GMRES method restarted every restart
+    iterations, starting from x0 (default 0), until the residual |b-A.x| is at most
+    tol*|b| or maxiter iterations (default 10n) have been made.
+    Each cycle builds an orthonormal basis of the Krylov subspace with modified
+    Gram-Schmidt and finds the x in it with the smallest residual, using Givens
+    rotations to solve the least squares problem as the basis grows.
+    M is the preconditioner ('jacobi', 'ilu0', None or an object with a solve
+    method).
+    Outputs x and a dictionary of:
+    converged - whether the tolerance was met
+    iterations - the number of iterations made
+    residuals - the relative residual |b-A.x|/|b| at the start and after each iteration
+    matvecs - the number of products with A
+    '''
+    op = operator(A)
+    P = preconditioner(M, A)
+    b = np.asarray(b, dtype=float)
+    n = len(b)
+    maxiter = 10*n if maxiter is None else maxiter
+    m = min(restart, n) #the size of the basis
+    x = np.zeros(n) if x0 is None else np.array(x0, dtype=float)
+    norm = np.linalg.norm(b) or 1.0 #the residuals are relative to |b|
+    r = b - op.dot(x)
+    matvecs = 1
+    residuals = [np.linalg.norm(r)/norm]
+    k = 0
+    while residuals[-1] > tol and k < maxiter: #each cycle until a restart
+        beta = np.linalg.norm(r)
+        V = np.zeros((m+1, n)) #the orthonormal basis, one vector per row
+        H = np.zeros((m+1, m)) #the Hessenberg matrix, reduced to upper triangular by the rotations
+        cs, sn = np.zeros(m), np.zeros(m) #the Givens rotations
+        g = np.zeros(m+1) #the rotated right-hand side of the least squares problem
+        g[0] = beta
+        V[0] = r/beta
+        j = 0
+        while j < m and k < maxiter:
+            w = op.dot(P.solve(V[j]))
+            matvecs = matvecs + 1
+            for i in range(j+1): #modified Gram-Schmidt
+                H[i,j] = np.dot(w, V[i])
+                w = w - H[i,j]*V[i]
+            h = np.linalg.norm(w) #the size of the part of w outside the basis
+            H[j+1,j] = h
+            for i in range(j): #applies the previous rotations to the new column
+                H[i,j], H[i+1,j] = cs[i]*H[i,j] + sn[i]*H[i+1,j], -sn[i]*H[i,j] + cs[i]*H[i+1,j]
+            rho = np.hypot(H[j,j], H[j+1,j])
+            cs[j], sn[j] = (H[j,j]/rho, H[j+1,j]/rho) if rho else (1.0, 0.0) #the rotation that removes H[j+1,j]
+            H[j,j], H[j+1,j] = rho, 0.0
+            g[j], g[j+1] = cs[j]*g[j], -sn[j]*g[j]
+            j, k = j + 1, k + 1
+            residuals.append(abs(g[j])/norm) #the residual of the least squares solution
+            if residuals[-1] <= tol or h == 0: #h = 0 means the solution is in the basis
+                break
+            V[j] = w/h
+        y = np.zeros(j)
+        for i in range(j-1,-1,-1): #backwards substitution for the coefficients of the basis
+            y[i] = (g[i] - np.dot(H[i,i+1:j], y[i+1:]))/H[i,i]
+        x = x + P.solve(np.dot(y, V[:j]))
+        r = b - op.dot(x) #the true residual for the next cycle
+        matvecs = matvecs + 1
+        residuals[-1] = np.linalg.norm(r)/norm
+    Instrument.count('gmres', iterations=k, matvecs=matvecs)
+    return (x, {'converged': bool(residuals[-1] <= tol), 'iterations': k, 'residuals': residuals, 'matvecs': matvecs})
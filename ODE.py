@@ -0,0 +1,252 @@
+'''
+This module holds general ODE solvers for systems dy/dt = f(t, y), where f is any
+function of the time t and the (vector) state y that outputs dy/dt.
+It has the fixed step fourth-order Runge-Kutta (RK4) and Adams-Bashforth (AB4)
+methods used in question 5, and the adaptive Dormand-Prince 5(4) method, which
+chooses its own step sizes to meet an error tolerance.
+Linear time-invariant systems dy/dt = A.y + B.u can instead be solved exactly for
+piecewise constant inputs u with lti.
+'''
+from collections import OrderedDict
+import numpy as np
+import scipy.linalg as spl
+import scipy.signal as sps
+import Instrument
+
+@Instrument.timed('rk4')
+def rk4(f, t, y0):
+    '''
+    rk4(f, t, y0)
+
+    Solves dy/dt = f(t, y) with the fourth-order Runge-Kutta method on the times t,
+    starting from y0 at t[0].
+    Outputs y at every time, with one row per time.
+    '''
+    t = np.asarray(t, dtype=float)
+    y = np.zeros((len(t),) + np.shape(y0)) #create variable to hold the solution
+    y[0] = y0
+    for i in range(len(t)-1):
+        h = t[i+1]-t[i] #the step size
+        ka = f(t[i], y[i])
+        kb = f(t[i]+h/2, y[i]+h*ka/2)
+        kc = f(t[i]+h/2, y[i]+h*kb/2)
+        kd = f(t[i]+h, y[i]+h*kc)
+        y[i+1] = y[i] + (h/6)*(ka + 2*kb + 2*kc + kd) #the Runge-Kutta step
+    Instrument.count('rk4', evals=4*(len(t)-1), steps=len(t)-1)
+    return y
+
+@Instrument.timed('ab4')
+def ab4(f, t, y0):
+    '''
+    ab4(f, t, y0)
+
+    Solves dy/dt = f(t, y) with the fourth-order Adams-Bashforth method on the evenly
+    spaced times t, starting from y0 at t[0].
+    The first three steps are taken with RK4.
+    Outputs y at every time, with one row per time.
+    '''
+    t = np.asarray(t, dtype=float)
+    h = t[1]-t[0] #the step size
+    y = np.zeros((len(t),) + np.shape(y0)) #create variable to hold the solution
+    y[:4] = rk4(f, t[:4], y0) #starts the method with Runge-Kutta
+    F = [f(t[i], y[i]) for i in range(min(4,len(t)))] #the last four derivatives
+    for i in range(3, len(t)-1):
+        y[i+1] = y[i] + (h/24)*(55*F[3] - 59*F[2] + 37*F[1] - 9*F[0]) #the Adams-Bashforth step
+        F = F[1:] + [f(t[i+1], y[i+1])]
+    Instrument.count('ab4', evals=len(t), steps=max(0,len(t)-4)) #the starting steps are counted by rk4
+    return y
+
+#the Butcher tableau of the Dormand-Prince 5(4) method
+C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+A = [[],
+     [1/5],
+     [3/40, 9/40],
+     [44/45, -56/15, 32/9],
+     [19372/6561, -25360/2187, 64448/6561, -212/729],
+     [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656]]
+B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0]) #fifth order weights
+E = B - np.array([5179/57600, 0, 7571/16695, 393/640, -92097/339200, 187/2100, 1/40]) #difference to the fourth order weights
+#coefficients of the fourth order dense output polynomial in (t-t[i])/h
+P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]])
+
+class Solution:
+    '''
+    Solution(t, y, Q, nfev)
+
+    Class holding the solution of an adaptive solve: the times of the steps (t), the
+    solution at each step (y), the dense output coefficients of each step (Q) and
+    the number of evaluations of f (nfev).
+    Calling the object on an array of times outputs the solution at those times
+    from the dense output polynomials.
+    '''
+    def __init__(self, t, y, Q, nfev):
+        self.t = np.asarray(t)
+        self.y = np.asarray(y)
+        self.Q = np.asarray(Q)
+        self.nfev = nfev
+
+    def __call__(self, tq):
+        tq = np.asarray(tq, dtype=float)
+        i = np.clip(np.searchsorted(self.t, tq) - 1, 0, len(self.t)-2) #the step each time is in
+        h = self.t[i+1] - self.t[i] #the step sizes
+        x = (tq - self.t[i])/h #the fraction of the way through the step
+        p = np.stack([x, x**2, x**3, x**4], axis=-1) #powers of the fraction
+        dy = np.einsum('...k,...nk->...n', p, self.Q[i]) #the dense output polynomial
+        return self.y[i] + (h*dy.T).T
+
+@Instrument.timed('dopri')
+def dopri(f, tspan, y0, rtol=1e-6, atol=1e-9, h0=None, hmax=np.inf):
+    '''
+    dopri(f, tspan, y0, rtol=1e-6, atol=1e-9, h0=None, hmax=inf)
+
+    Solves dy/dt = f(t, y) from tspan[0] to tspan[1], starting from y0, with the
+    adaptive Dormand-Prince 5(4) method.
+    Each step is accepted if the difference between the fifth and fourth order
+    results is within atol + rtol*|y|, and the next step size is chosen from the
+    size of that difference.
+    Outputs a Solution object.
+    '''
+    t0, tf = float(tspan[0]), float(tspan[1])
+    y = np.atleast_1d(np.asarray(y0, dtype=float)) #the current state
+    k = f(t0, y) #the derivative at the start of the step
+    nfev = 1 #counts the evaluations of f
+    if h0 is None: #estimates a starting step from the size of y and its derivative
+        scale = atol + rtol*np.abs(y)
+        d0, d1 = np.sqrt(np.mean((y/scale)**2)), np.sqrt(np.mean((k/scale)**2))
+        h0 = 1e-6 if d0 < 1e-5 or d1 < 1e-5 else 0.01*d0/d1
+    h = min(h0, hmax, tf-t0)
+    ts, ys, Qs = [t0], [y], []
+    t = t0
+    while t < tf:
+        if tf-t <= 1e-14*max(1, abs(tf)):
+            break #tf has been reached to within rounding error
+        h = min(h, tf-t) #the last step ends at tf
+        if h < 1e-14*max(1, abs(t)):
+            raise TypeError('Step Size Too Small') #if the tolerance cannot be met an error is raised
+        K = [k] #the stages of the step
+        for s in range(1, 6):
+            K.append(f(t + C[s]*h, y + h*np.dot(A[s], K)))
+        ynew = y + h*np.dot(B[:6], K)
+        knew = f(t + h, ynew) #the derivative at the end of the step (reused next step)
+        K.append(knew)
+        nfev = nfev + 6
+        scale = atol + rtol*np.maximum(np.abs(y), np.abs(ynew))
+        err = np.sqrt(np.mean((h*np.dot(E, K)/scale)**2)) #the estimated error relative to the tolerance
+        if err <= 1: #accepts the step
+            Qs.append(np.dot(np.array(K).T, P)) #the dense output coefficients
+            t, y, k = t + h, ynew, knew
+            ts.append(t)
+            ys.append(y)
+        h = min(hmax, h*min(5, max(0.2, 0.9*err**-0.2 if err > 0 else 5))) #chooses the next step size
+    Instrument.count('dopri', evals=nfev, steps=len(ts)-1)
+    return Solution(ts, ys, Qs, nfev)
+
+class Linear:
+    '''
+    Linear(A, B, u)
+
+    Class holding the right-hand side f(t, y) = A.y + B.u(t) of a linear
+    time-invariant system with input function u, so it can be passed to any of the
+    solvers (and, unlike a nested function, sent to other processes).
+    '''
+    def __init__(self, A, B, u):
+        self.A = np.atleast_2d(np.asarray(A, dtype=float))
+        self.B = np.asarray(B, dtype=float).reshape(len(self.A), -1)
+        self.u = u
+
+    def __call__(self, t, y):
+        y = np.asarray(y, dtype=float)
+        dy = self.A.dot(y.reshape(len(self.A))) + self.B.dot(np.atleast_1d(self.u(t))) #A.y + B.u(t)
+        return dy.reshape(y.shape)
+
+class Tabulated:
+    '''
+    Tabulated(t, u, uh)
+
+    Class holding an input known only at the evenly spaced times t and at the half
+    steps t+h/2 (uh), which is all the fixed step solvers need.
+    t, u and uh can have one row per time and one column per signal, so calling the
+    object on the times of every signal at once outputs each signal's value.
+    '''
+    def __init__(self, t, u, uh):
+        self.t0 = np.asarray(t[0], dtype=float) #the start time of each signal
+        self.h = np.asarray(t[1]-t[0], dtype=float) if len(t) > 1 else np.ones(np.shape(t[0])) #the step of each signal
+        self.U = np.stack([u, uh], axis=1) #the input at each time (U[:,0]) and half step after it (U[:,1])
+        self.cols = np.arange(self.U.shape[2]) if self.U.ndim == 3 else None
+
+    def __call__(self, t):
+        j = np.rint((t - self.t0)/(self.h/2)).astype(int) #the number of half steps from the start
+        if self.cols is None:
+            return self.U[j//2, j%2]
+        return self.U[j//2, j%2, self.cols]
+
+expms = OrderedDict() #cached discretisations of linear systems, by (A, B, h), most recently used last
+expmSize = 64 #the number of discretisations kept in the cache
+
+def discretise(A, B, h):
+    '''
+    discretise(A, B, h)
+
+    Finds the exact discrete update y[i+1] = Ad.y[i] + Bd.u[i] of the linear system
+    dy/dt = A.y + B.u over a step h when u is constant over the step, from the
+    matrix exponential of [[A, B], [0, 0]]*h (which also works when A is singular).
+    Results are cached so the exponential is only found once per step size (the
+    least recently used are removed once there are more than expmSize).
+    Outputs Ad and Bd.
+    '''
+    key = (A.tobytes(), B.tobytes(), A.shape, B.shape, float(h))
+    if key in expms:
+        expms.move_to_end(key) #marks the discretisation as recently used
+        return expms[key]
+    n, m = B.shape
+    M = np.zeros((n+m, n+m)) #the augmented matrix
+    M[:n,:n] = A
+    M[:n,n:] = B
+    Ed = spl.expm(M*h) #the matrix exponential
+    expms[key] = (Ed[:n,:n], Ed[:n,n:])
+    if len(expms) > expmSize:
+        expms.popitem(last=False) #removes the least recently used discretisation
+    return expms[key]
+
+@Instrument.timed('lti')
+def lti(A, B, t, u, y0, uh=None):
+    '''
+    lti(A, B, t, u, y0, uh=None)
+
+    Solves the linear time-invariant system dy/dt = A.y + B.u on the evenly spaced
+    times t, starting from y0 at t[0], for the input u sampled at t (one row per
+    time).
+    If the input is piecewise constant (held from each sample to the next) the exact
+    discrete update is used, which for a single state is run as an IIR filter.
+    uh can give the input at the half steps t+h/2; if it differs from u the input is
+    not piecewise constant and the method falls back to RK4.
+    Outputs y at every time, with one row per time.
+    '''
+    A = np.atleast_2d(np.asarray(A, dtype=float))
+    n = len(A) #the number of states
+    B = np.asarray(B, dtype=float).reshape(n, -1)
+    t = np.asarray(t, dtype=float)
+    N = len(t) #the number of times
+    h = t[1]-t[0] #the step size
+    u = np.asarray(u, dtype=float).reshape(N, -1)
+    y = np.zeros((N, n)) #create variable to hold the solution
+    y[0] = np.asarray(y0, dtype=float).reshape(n)
+    if uh is not None and not np.array_equal(np.asarray(uh, dtype=float).reshape(N, -1), u):
+        uh = np.asarray(uh, dtype=float).reshape(N, -1) #the input is not constant over the steps so RK4 is used
+        inp = Tabulated(t, u, uh) #the input at the sample times and half steps
+        return rk4(lambda ti, yi: A.dot(yi) + B.dot(inp(ti)), t, y[0])
+    Ad, Bd = discretise(A, B, h)
+    d = u[:-1].dot(Bd.T) #the input term of every step
+    if n == 1: #a single state is a first order IIR filter
+        y[1:,0] = sps.lfilter([1], [1, -Ad[0][0]], d[:,0], zi=[Ad[0][0]*y[0][0]])[0]
+    else:
+        for i in range(N-1):
+            y[i+1] = Ad.dot(y[i]) + d[i] #the exact update
+    return y
@@ -0,0 +1,108 @@
+'''
+This module runs the questions as tasks.
+Each question module has an answers() function that does the computation and
+returns its results, a report(res) function that prints them and a plots(res)
+function that draws the graphs.
+Tasks whose dependencies have finished are run in parallel on a pool of processes,
+then the results are printed (and plotted) in order in the main process.
+'''
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import importlib
+import multiprocessing
+import os
+import time
+import Cache
+import Instrument
+
+class Task:
+    '''
+    Task(name, module, deps=(), title=None)
+
+    Class describing a task: its name, the name of the module whose answers()
+    function it runs, the names of the tasks that must finish before it starts and
+    the title printed above its results.
+    '''
+    def __init__(self, name, module, deps=(), title=None):
+        self.name = name
+        self.module = module
+        self.deps = tuple(deps)
+        self.title = title or name
+
+def work(module, cache=True):
+    '''
+    work(module, cache=True)
+
+    Runs answers() from the named module, loading the results from the on-disk cache
+    instead if they were found before with the same code (unless cache is False).
+    Outputs the results, the wall time taken and the instrumentation tallies of the
+    task.
+    '''
+    if multiprocessing.parent_process() is not None:
+        Instrument.reset() #a worker process only reports the tallies of this task
+    start = time.perf_counter()
+    answers = importlib.import_module(module).answers
+    res = Cache.cached(answers) if cache else answers()
+    return (res, time.perf_counter()-start, Instrument.snapshot())
+
+def select(tasks, names):
+    '''
+    select(tasks, names)
+
+    Finds the tasks called names together with all of the tasks they depend on,
+    keeping the order of tasks.
+    '''
+    byName = {task.name: task for task in tasks}
+    needed = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name not in byName:
+            raise TypeError('Unknown Task: ' + name) #if an unknown task is asked for an error is raised
+        if name not in needed:
+            needed.add(name)
+            stack.extend(byName[name].deps)
+    return [task for task in tasks if task.name in needed]
+
+def run(tasks, workers=None, plot=True, cache=True):
+    '''
+    run(tasks, workers=None, plot=True, cache=True)
+
+    Runs the tasks on a pool of workers processes (workers=1 runs them in turn in
+    this process), starting each as soon as its dependencies have finished.
+    The results are then printed in order, and plotted unless plot is False (the
+    headless mode).
+    Instrumentation tallies from the worker processes are added to this process's.
+    Results are loaded from the on-disk cache when possible unless cache is False.
+    Outputs dictionaries of the results and wall times of each task.
+    '''
+    results, times = {}, {}
+    workers = workers or max(1, min(len(tasks), os.cpu_count() or 1)) #at most one worker per task
+    if workers == 1: #a pool of one worker would only add the cost of starting it
+        for task in tasks: #the tasks are already in an order that satisfies the dependencies
+            results[task.name], times[task.name], tallies = work(task.module, cache)
+    else:
+        waiting = list(tasks)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            running = {}
+            while waiting or running:
+                for task in [task for task in waiting if all(dep in results for dep in task.deps)]:
+                    running[pool.submit(work, task.module, cache)] = task.name #starts every task that is ready
+                    waiting.remove(task)
+                if not running:
+                    raise TypeError('Unmet Task Dependencies') #if nothing can run an error is raised
+                done, notDone = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name], times[name], tallies = future.result()
+                    Instrument.merge(tallies) #the tallies from the worker process
+    for task in tasks:
+        print(task.title, '\n \n')
+        module = importlib.import_module(task.module)
+        module.report(results[task.name])
+        if plot:
+            module.plots(results[task.name])
+        print('\n \n')
+    print('Wall time per task:')
+    for task in tasks:
+        print('  %-4s %8.3f s' % (task.name, times[task.name]))
+    return (results, times)
@@ -0,0 +1,155 @@
+'''
+This module holds the signal generators used by questions 4 and 5.
+Every waveform is evaluated on a whole array of times at once, and generated
+waveforms are cached by their shape, parameters and sampling grid so repeated
+calls on the same grid do not recompute them.
+'''
+from collections import OrderedDict
+import hashlib
+import numpy as np
+
+def rect(t, start=-0.5, stop=0.5, amp=1):
+    '''
+    rect(t, start=-0.5, stop=0.5, amp=1)
+
+    The rect function, returning amp for start <= t <= stop and 0 elsewhere.
+    '''
+    t = np.asarray(t, dtype=float)
+    return np.where((t >= start) & (t <= stop), float(amp), 0.0)
+
+def gauss(t, amp=1, sigma=1, centre=0, var=None):
+    '''
+    gauss(t, amp=1, sigma=1, centre=0, var=None)
+
+    The gaussian function with peak amp, standard deviation sigma and centre.
+    The variance can be given directly (var) instead, which avoids the rounding of
+    squaring a square root (e.g. sigma=sqrt(2)).
+    '''
+    t = np.asarray(t, dtype=float)
+    var = sigma**2 if var is None else var
+    return amp*np.exp(-(t-centre)**2/(2*var))
+
+def step(t, t0=0, before=1, after=0):
+    '''
+    step(t, t0=0, before=1, after=0)
+
+    The step function, returning before for t < t0 and after from t0 onwards.
+    '''
+    t = np.asarray(t, dtype=float)
+    return np.where(t < t0, float(before), float(after))
+
+def square(t, T=1, amp=1, before=1):
+    '''
+    square(t, T=1, amp=1, before=1)
+
+    The square function with period T, starting low at t = 0 and switching between
+    0 and amp every half period.
+    For t < 0 it returns before.
+    '''
+    t = np.asarray(t, dtype=float)
+    high = np.floor(2*t/T) % 2 == 1 #the second half of each period is high
+    return np.where(t < 0, float(before), np.where(high, float(amp), 0.0))
+
+shapes = {'rect': rect, 'gauss': gauss, 'step': step, 'square': square} #the available waveforms
+
+class Grid:
+    '''
+    Grid(start, stop, num)
+
+    Class describing an evenly sampled grid of num times from start to stop, as
+    np.linspace(start, stop, num), without creating the array until it is needed.
+    '''
+    def __init__(self, start, stop, num):
+        self.start, self.stop, self.num = start, stop, num
+
+    def __len__(self):
+        return self.num
+
+    def key(self):
+        return ('linspace', float(self.start), float(self.stop), int(self.num))
+
+    def values(self):
+        return np.linspace(self.start, self.stop, self.num)
+
+def gridKey(t):
+    '''
+    gridKey(t)
+
+    Outputs a key identifying a sampling grid (t), either a Grid or an array of times.
+    '''
+    if isinstance(t, Grid):
+        return t.key()
+    t = np.ascontiguousarray(t, dtype=float)
+    return ('array', t.shape, hashlib.sha1(t.tobytes()).hexdigest()) #arrays are identified by their contents
+
+cache = OrderedDict() #the generated waveforms, most recently used last
+cacheSize = 64 #the number of waveforms kept in the cache
+
+def generate(shape, t, **params):
+    '''
+    generate(shape, t, **params)
+
+    Generates the waveform called shape with the given parameters on the sampling
+    grid t (a Grid or an array of times).
+    Waveforms are cached by (shape, params, grid); the cached arrays are read only
+    and each caller gets its own writable copy, which is much cheaper than
+    generating the waveform again.
+    Outputs the signal values.
+    '''
+    if shape not in shapes:
+        raise TypeError('Invalid Shape') #if an invalid shape name is given an error is raised
+    key = (shape, tuple(sorted(params.items())), gridKey(t))
+    if key in cache:
+        cache.move_to_end(key) #marks the waveform as recently used
+        return cache[key].copy()
+    times = t.values() if isinstance(t, Grid) else t
+    y = shapes[shape](times, **params) #generates the waveform
+    y.flags.writeable = False #the cached waveform is never changed
+    cache[key] = y
+    if len(cache) > cacheSize:
+        cache.popitem(last=False) #removes the least recently used waveform
+    return y.copy()
+
+class Waveform:
+    '''
+    Waveform(shape, **params)
+
+    Class describing a waveform by its shape and parameters.
+    Calling the object on a sampling grid generates the signal (using the cache),
+    while lazy(t) returns a Sampled object that only generates it when used.
+    '''
+    def __init__(self, shape, **params):
+        if shape not in shapes:
+            raise TypeError('Invalid Shape') #if an invalid shape name is given an error is raised
+        self.shape = shape
+        self.params = params
+
+    def __call__(self, t):
+        return generate(self.shape, t, **self.params)
+
+    def lazy(self, t):
+        return Sampled(self, t)
+
+class Sampled:
+    '''
+    Sampled(waveform, t)
+
+    Class holding a waveform on a sampling grid (t) that is only generated the first
+    time its values are used.
+    '''
+    def __init__(self, waveform, t):
+        self.waveform = waveform
+        self.t = t
+        self.y = None #the values, once generated
+
+    def __len__(self):
+        return len(self.t)
+
+    @property
+    def values(self):
+        if self.y is None:
+            self.y = self.waveform(self.t) #generates the waveform on first use
+        return self.y
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.values, dtype=dtype)
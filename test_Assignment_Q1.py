@@ -0,0 +1,56 @@
+'''
+Regression tests for the float neighbours and rounding ranges in Assignment_Q1,
+compared against numpy's nextafter and spacing.
+'''
+import warnings
+import numpy as np
+import pytest
+import Assignment_Q1 as Q1
+
+types = [np.float16, np.float32, np.float64]
+
+def values(dtype):
+    info = np.finfo(dtype)
+    r = np.array([0.25, 1, 3.5, 1e-3, 1000, info.tiny, info.tiny/8, info.smallest_subnormal, info.max], dtype=dtype)
+    return np.concatenate((r, -r))
+
+@pytest.mark.parametrize('dtype', types)
+def test_nearArray_matches_nextafter(dtype):
+    r = values(dtype)
+    upper, lower, fracRange = Q1.nearArray(r, dtype)
+    assert upper.dtype == dtype and lower.dtype == dtype
+    with np.errstate(over='ignore'):
+        assert np.array_equal(upper, np.nextafter(r, np.copysign(np.inf, r).astype(dtype)))
+        assert np.array_equal(lower, np.nextafter(r, np.zeros_like(r)))
+        spacing = (np.spacing(np.abs(r)).astype(np.float64) + np.abs(r - lower).astype(np.float64))/2
+    finite = np.abs(r) < np.finfo(dtype).max
+    assert np.allclose(fracRange[finite], (spacing/np.abs(r.astype(np.float64)))[finite], rtol=1e-12, atol=0)
+
+@pytest.mark.parametrize('dtype', types)
+def test_ulp_matches_spacing(dtype):
+    r = values(dtype)[:-1] #spacing at max is inf as it is measured upwards
+    r = r[np.abs(r) < np.finfo(dtype).max]
+    assert np.array_equal(Q1.ulp(r, dtype), np.spacing(np.abs(r)))
+    assert Q1.ulp(0, dtype) == np.finfo(dtype).smallest_subnormal
+
+@pytest.mark.parametrize('dtype', types)
+def test_largest_value_does_not_warn(dtype):
+    info = np.finfo(dtype)
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        upper, lower, fracRange = Q1.nearArray([info.max, -info.max, 0], dtype)
+    assert np.array_equal(upper[:2], [np.inf, -np.inf]) and lower[0] == np.nextafter(info.max, dtype(0))
+    assert np.isnan(upper[2]) and np.isnan(lower[2]) and np.isnan(fracRange[2]) #no range around zero
+
+def test_small_float16_ranges_do_not_underflow():
+    r = np.array([1e-7, 6e-8, 1e-5, 6.1e-5], dtype=np.float16) #subnormal and just normal
+    fracRange = Q1.nearArray(r, np.float16)[2]
+    assert np.all(np.isfinite(fracRange)) and np.all(fracRange > 0)
+    assert np.allclose(fracRange, np.spacing(r).astype(np.float64)/r.astype(np.float64), rtol=1e-12)
+
+def test_question_values():
+    upper, lower, fracRange = Q1.near(0.25)
+    assert upper == 0.25 + 2**-54 and lower == 0.25 - 2**-55
+    assert fracRange == 3*2**-54 #half of the spacings above and below, as a fraction of 0.25
+    Q1.nearCheck(0.25)
+    Q1.nearCheck(1e-310)
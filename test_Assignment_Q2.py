@@ -0,0 +1,389 @@
+'''
+Regression tests for the linear algebra in Assignment_Q2, compared against
+numpy and scipy.
+'''
+import numpy as np
+import scipy.linalg as spl
+import scipy.sparse as spsp
+import scipy.sparse.linalg as spsl
+import scipy.sparse.csgraph as spcg
+import pytest
+import Assignment_Q2 as Q2
+import Instrument
+
+@pytest.fixture
+def unchecked():
+    '''
+    Switches the Q2 check functions off for the test, as their absolute 1e-14
+    tolerances are only meant for the small matrix in the question.
+    '''
+    saved = dict(Q2.Check)
+    Q2.setCheck('off')
+    yield
+    Q2.setCheck(**saved)
+    Q2.Metrics.reset()
+
+def matrix(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n,n)) + np.sqrt(n)*np.eye(n) #well conditioned
+
+def close(x, y, rtol=1e-12):
+    return np.max(np.abs(x-y)) <= rtol*max(1.0, np.max(np.abs(y)))
+
+def test_LU_question_matrix():
+    L, U, Res = Q2.LU(Q2.A)
+    assert np.allclose(np.tril(Res,-1), np.tril(L,-1)) and np.allclose(np.triu(Res), U)
+    assert np.allclose(L.dot(U), Q2.A, rtol=0, atol=1e-13)
+    assert np.allclose(np.diag(U), [3, 8, 16, 44.75, 41.44692737]) #the printed result for (a)
+
+@pytest.mark.parametrize('n, bs', [(1, 64), (7, 3), (100, 16), (130, 64), (200, 200)])
+def test_LU_pivot_matches_scipy(unchecked, n, bs):
+    A = np.random.default_rng(n).standard_normal((n,n))
+    L, U, Res, P = Q2.LU(A, pivot=True, bs=bs)
+    Ps, Ls, Us = spl.lu(A) #A = Ps.Ls.Us
+    assert np.array_equal(A[P], Ps.T.dot(A)) #the same row swaps
+    assert close(L, Ls) and close(U, Us)
+
+def test_LU_blocking_does_not_change_result(unchecked):
+    A = matrix(150)
+    L1, U1, Res1 = Q2.LU(A, bs=150) #unblocked
+    for bs in (1, 8, 64):
+        L, U, Res = Q2.LU(A, bs=bs)
+        assert close(Res, Res1, 1e-13)
+
+def test_LU_singular_matrix_finishes():
+    L, U, Res, P = Q2.LU([[1,2],[2,4]], pivot=True)
+    assert U[1][1] == 0
+    assert Q2.dt(np.array([[1.,2],[2,4]])) == 0
+    assert Q2.dt(np.zeros((3,3))) == 0
+
+def test_LU_zero_pivot_without_pivoting_raises():
+    with pytest.raises(TypeError):
+        Q2.LU([[0.,1],[1,0]])
+
+def test_LUFactor_solve_det_inv_match_scipy(unchecked):
+    A = matrix(60)
+    F = Q2.LUFactor(A)
+    b = np.random.default_rng(1).standard_normal(60)
+    B = np.random.default_rng(2).standard_normal((60, 7))
+    assert close(F.solve(b), spl.solve(A, b))
+    assert close(F.solve(B), spl.solve(A, B))
+    assert F.det() == pytest.approx(spl.det(A), rel=1e-10)
+    assert close(F.inv(), spl.inv(A))
+
+def test_LUFactor_det_sign_follows_row_swaps():
+    Pm = np.eye(4)[[1, 2, 0, 3]] #a cycle of length 3, two swaps
+    assert Q2.LUFactor(Pm).det() == pytest.approx(1)
+    assert Q2.LUFactor(np.eye(4)[[1, 0, 2, 3]]).det() == pytest.approx(-1)
+
+def test_LUFactor_factorises_once():
+    was = Instrument.on
+    Instrument.enable()
+    Instrument.reset()
+    try:
+        F = Q2.LUFactor(Q2.A)
+        F.solve(Q2.b), F.det(), F.inv()
+        assert Instrument.tallies['LU']['calls'] == 1
+    finally:
+        Instrument.reset()
+        Instrument.on = was
+
+def test_question_answers():
+    assert np.allclose(Q2.solve(Q2.A, Q2.b), np.linalg.solve(Q2.A, Q2.b), rtol=0, atol=1e-14)
+    assert Q2.dt(Q2.A) == pytest.approx(np.linalg.det(Q2.A), rel=1e-12)
+    assert np.allclose(Q2.inv(Q2.A), np.linalg.inv(Q2.A), rtol=0, atol=1e-14)
+
+@pytest.fixture
+def policy():
+    saved = dict(Q2.Check)
+    Q2.Metrics.reset()
+    yield Q2.setCheck
+    Q2.setCheck(**saved)
+    Q2.Metrics.reset()
+
+def test_check_policy_modes(policy):
+    with pytest.raises(TypeError):
+        policy('never')
+    policy('off')
+    Q2.dt(Q2.A)
+    assert Q2.Metrics.calls['dt'] == 1 and 'dt' not in Q2.Metrics.runs
+    policy('sampled', every=3)
+    Q2.Metrics.reset()
+    for i in range(7):
+        Q2.dt(Q2.A)
+    assert Q2.Metrics.runs['dt'] == 3 #calls 1, 4 and 7
+    policy('cheap')
+    Q2.solve(Q2.A, Q2.b)
+    assert Q2.Metrics.runs['solve'] == 1 and not Q2.Metrics.failures
+
+def test_check_failure_raises_only_when_strict(policy):
+    x = Q2.solve(Q2.A, Q2.b) + 1e-6
+    for mode in ('always', 'cheap'):
+        policy(mode)
+        with pytest.raises(TypeError):
+            Q2.solveCheck(Q2.A, x, Q2.b)
+        policy(mode, strict=False)
+        Q2.solveCheck(Q2.A, x, Q2.b)
+    assert Q2.Metrics.failures['solve'] == 4
+
+@pytest.mark.parametrize('k', [1, 100, 1000])
+def test_cheap_check_accepts_what_full_check_accepts(policy, k):
+    rng = np.random.default_rng(k)
+    for mode in ('always', 'cheap'):
+        policy(mode, strict=False)
+        for i in range(10):
+            Q2.solve(Q2.A, rng.uniform(-1, 1, (5, k)))
+    assert not Q2.Metrics.failures
+
+def banded(n, l, u, seed=0):
+    rng = np.random.default_rng(seed)
+    A = np.zeros((n,n))
+    for k in range(-l, u+1):
+        A += np.diag(rng.standard_normal(n-abs(k)), k)
+    return A + (l+u+2)*np.eye(n) #diagonally dominant, so no pivoting is needed
+
+@pytest.mark.parametrize('l, u', [(1, 1), (2, 2), (1, 3), (0, 2)])
+def test_Banded_storage_and_solve(l, u):
+    A = banded(40, l, u)
+    B = Q2.Banded.fromDense(A, l, u)
+    assert np.array_equal(B.dense(), A)
+    x = np.random.default_rng(3).standard_normal((40, 3))
+    assert close(B.dot(x), A.dot(x))
+    ab = np.zeros((l+u+1, 40)) #scipy's banded storage, one diagonal per row
+    for k in range(-l, u+1):
+        ab[u-k, max(0,k):40+min(0,k)] = np.diagonal(A, k)
+    b = A.dot(x)
+    assert close(Q2.solveBanded(B, b), spl.solve_banded((l, u), ab, b))
+    assert close(Q2.solveBanded(B, b[:,0]), spl.solve_banded((l, u), ab, b[:,0]))
+
+def test_Banded_tri():
+    T = Q2.Banded.tri([1, 2], [4, 5, 6], [7, 8])
+    assert np.array_equal(T.dense(), [[4, 7, 0], [1, 5, 8], [0, 2, 6]])
+    assert close(Q2.solve(T, [1., 2, 3]), np.linalg.solve(T.dense(), [1., 2, 3]))
+
+def test_Banded_zero_pivot_raises():
+    with pytest.raises(TypeError):
+        Q2.solveBanded(Q2.Banded.tri([1], [0, 1], [1]), [1., 1])
+
+
+def scattered(n, seed=0):
+    rng = np.random.default_rng(seed) #a diagonally dominant banded matrix with its rows and columns shuffled
+    A = banded(n, 2, 3, seed)
+    p = rng.permutation(n)
+    return A[p][:,p]
+
+def sparse(A):
+    return spsp.csr_matrix(A)
+
+def bandwidth(A):
+    rows, cols = np.nonzero(A)
+    return np.max(np.abs(rows-cols))
+
+def test_CSR_storage_matches_scipy():
+    rows, cols, vals = [0, 2, 1, 0, 2, 0], [1, 2, 0, 1, 0, 3], [1., 2, 3, 4, 5, 6]
+    A = Q2.CSR.fromCOO(rows, cols, vals, (3, 4)) #(0, 1) is given twice so is added
+    S = spsp.csr_matrix((vals, (rows, cols)), shape=(3, 4))
+    S.sum_duplicates()
+    assert np.array_equal(A.data, S.data) and np.array_equal(A.indices, S.indices) and np.array_equal(A.indptr, S.indptr)
+    assert A.nnz == 5 and np.array_equal(A.dense(), S.toarray())
+    assert np.array_equal(A.transpose().dense(), S.toarray().T)
+    x = np.random.default_rng(0).standard_normal((4, 2))
+    assert close(A.dot(x), S.dot(x)) and close(A.dot(x[:,0]), S.dot(x[:,0]))
+
+def test_CSR_from_dense_and_banded():
+    A = banded(30, 1, 2)
+    assert np.array_equal(Q2.CSR.fromDense(A).dense(), A)
+    assert np.array_equal(Q2.CSR.fromBanded(Q2.Banded.fromDense(A, 1, 2)).dense(), A)
+    Z = np.zeros((4, 4))
+    Z[2, 1] = 1 #rows with no elements
+    assert np.array_equal(Q2.CSR.fromDense(Z).dot(np.ones(4)), [0, 0, 1, 0])
+
+def test_CSR_permute():
+    A = matrix(10)
+    p = np.random.default_rng(1).permutation(10)
+    assert np.array_equal(Q2.CSR.fromDense(A).permute(p).dense(), A[p][:,p])
+
+def test_rcm_recovers_narrow_band():
+    A = scattered(300)
+    p = Q2.rcm(Q2.CSR.fromDense(A))
+    assert np.array_equal(np.sort(p), np.arange(300))
+    assert bandwidth(A[p][:,p]) <= 2*bandwidth(banded(300, 2, 3)) < bandwidth(A)
+    ps = spcg.reverse_cuthill_mckee(sparse(A + A.T), symmetric_mode=True)
+    assert bandwidth(A[p][:,p]) <= bandwidth(A[ps][:,ps]) + 2 #about as good as scipy's
+
+def test_rcm_separate_parts():
+    A = np.eye(6)
+    A[0, 5] = A[5, 0] = A[2, 3] = 1
+    p = Q2.rcm(Q2.CSR.fromDense(A))
+    assert sorted(p.tolist()) == list(range(6))
+    assert bandwidth(A[p][:,p]) == 1
+
+@pytest.mark.parametrize('n', [5, 40, 300])
+@pytest.mark.parametrize('ordering', ['rcm', None])
+def test_SparseLU_matches_scipy(unchecked, n, ordering):
+    A = scattered(n, n)
+    F = Q2.SparseLU(Q2.CSR.fromDense(A), ordering=ordering)
+    assert close(F.L.dot(F.U.dense()), A[F.P][:,F.P])
+    b = np.random.default_rng(2).standard_normal((n, 3))
+    assert close(F.solve(b), spsl.spsolve(sparse(A).tocsc(), b).reshape(n, 3))
+    assert close(F.solve(b[:,0]), np.linalg.solve(A, b[:,0]))
+    assert F.det() == pytest.approx(np.linalg.det(A), rel=1e-10)
+    assert close(F.inv(), np.linalg.inv(A))
+
+def poisson(m):
+    T = 4*np.eye(m) - np.eye(m, k=1) - np.eye(m, k=-1)
+    return np.kron(np.eye(m), T) - np.kron(np.eye(m, k=1) + np.eye(m, k=-1), np.eye(m)) #the 2-D Laplacian on an m x m grid
+
+def test_SparseLU_level_substitution_matches_row_substitution(unchecked):
+    m = 100 #ILU(0) of a large grid has levels of many rows
+    G = spsp.kronsum(spsp.diags([-1., 2, -1], [-1, 0, 1], (m, m)), spsp.diags([-1., 2, -1], [-1, 0, 1], (m, m))).tocoo()
+    A = Q2.CSR.fromCOO(G.row, G.col, G.data, G.shape)
+    F = Q2.SparseLU(A, ordering=None, fill=False)
+    b = np.random.default_rng(3).standard_normal(m*m)
+    x = F.solve(b)
+    assert F.levels[0] is not None and F.levels[1] is not None
+    F.levels = (None, None) #forces one row at a time
+    assert close(F.solve(b), x)
+
+def test_ILU0_keeps_pattern_and_matches_on_it():
+    A = poisson(10)
+    F = Q2.SparseLU(Q2.CSR.fromDense(A), ordering=None, fill=False)
+    LU = F.L.dense().dot(F.U.dense())
+    pattern = A != 0
+    assert np.array_equal((F.L.dense() + F.U.dense()) != 0, pattern)
+    assert close(LU[pattern], A[pattern]) #ILU(0) is exact on the pattern of A
+    assert np.max(np.abs(LU - A)) > 0 #the fill-in dropped
+
+def test_sparse_solve_through_solve():
+    A = scattered(50)
+    b = np.ones(50)
+    assert close(Q2.solve(Q2.CSR.fromDense(A), b), np.linalg.solve(A, b))
+
+def test_SparseLU_errors():
+    with pytest.raises(TypeError):
+        Q2.SparseLU(Q2.CSR.fromDense(np.eye(3)), ordering='amd')
+    with pytest.raises(TypeError):
+        Q2.SparseLU(Q2.CSR.fromDense([[0., 1], [1, 0]]), ordering=None)
+
+@pytest.fixture
+def parallel(monkeypatch, unchecked):
+    monkeypatch.setattr(Q2, 'parallelSize', 1) #splits even small right-hand sides
+    calls = []
+    split = Q2.LUFactor.solveParallel
+    monkeypatch.setattr(Q2.LUFactor, 'solveParallel', lambda self, b, workers, pool: calls.append((workers, pool)) or split(self, b, workers, pool))
+    return calls
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+@pytest.mark.parametrize('workers, k', [(2, 7), (3, 3), (4, 2)])
+def test_parallel_solve_matches_serial(parallel, pool, workers, k):
+    A = matrix(50)
+    B = np.random.default_rng(k).standard_normal((50, k))
+    F = Q2.LUFactor(A)
+    x = F.solve(B, workers=workers, pool=pool)
+    assert parallel == [(min(workers, k), pool)]
+    assert close(x, F.solve(B, workers=1), 1e-13) and close(x, spl.solve(A, B))
+
+@pytest.mark.parametrize('pool', ['thread', 'process'])
+def test_parallel_solve_keeps_factor_type(parallel, pool):
+    F = Q2.LUFactor(matrix(30), dtype=np.float32)
+    x = F.solve(np.ones((30, 4)), workers=2, pool=pool)
+    assert parallel and x.dtype == np.float32
+    assert np.allclose(x, np.linalg.solve(matrix(30), np.ones((30, 4))), rtol=0, atol=1e-5)
+
+def test_parallel_inv_and_solve(parallel):
+    A = matrix(40)
+    assert close(Q2.inv(A, workers=2), spl.inv(A))
+    assert close(Q2.solve(A, np.eye(40)[:,:5], workers=2, pool='process'), spl.inv(A)[:,:5])
+    assert [pool for workers, pool in parallel] == ['thread', 'process']
+
+def test_small_or_single_solutions_stay_serial(parallel, monkeypatch):
+    F = Q2.LUFactor(matrix(20))
+    F.solve(np.ones(20), workers=4) #one solution
+    F.solve(np.ones((20, 3)), workers=1)
+    monkeypatch.setattr(Q2, 'parallelSize', 2**18)
+    F.solve(np.ones((20, 8)), workers=4) #too small to be worth splitting
+    assert parallel == []
+
+def test_invalid_pool_raises_before_solving():
+    F = Q2.LUFactor(Q2.A)
+    with pytest.raises(TypeError):
+        F.solve(Q2.b, pool='gpu')
+    with pytest.raises(TypeError):
+        F.inv(pool='cluster')
+
+def systems(m, n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((m, n, n)) + n*np.eye(n), rng.standard_normal((m, n))
+
+@pytest.mark.parametrize('m, n', [(1, 1), (100, 5), (1000, 3), (20, 12)])
+@pytest.mark.parametrize('pivot', [True, False])
+def test_BatchLU_matches_numpy(unchecked, m, n, pivot):
+    A, b = systems(m, n, m*n)
+    x, det, singular = Q2.solveBatch(A, b, pivot=pivot)
+    assert close(x, np.linalg.solve(A, b[...,None])[...,0])
+    assert np.allclose(det, np.linalg.det(A), rtol=1e-10, atol=0)
+    assert not singular.any()
+
+def test_BatchLU_pivots_like_LU():
+    A = np.random.default_rng(4).standard_normal((30, 6, 6)) #pivoting is needed
+    F = Q2.BatchLU(A)
+    for k in range(30):
+        L = np.tril(F.Res[k], -1) + np.eye(6)
+        assert close(L.dot(np.triu(F.Res[k])), A[k][F.P[k]])
+        assert np.array_equal(F.P[k], Q2.LU(A[k], pivot=True)[3])
+
+def test_BatchLU_flags_singular_systems(policy):
+    A, b = systems(5, 4)
+    A[1] = 0
+    A[3][2] = A[3][0] #repeated row
+    policy('always')
+    x, det, singular = Q2.solveBatch(A, b)
+    assert list(singular) == [False, True, False, True, False]
+    assert np.all(np.isnan(x[singular])) and not np.any(np.isnan(x[~singular]))
+    assert det[1] == 0 and det[3] == pytest.approx(0, abs=1e-12)
+    assert close(x[~singular], np.linalg.solve(A[~singular], b[~singular][...,None])[...,0])
+    assert not Q2.Metrics.failures #singular systems are left out of the check
+
+def test_BatchLU_det_sign_follows_row_swaps():
+    P = np.array([np.eye(3)[[1, 2, 0]], np.eye(3)[[1, 0, 2]], np.eye(3)])
+    assert np.allclose(Q2.BatchLU(P).det, [1, -1, 1])
+
+def test_BatchLU_needs_square_stack():
+    with pytest.raises(TypeError):
+        Q2.BatchLU(np.ones((3, 3)))
+    with pytest.raises(TypeError):
+        Q2.BatchLU(np.ones((2, 3, 4)))
+
+@pytest.mark.parametrize('n, k', [(1, 0), (50, 0), (200, 0), (100, 5)])
+def test_solveMixed_matches_scipy(unchecked, n, k):
+    A = matrix(n, n)
+    b = np.random.default_rng(5).standard_normal((n, k) if k else n)
+    x, info = Q2.solveMixed(A, b)
+    assert close(x, spl.solve(A, b)) and x.dtype == np.float64
+    assert not info['fallback'] and info['iterations'] <= 3
+    assert info['backwardError'] <= np.sqrt(n)*np.finfo(float).eps
+    assert all(a > b for a, b in zip(info['history'], info['history'][1:])) #the error falls every iteration
+    assert close(Q2.solve(A, b, mixed=True), x, 0)
+
+def test_solveMixed_falls_back_when_ill_conditioned(unchecked):
+    A = spl.hilbert(10) #too ill-conditioned for float32 refinement to converge
+    b = A.dot(np.ones(10))
+    x, info = Q2.solveMixed(A, b)
+    assert info['fallback'] and info['iterations'] <= 10
+    assert info['backwardError'] <= 4*np.finfo(float).eps #the float64 solve is backward stable
+    assert info['history'][0] > 1e-10 #the float32 solve was far off
+
+def test_solveMixed_falls_back_when_float32_overflows(unchecked):
+    A = np.diag([1e300, 1.0]) #outside the range of float32
+    x, info = Q2.solveMixed(A, np.array([1e300, 2.0]))
+    assert info['fallback'] and info['iterations'] == 0 and np.array_equal(x, [1, 2])
+
+def test_solveMixed_zero_b():
+    x, info = Q2.solveMixed(Q2.A, np.zeros(5))
+    assert np.array_equal(x, np.zeros(5)) and info['backwardError'] == 0 and not info['fallback']
+    x, info = Q2.solveMixed(Q2.A, np.zeros((5, 2)))
+    assert np.array_equal(x, np.zeros((5, 2))) and info['backwardError'] == 0
+
+def test_solveMixed_question():
+    x, info = Q2.solveMixed(Q2.A, Q2.b)
+    assert np.allclose(x, np.linalg.solve(Q2.A, Q2.b), rtol=0, atol=1e-14) and not info['fallback']
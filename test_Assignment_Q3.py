@@ -0,0 +1,114 @@
+'''
+Regression tests for the interpolation models in Assignment_Q3, compared against
+scipy.
+'''
+import numpy as np
+import pytest
+from scipy.interpolate import BarycentricInterpolator, CubicSpline
+import Assignment_Q3 as Q3
+
+def test_CubicSplineModel_two_points_is_a_line():
+    s = Q3.CubicSplineModel([0, 2], [1, 5])
+    assert np.array_equal(s.diffs, [0, 0])
+    assert np.allclose(s([0, 0.5, 2, 3]), [1, 2, 5, 7])
+
+def test_CubicSplineModel_needs_two_points():
+    with pytest.raises(TypeError):
+        Q3.CubicSplineModel([1], [1])
+
+def knots(kind, n, seed=0):
+    if kind == 'even':
+        return np.linspace(-2, 3, n)
+    if kind == 'random':
+        x = np.sort(np.random.default_rng(seed).uniform(-2, 3, n))
+        x[0], x[-1] = -2, 3
+        return x
+    return np.geomspace(1, 1e4, n) #crowded at the start, so the binary search is used
+
+@pytest.mark.parametrize('kind', ['even', 'random', 'crowded'])
+@pytest.mark.parametrize('n', [3, 15, 1000])
+def test_CubicSplineModel_matches_scipy(kind, n):
+    x = knots(kind, n)
+    y = np.sin(x)
+    t = np.concatenate([np.random.default_rng(1).uniform(x[0]-1, x[-1]+1, 5000), x]) #includes the knots and values outside them
+    s = Q3.CubicSplineModel(x, y)
+    ref = CubicSpline(x, y, bc_type='natural')(t)
+    assert np.allclose(s(t), ref, rtol=1e-10, atol=1e-10*np.max(np.abs(y)))
+    assert np.array_equal(s.interval(t), np.clip(np.searchsorted(x, t)-1, 0, n-2))
+
+def test_CubicSplineModel_shapes():
+    s = Q3.CubicSplineModel([0, 1, 2, 3], [0, 1, 0, 1])
+    assert np.shape(s(1.5)) == ()
+    assert s(np.zeros((2, 3))).shape == (2, 3)
+    assert s(1.0) == pytest.approx(1.0, abs=1e-15) #passes through the knots
+
+def test_CubSplineTest():
+    Q3.CubSplineTest() #raises if the spline is far from the cubic it samples
+
+def test_LagrangeModel_one_point_is_constant():
+    assert np.array_equal(Q3.LagrangeModel([2], [3])([0, 2, 5]), [3, 3, 3])
+
+@pytest.mark.parametrize('n', [2, 5, 40])
+def test_LagrangeModel_matches_scipy(n):
+    x = np.cos(np.pi*(np.arange(n)+0.5)/n)*3 + 1 #Chebyshev points, where high degrees are stable
+    y = np.exp(-x)
+    t = np.linspace(-2, 4, 777)
+    assert np.allclose(Q3.LagrangeModel(x, y)(t), BarycentricInterpolator(x, y)(t), rtol=1e-9, atol=1e-12)
+    assert np.array_equal(Q3.LagrangeModel(x, y)(x), y) #exact at the data points
+
+def test_LagrangeModel_large_n_does_not_overflow():
+    n = 2000
+    x = np.cos(np.pi*(np.arange(n)+0.5)/n)*50
+    m = Q3.LagrangeModel(x, np.sin(x/10))
+    assert np.all(np.isfinite(m.w)) and np.any(m.w != 0)
+    t = np.linspace(-40, 40, 101)
+    assert np.allclose(m(t), np.sin(t/10), atol=1e-10)
+
+def test_LagrangeModel_add_matches_rebuild():
+    x, y = Q3.x, Q3.y
+    m = Q3.LagrangeModel(x[:5], y[:5])
+    for k in range(5, len(x)):
+        m.add(x[k], y[k])
+    t = np.linspace(-0.75, 1.5, 300)
+    ref = Q3.LagrangeModel(x, y)(t)
+    assert np.allclose(m(t), ref, rtol=0, atol=1e-10*np.max(np.abs(ref))) #the weights are found in a different order
+
+def test_LagrangeModel_add_duplicate_raises():
+    m = Q3.LagrangeModel([0, 1, 2], [1, 2, 0])
+    w = m.w.copy()
+    with pytest.raises(TypeError):
+        m.add(1, 5)
+    assert np.array_equal(m.w, w) and len(m.x) == 3 #the model is unchanged
+
+def test_LagInt_question_data():
+    t = np.linspace(-0.75, 1.5, 1000)
+    assert np.allclose(Q3.LagInt(t, Q3.x, Q3.y), BarycentricInterpolator(Q3.x, Q3.y)(t), rtol=1e-9, atol=1e-9)
+
+@pytest.fixture(params=['spline', 'lagrange'])
+def model(request):
+    if request.param == 'spline':
+        return Q3.CubicSplineModel(Q3.x, Q3.y)
+    return Q3.LagrangeModel(Q3.x, Q3.y)
+
+def test_chunks_of_arrays_and_iterables():
+    t = np.arange(10.)
+    for source in (t, iter(t.tolist()), (v for v in t)):
+        parts = list(Q3.chunks(source, 4))
+        assert [len(p) for p in parts] == [4, 4, 2]
+        assert np.array_equal(np.concatenate(parts), t)
+    assert list(Q3.chunks(np.zeros(0), 4)) == []
+
+def test_evalStream_matches_direct(model):
+    t = np.linspace(-0.75, 1.5, 1001)
+    assert np.array_equal(np.concatenate(list(Q3.evalStream(model, t, chunk=64))), model(t))
+
+def test_evalInto_memmap(model, tmp_path):
+    t = np.linspace(-0.75, 1.5, 1001)
+    out = np.memmap(tmp_path/'out.dat', dtype=float, mode='w+', shape=len(t))
+    assert Q3.evalInto(model, t, out, chunk=100) is out
+    assert np.array_equal(np.fromfile(tmp_path/'out.dat'), model(t)) #flushed to disk
+
+@pytest.mark.parametrize('size', [999, 1003])
+def test_evalInto_wrong_length_raises(model, size):
+    with pytest.raises(TypeError):
+        Q3.evalInto(model, np.linspace(-0.75, 1.5, 1001), np.zeros(size), chunk=100)
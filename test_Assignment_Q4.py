@@ -0,0 +1,121 @@
+'''
+Regression tests for the FFT convolution in Assignment_Q4, compared against the
+direct convolution in numpy.
+'''
+import numpy as np
+import pytest
+import Assignment_Q4 as Q4
+import Instrument
+
+def close(x, y, rtol=1e-12):
+    return np.max(np.abs(x-y)) <= rtol*max(1.0, np.max(np.abs(y)))
+
+@pytest.mark.parametrize('n', [1, 2, 41, 97, 1000, 4001, 65536])
+def test_fastLen(n):
+    m = Q4.fastLen(n)
+    assert m >= n
+    while m % 2 == 0 or m % 3 == 0 or m % 5 == 0:
+        m = m//2 if m % 2 == 0 else m//3 if m % 3 == 0 else m//5
+    assert m == 1 #a product of 2, 3 and 5 only
+    p = Q4.fastLen(n, pow2=True)
+    assert p >= n and p & (p-1) == 0 and p < 2*max(n, 1)
+
+@pytest.mark.parametrize('n1, n2', [(1, 1), (1, 7), (41, 41), (100, 7), (4001, 4001), (1000, 3)])
+@pytest.mark.parametrize('pow2', [False, True])
+def test_fftConv_matches_direct_convolution(n1, n2, pow2):
+    rng = np.random.default_rng(n1*n2)
+    s1, s2 = rng.standard_normal(n1), rng.standard_normal(n2)
+    c = Q4.fftConv(s1, s2, dt=0.5, pow2=pow2)
+    assert len(c) == n1+n2-1
+    assert close(c, 0.5*np.convolve(s1, s2))
+
+def test_fftConv_is_linear_not_circular():
+    s = np.zeros(8)
+    s[-1] = 1 #the last sample would wrap around to the start in a circular convolution
+    c = Q4.fftConv(s, s)
+    assert np.allclose(c, np.eye(15)[14], rtol=0, atol=1e-15)
+
+def test_spectrum_cache_reuses_transforms():
+    was, saved = Instrument.on, Q4.spectra.copy()
+    Instrument.enable()
+    Instrument.reset()
+    Q4.spectra.clear()
+    try:
+        s1, s2 = np.arange(10.), np.ones(5)
+        Q4.fftConv(s1, s2)
+        Q4.fftConv(s1, s2)
+        assert Instrument.tallies['fft']['calls'] == 4 #two forward transforms then one inverse per call
+        assert len(Q4.spectra) == 2
+    finally:
+        Instrument.reset()
+        Instrument.on = was
+        Q4.spectra.clear()
+        Q4.spectra.update(saved)
+
+def test_spectrum_cache_is_bounded():
+    saved = Q4.spectra.copy()
+    Q4.spectra.clear()
+    try:
+        for k in range(Q4.spectraSize + 5):
+            Q4.spectrum(np.full(3, float(k)), 8)
+        assert len(Q4.spectra) == Q4.spectraSize
+        assert np.array_equal(Q4.spectrum(np.full(3, 5.), 8), np.fft.rfft(np.full(3, 5.), 8))
+    finally:
+        Q4.spectra.clear()
+        Q4.spectra.update(saved)
+
+@pytest.mark.parametrize('n', [41, 4001])
+def test_conv_matches_direct_convolution_on_question_grid(n):
+    t = np.linspace(-20, 20, n)
+    dt = t[1]-t[0]
+    full = dt*np.convolve(Q4.gauss(t), Q4.tophat(t)) #starts at time 2*t[0]
+    assert close(Q4.conv(t)[4], full[(n-1)//2:(n-1)//2+n])
+
+def test_conv_approaches_exact():
+    t = np.linspace(-20, 20, 4001)
+    assert np.max(np.abs(Q4.conv(t)[4] - Q4.exact(t))) < 0.05 #the tophat edges are only resolved to dt
+
+def chunked(x, sizes):
+    i = 0
+    while i < len(x):
+        for k in sizes:
+            yield x[i:i+k]
+            i = i + k
+
+@pytest.mark.parametrize('method', ['add', 'save'])
+@pytest.mark.parametrize('m, block', [(1, 4), (5, 4), (9, 3), (64, 1024), (300, 128)])
+@pytest.mark.parametrize('sizes', [[1], [7, 300, 2], [5000]])
+def test_StreamConv_matches_direct_convolution(method, m, block, sizes):
+    rng = np.random.default_rng(m*block)
+    kernel, x = rng.standard_normal(m), rng.standard_normal(2000)
+    S = Q4.StreamConv(kernel, block=block, method=method, dt=0.25)
+    y = np.concatenate(list(S.stream(chunked(x, sizes))))
+    assert len(y) == len(x)+m-1
+    assert close(y, 0.25*np.convolve(x, kernel))
+
+@pytest.mark.parametrize('method', ['add', 'save'])
+def test_StreamConv_push_outputs_one_sample_per_full_block(method):
+    S = Q4.StreamConv(np.ones(3), block=4, method=method)
+    assert len(S.push(np.ones(3))) == 0
+    assert len(S.push(np.ones(6))) == 8
+    assert len(S.flush()) == 1+2
+
+@pytest.mark.parametrize('method', ['add', 'save'])
+def test_StreamConv_empty_stream(method):
+    S = Q4.StreamConv(Q4.gauss(np.linspace(-20, 20, 41)), block=16, method=method)
+    assert S.flush().shape == (0,)
+    assert np.concatenate(list(S.stream([]))).shape == (0,)
+    S.push([])
+    assert S.flush().shape == (0,)
+
+@pytest.mark.parametrize('method', ['add', 'save'])
+def test_StreamConv_restarts_after_flush(method):
+    kernel, x = np.arange(1., 6), np.arange(20.)
+    S = Q4.StreamConv(kernel, block=8, method=method)
+    first = np.concatenate((S.push(x), S.flush()))
+    second = np.concatenate((S.push(x), S.flush()))
+    assert np.array_equal(first, second) and close(first, np.convolve(x, kernel))
+
+def test_StreamConv_invalid_method_raises():
+    with pytest.raises(TypeError):
+        Q4.StreamConv(np.ones(3), method='overlap')
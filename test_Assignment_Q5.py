@@ -0,0 +1,49 @@
+'''
+Regression tests for the impedance divider solvers in Assignment_Q5, compared
+against the analytic solution and against solving one signal at a time.
+'''
+import numpy as np
+import pytest
+import Assignment_Q5 as Q5
+
+def inputs(h, T=2, n=None):
+    t = -2 + h*np.arange(n if n is not None else int(round(10/h))+1)
+    return t, Q5.Vin2(t, T), Q5.Vin2(t+h/2, T)
+
+@pytest.mark.parametrize('method', ['AB4', 'RK4', 'LTI'])
+def test_ImpDiv_batch_matches_single_signals(method):
+    t = inputs(0.05)[0]
+    rows = [inputs(0.05, T) for T in (2, 0.5, 0.3)] + [(t, Q5.Vin1(t), Q5.Vin1(t+0.025))]
+    Vin, Vinh = np.array([r[1] for r in rows]), np.array([r[2] for r in rows])
+    Vout = Q5.ImpDiv(t, Vin, Vinh, method)
+    assert Vout.shape == Vin.shape
+    for k in range(len(rows)):
+        assert np.array_equal(Vout[k], Q5.ImpDiv(t, Vin[k], Vinh[k], method))
+
+@pytest.mark.parametrize('method', ['AB4', 'RK4', 'LTI'])
+def test_ImpDiv_batch_with_a_time_row_per_signal(method):
+    rows = [inputs(h, n=201) for h in (0.1, 0.05, 0.025)] #the same number of samples at each spacing
+    t = np.array([r[0] for r in rows])
+    Vin, Vinh = np.array([r[1] for r in rows]), np.array([r[2] for r in rows])
+    Vout = Q5.ImpDiv(t, Vin, Vinh, method)
+    for k in range(len(rows)):
+        assert np.array_equal(Vout[k], Q5.ImpDiv(t[k], Vin[k], Vinh[k], method))
+
+@pytest.mark.parametrize('method', ['AB4', 'RK4', 'LTI'])
+def test_ImpDiv_follows_the_analytic_decay(method):
+    t = np.arange(0, 10+0.0125, 0.025)
+    Vout = Q5.ImpDiv(t, np.zeros(len(t)), np.zeros(len(t)), method) #no input so Vout decays from 1
+    assert np.max(np.abs(Vout - Q5.Vout1(t))) < 1e-7 #the fourth order error at h = 0.025
+
+@pytest.mark.parametrize('method', ['AB4', 'RK4'])
+@pytest.mark.parametrize('n', [2, 3, 4, 5])
+def test_ImpDiv_short_inputs(method, n):
+    t, Vin, Vinh = inputs(0.1, n=n)
+    Vout = Q5.ImpDiv(t, Vin, Vinh, method)
+    assert Vout.shape == (n,) and Vout[0] == 1
+    assert np.array_equal(Q5.ImpDiv(t, [Vin, Vin], [Vinh, Vinh], method), [Vout, Vout])
+
+def test_ImpDiv_invalid_method_raises():
+    t, Vin, Vinh = inputs(0.1)
+    with pytest.raises(TypeError):
+        Q5.ImpDiv(t, Vin, Vinh, 'Euler')
@@ -0,0 +1,72 @@
+'''
+Regression tests for the benchmark suite in Benchmark: the sweeps and fits, the
+history file, and that each kernel agrees with its reference implementation.
+'''
+import numpy as np
+import pytest
+import Benchmark
+import Assignment_Q2 as Q2
+
+def test_sizes_are_log_spaced():
+    n = Benchmark.sizes(1e2, 1e6, 5)
+    assert n == [100, 1000, 10000, 100000, 1000000]
+    assert Benchmark.sizes(32, 1024, 6) == sorted(set(Benchmark.sizes(32, 1024, 6)))
+    assert Benchmark.sizes(4, 4, 3) == [4] #repeated sizes are removed
+
+def test_exponent_fits_power_law():
+    n = np.array([1e3, 1e4, 1e5])
+    assert Benchmark.exponent(n, 1e-9*n**1.5) == pytest.approx(1.5, rel=1e-10)
+    assert Benchmark.exponent(n, [1e-6, 1e-3, 1e-1]) == pytest.approx(np.polyfit(np.log(n[1:]), np.log([1e-3, 1e-1]), 1)[0])
+    assert Benchmark.exponent(n, [1e-6, 1e-5, 1e-3]) is None #only one time above the floor
+
+def test_measure_counts_blocks_left_allocated():
+    kept = []
+    best, peak, blocks = Benchmark.measure(lambda n: np.ones(n).sum(), (100000,), budget=0)
+    assert best > 0 and peak >= 8*100000 and blocks < 50
+    best, peak, blocks = Benchmark.measure(lambda n: kept.extend(np.ones(10) for i in range(n)), (200,), budget=0)
+    assert blocks >= 200 #the arrays kept alive by the call
+
+def test_run_restores_check_policy():
+    saved = dict(Q2.Check)
+    record = Benchmark.run(['dt'], quick=True, budget=0)
+    assert Q2.Check == saved
+    res = record['cases']['dt']
+    assert res['sizes'] == Benchmark.sizes(32, 256, 4) and len(res['time']) == len(res['sizes'])
+    assert set(res['reference']) == {'sizes', 'time', 'peak', 'blocks', 'exponent'}
+
+def record(times, quick=True):
+    return {'quick': quick, 'cases': {'LU': {'sizes': [10, 20, 40], 'time': times}}}
+
+def test_history_and_regressions(tmp_path):
+    path = str(tmp_path / 'history.json')
+    assert Benchmark.load(path) == []
+    Benchmark.save(record([1, 2, 4]), path)
+    Benchmark.save(record([1, 1, 1], quick=False), path)
+    Benchmark.save(record([1.1, 2.2, 4.4]), path)
+    runs = Benchmark.load(path)
+    assert len(runs) == 3 and Benchmark.regressions(runs) == {}
+    Benchmark.save(record([2, 4, 8]), path)
+    assert Benchmark.regressions(Benchmark.load(path)) == {'LU': pytest.approx(2/1.1)} #against the last quick run
+    assert Benchmark.regressions([record([5, 5, 5])]) == {}
+
+agree = {'solve': 1e-10, 'mixed': 1e-10, 'inv': 1e-10, 'dt': 1e-10, 'batch': 1e-10, 'sparse': 1e-10,
+         'cg': 1e-6, 'LagInt': 1e-10, 'CubSpline': 1e-10} #the cases whose kernels output the same as the reference
+
+@pytest.mark.parametrize('case', [case for case in Benchmark.cases if case.name in agree], ids=lambda case: case.name)
+def test_kernels_match_references(case):
+    args = case.setup(case.quick[0])
+    out, ref = np.asarray(case.func(*args)), np.asarray(case.reference(*args))
+    assert np.max(np.abs(out-ref)) <= agree[case.name]*max(1, np.max(np.abs(ref)))
+
+def test_conv_matches_reference():
+    case = next(case for case in Benchmark.cases if case.name == 'conv')
+    t = np.linspace(-20, 20, 4001)
+    assert np.allclose(case.func(t)[4], case.reference(t), rtol=0, atol=1e-12)
+
+def test_near_matches_reference():
+    case = next(case for case in Benchmark.cases if case.name == 'near')
+    r = case.setup(1000)[0]
+    upper, lower, fracRange = case.func(r)
+    refUpper, refLower, spacing = case.reference(r)
+    assert np.array_equal(upper, refUpper) and np.array_equal(lower, refLower)
+    assert np.all((fracRange >= spacing/2) & (fracRange <= spacing)) #half the spacings above and below
@@ -0,0 +1,95 @@
+'''
+Regression tests for the on-disk result cache in Cache, using a temporary cache
+directory.
+'''
+import importlib
+import os
+import sys
+import numpy as np
+import pytest
+import Cache
+import Convergence
+import Assignment_Q2 as Q2
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(Cache, 'directory', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
+log = {'calls': []} #kept in a dict, as module level lists are part of the code hash
+
+def compute(n, scale=1):
+    log['calls'].append(n)
+    return {'x': np.arange(n)*scale, 'parts': [np.ones((2, n)), ('label', 3)], 'n': n}
+
+def test_round_trip(cache):
+    log['calls'] = []
+    first = Cache.cached(compute, 5, scale=2)
+    again = Cache.cached(compute, 5, scale=2)
+    assert log['calls'] == [5] #found once
+    assert np.array_equal(again['x'], first['x']) and np.array_equal(again['parts'][0], np.ones((2, 5)))
+    assert again['parts'][1] == ('label', 3) and type(again['parts'][1]) is tuple and again['n'] == 5
+    assert isinstance(again['x'], np.memmap) and not again['x'].flags.writeable #loaded memory-mapped
+
+def test_key_follows_arguments(cache):
+    log['calls'] = []
+    Cache.cached(compute, 5)
+    Cache.cached(compute, 6)
+    Cache.cached(compute, 5, scale=2)
+    Cache.cached(compute, np.int64(5))
+    assert log['calls'] == [5, 6, 5, 5]
+    assert Cache.key(compute, (np.arange(3),), {}) != Cache.key(compute, (np.arange(3.),), {}) #the dtype is part of the key
+    assert Cache.key(compute, (), {'n': 1, 'scale': 2}) == Cache.key(compute, (), {'scale': 2, 'n': 1})
+
+def other(n):
+    log['calls'].append(-n)
+    return n
+
+def test_memo_and_clear(cache):
+    log['calls'] = []
+    memo = Cache.memo(compute)
+    memo(3)
+    memo(3)
+    Cache.cached(other, 4)
+    assert log['calls'] == [3, -4]
+    memo.clear() #removes the results of compute only
+    memo(3)
+    Cache.cached(other, 4)
+    assert log['calls'] == [3, -4, 3]
+    Cache.clear()
+    assert Cache.files() == []
+
+def big(n):
+    return np.zeros(n)
+
+def test_eviction_removes_least_recently_used(cache, monkeypatch):
+    monkeypatch.setattr(Cache, 'maxBytes', 3*8000 + 3000) #room for three results of 8000 bytes
+    for i, n in enumerate((1000, 1001, 1002)):
+        Cache.cached(big, n)
+        path = os.path.join(Cache.folder(big), Cache.key(big, (n,), {}), 'result.pkl')
+        os.utime(path, (i, i)) #used in the order 1000, 1001, 1002
+    Cache.cached(big, 1000) #marks 1000 as recently used
+    Cache.cached(big, 1003) #so 1001 is removed
+    kept = {os.path.basename(path) for mtime, size, path in Cache.files()}
+    assert kept == {Cache.key(big, (n,), {}) for n in (1000, 1002, 1003)}
+
+def test_code_hash_follows_module_data(monkeypatch):
+    before = Cache.codeHash(Q2.answers)
+    monkeypatch.setattr(Q2, 'A', Q2.A + 1)
+    assert Cache.codeHash(Q2.answers) != before
+    assert Cache.codeHash(Convergence.study) == Cache.codeHash(Convergence.study) #stable
+
+def test_code_hash_follows_imported_modules(tmp_path, monkeypatch):
+    monkeypatch.setattr(Cache, 'here', str(tmp_path))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / 'solvers.py').write_text('def step(y):\n    return y + 1\n')
+    (tmp_path / 'study.py').write_text('import solvers\nmethods = {"step": solvers.step}\n'
+                                       'def run(y):\n    return methods["step"](y)\n') #reaches solvers only through a dict
+    study = importlib.import_module('study')
+    try:
+        before = Cache.codeHash(study.run)
+        (tmp_path / 'solvers.py').write_text('def step(y):\n    return y + 2\n')
+        assert Cache.codeHash(study.run) != before
+    finally:
+        sys.modules.pop('study', None)
+        sys.modules.pop('solvers', None)
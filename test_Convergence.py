@@ -0,0 +1,67 @@
+'''
+Regression tests for the convergence studies in Convergence, on the impedance
+divider with its analytic solution.
+'''
+import numpy as np
+import pytest
+import Convergence
+import Signals
+import Assignment_Q5 as Q5
+
+class NoPool:
+    def __init__(self, *args, **kwargs):
+        raise AssertionError('a process pool was started')
+
+def decay():
+    return Convergence.Problem(Q5.divider(Signals.step), 1, (0, 10), exact=Q5.Vout1)
+
+def forced():
+    return Convergence.Problem(Q5.divider(np.sin), 1, (0, 5)) #no exact solution, so orders come from the final values
+
+@pytest.mark.parametrize('method', ['RK4', 'AB4'])
+def test_observed_order(method):
+    res = Convergence.study(method, decay(), [0.2, 0.1, 0.05], workers=1)
+    assert np.allclose(res['order'], 4, atol=0.3)
+    assert list(res['steps']) == [0.2, 0.1, 0.05]
+    res = Convergence.study(method, forced(), [0.05, 0.1, 0.2, 0.4], workers=1) #the steps are sorted
+    assert list(res['steps']) == [0.4, 0.2, 0.1, 0.05] and res['errors'] is None
+    assert np.allclose(res['order'], 4, atol=0.5)
+
+def test_richardson_improves_the_final_value():
+    res = Convergence.study('RK4', forced(), [0.2, 0.1, 0.05], workers=1)
+    exact = (np.sin(5) - np.cos(5))/2 + 1.5*np.exp(-5)
+    assert np.all(np.abs(res['richardson'] - exact) < np.abs(res['final'][1:] - exact)/10)
+
+def test_best_and_predicted_steps():
+    res = Convergence.study('RK4', decay(), [0.4, 0.2, 0.1, 0.05], tol=1e-6, workers=1)
+    ok = res['steps'][res['errors'] <= 1e-6]
+    assert res['best'] == ok.max()
+    assert res['steps'][-1] < res['predicted'] < res['steps'][0]
+    check = Convergence.study('RK4', decay(), [res['predicted']], workers=1)
+    assert check['errors'][0] == pytest.approx(1e-6, rel=0.5)
+    assert Convergence.study('RK4', decay(), [0.4], tol=1e-12, workers=1)['best'] is None
+
+def test_run_matches_ImpDiv_error():
+    t, y, err = Convergence.run('RK4', decay(), 0.1)
+    assert err == pytest.approx(Q5.ErrorV1(y, t)[0], rel=1e-12)
+
+@pytest.mark.parametrize('cpus', [1, None])
+def test_one_cpu_runs_serially(monkeypatch, cpus):
+    monkeypatch.setattr(Convergence.os, 'cpu_count', lambda: cpus)
+    monkeypatch.setattr(Convergence, 'ProcessPoolExecutor', NoPool)
+    res = Convergence.study('RK4', decay(), [0.2, 0.1])
+    assert len(res['errors']) == 2
+    monkeypatch.undo()
+    monkeypatch.setattr(Convergence, 'ProcessPoolExecutor', NoPool)
+    Convergence.study('RK4', decay(), [0.1]) #a single step size also needs only one worker
+
+def test_parallel_matches_serial():
+    steps = [0.2, 0.1, 0.05]
+    serial = Convergence.study('AB4', decay(), steps, workers=1)
+    parallel = Convergence.study('AB4', decay(), steps, workers=2)
+    for key in ('errors', 'final', 'order', 'richardson'):
+        assert np.array_equal(serial[key], parallel[key])
+
+def test_invalid_method_raises():
+    with pytest.raises(TypeError):
+        Convergence.study('Euler', decay(), [0.1])
@@ -0,0 +1,75 @@
+'''
+Regression tests for the error measures in ErrorAnalysis, compared against
+finding each one separately with numpy.
+'''
+import numpy as np
+import pytest
+import ErrorAnalysis
+import Assignment_Q5 as Q5
+
+def data(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ref = rng.uniform(0.5, 2, n) * rng.choice([-1, 1], n)
+    return ref + rng.standard_normal(n)*1e-3, ref
+
+def test_absErr_and_relErr():
+    v, r = data(100)
+    assert np.array_equal(ErrorAnalysis.absErr(v, r), np.abs(v-r))
+    assert np.array_equal(ErrorAnalysis.relErr(v, r), np.abs(v-r)/np.abs(r))
+
+def test_errors_written_into_out():
+    v, r = data(50)
+    out = np.empty(50)
+    assert ErrorAnalysis.relErr(v, r, out=out) is out
+    assert np.array_equal(out, np.abs(v-r)/np.abs(r))
+    v2 = v.copy()
+    ErrorAnalysis.absErr(v2, r, out=v2) #in place over the values
+    assert np.array_equal(v2, np.abs(v-r))
+
+def test_stats_match_numpy():
+    v, r = data(1000)
+    s = ErrorAnalysis.stats(v, r)
+    a, e = np.abs(v-r), np.abs(v-r)/np.abs(r)
+    assert s['n'] == 1000
+    assert s['maxAbs'] == a.max() and s['maxRel'] == e.max()
+    assert s['meanAbs'] == pytest.approx(a.mean(), rel=1e-12)
+    assert s['meanRel'] == pytest.approx(e.mean(), rel=1e-12)
+    assert s['rmsAbs'] == pytest.approx(np.sqrt(np.mean(a**2)), rel=1e-12)
+    assert s['rmsRel'] == pytest.approx(np.sqrt(np.mean(e**2)), rel=1e-12)
+
+@pytest.mark.parametrize('sizes', [[1000], [1]*10 + [990], [333, 0, 334, 333]])
+def test_chunked_stats_match_one_pass(sizes):
+    v, r = data(1000)
+    S = ErrorAnalysis.ErrorStats()
+    i = 0
+    for k in sizes:
+        S.update(v[i:i+k], r[i:i+k])
+        i = i + k
+    whole, chunked = ErrorAnalysis.stats(v, r), S.result()
+    for key in whole:
+        assert chunked[key] == pytest.approx(whole[key], rel=1e-12)
+
+def test_update_leaves_inputs_unchanged():
+    v, r = data(20)
+    v0, r0 = v.copy(), r.copy()
+    ErrorAnalysis.ErrorStats().update(v, r)
+    assert np.array_equal(v, v0) and np.array_equal(r, r0)
+
+def test_empty_stats():
+    s = ErrorAnalysis.ErrorStats().update(np.zeros(0), np.zeros(0)).result()
+    assert s['n'] == 0 and s['maxAbs'] == 0 and s['meanRel'] == 0
+
+def loopErrorV1(Vout, t):
+    errors = [] #the original per-sample version
+    for i in range(1, len(t)):
+        expect = np.exp(-t)
+        errors.append(np.abs((Vout[i]-expect[i])/expect[i]))
+    return np.mean(errors), errors
+
+@pytest.mark.parametrize('h', [0.1, 0.05, 0.025])
+def test_ErrorV1_matches_loop(h):
+    t = np.arange(0, 10+h/2, h)
+    Vout = Q5.ImpDiv(t, Q5.Vin1(t), Q5.Vin1(t+h/2), 'RK4')
+    mean, errors = Q5.ErrorV1(Vout, t)
+    mean0, errors0 = loopErrorV1(Vout, t)
+    assert np.array_equal(errors, errors0) and mean == pytest.approx(mean0, rel=1e-14)
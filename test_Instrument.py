@@ -0,0 +1,87 @@
+'''
+Regression tests for the timers and work counters in Instrument.
+'''
+import json
+import os
+import subprocess
+import sys
+import pytest
+import Instrument
+import ODE
+
+@pytest.fixture
+def recording():
+    was, saved = Instrument.on, Instrument.snapshot()
+    Instrument.enable()
+    Instrument.reset()
+    yield Instrument.tallies
+    Instrument.reset()
+    Instrument.merge(saved)
+    Instrument.on = was
+
+@Instrument.timed('square')
+def square(x):
+    return x*x
+
+@Instrument.timed()
+def fails():
+    raise ValueError
+
+def test_timed_counts_calls_and_time(recording):
+    assert [square(k) for k in range(3)] == [0, 1, 4]
+    assert recording['square']['calls'] == 3 and recording['square']['time'] > 0
+    with pytest.raises(ValueError):
+        fails()
+    assert recording['fails']['calls'] == 1 #tallied under its qualified name, even when it raises
+    assert square.__name__ == 'square' and square.__wrapped__(3) == 9
+
+def test_section_and_count(recording):
+    with Instrument.section('block'):
+        Instrument.count('block', flops=10)
+    with Instrument.section('block'):
+        Instrument.count('block', flops=5, evals=2)
+    assert recording['block']['calls'] == 2 and recording['block']['flops'] == 15 and recording['block']['evals'] == 2
+
+def test_nothing_recorded_while_off(recording):
+    Instrument.disable()
+    square(2)
+    with Instrument.section('block'):
+        Instrument.count('block', flops=1)
+    assert recording == {}
+
+def test_solvers_count_their_work(recording):
+    ODE.rk4(lambda t, y: -y, [0, 0.1, 0.2, 0.3], [1.])
+    assert recording['rk4'] == {'calls': 1, 'time': recording['rk4']['time'], 'evals': 12, 'steps': 3}
+
+def test_snapshot_and_merge(recording):
+    square(1)
+    Instrument.count('other', evals=3)
+    snap = Instrument.snapshot()
+    snap['square']['calls'] = 100 #a copy, so the tallies are unchanged
+    assert recording['square']['calls'] == 1
+    Instrument.merge(snap)
+    assert recording['square']['calls'] == 101 and recording['other']['evals'] == 6
+
+def test_log_and_table(recording, tmp_path):
+    Instrument.count('LU', flops=2e9, calls=1)
+    recording['LU']['time'] = 1.0
+    square(3)
+    path = str(tmp_path / 'tallies.jsonl')
+    Instrument.log(path)
+    Instrument.log(path)
+    lines = [json.loads(line) for line in open(path)]
+    assert [line['name'] for line in lines] == ['LU', 'square']*2
+    assert lines[0]['flops'] == 2e9 and lines[0]['pid'] == os.getpid()
+    table = Instrument.table().splitlines()
+    assert table[1].startswith('LU') and '(2 GFLOP/s)' in table[1] #slowest first
+
+def test_environment_switches_on_and_logs(tmp_path):
+    path = str(tmp_path / 'exit.jsonl')
+    env = dict(os.environ, INSTRUMENT='1', INSTRUMENT_LOG=path)
+    code = 'import ODE; ODE.rk4(lambda t, y: -y, [0, 1], [1.])'
+    done = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env)
+    assert done.returncode == 0 and 'rk4' in done.stderr #the table printed at exit
+    assert json.loads(open(path).readline())['name'] == 'rk4'
+    env['INSTRUMENT'] = '0'
+    done = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env)
+    assert done.stderr == ''
@@ -0,0 +1,99 @@
+'''
+Regression tests for the iterative solvers in Krylov, compared against the direct
+solvers in numpy and scipy.
+'''
+import numpy as np
+import scipy.sparse as spsp
+import scipy.sparse.linalg as spsl
+import pytest
+import Assignment_Q2 as Q2
+import Krylov
+
+@pytest.fixture(autouse=True)
+def unchecked():
+    saved = dict(Q2.Check)
+    Q2.setCheck('off')
+    yield
+    Q2.setCheck(**saved)
+    Q2.Metrics.reset()
+
+def poisson(m):
+    G = spsp.kronsum(spsp.diags([-1., 2, -1], [-1, 0, 1], (m, m)), spsp.diags([-1., 2, -1], [-1, 0, 1], (m, m))).tocsr()
+    return Q2.CSR(G.data, G.indices, G.indptr, G.shape), G #the 2-D Laplacian on an m x m grid
+
+def nonsymmetric(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.eye(n)*4 + rng.standard_normal((n, n))/np.sqrt(n)
+
+def residual(A, x, b):
+    return np.linalg.norm(A.dot(x) - b)/np.linalg.norm(b)
+
+@pytest.mark.parametrize('M', [None, 'jacobi', 'ilu0'])
+def test_cg_matches_direct_solve(M):
+    A, G = poisson(20)
+    b = np.random.default_rng(1).standard_normal(400)
+    x, info = Krylov.cg(A, b, tol=1e-10, M=M)
+    assert info['converged'] is True and info['residuals'][-1] <= 1e-10
+    assert residual(G, x, b) <= 1e-9
+    assert np.allclose(x, spsl.spsolve(G.tocsc(), b), rtol=0, atol=1e-8)
+    assert info['matvecs'] == info['iterations'] and len(info['residuals']) == info['iterations']+1
+
+def test_preconditioning_reduces_iterations():
+    A, G = poisson(30)
+    b = np.ones(900)
+    its = {M: Krylov.cg(A, b, M=M)[1]['iterations'] for M in (None, 'ilu0')}
+    assert its['ilu0'] < its[None]
+    x, info = Krylov.cg(A, b, M='ilu0')
+    ref = spsl.cg(G, b, rtol=1e-10, M=spsl.LinearOperator(G.shape, Krylov.ILU0(A).solve))[0]
+    assert np.allclose(x, ref, rtol=0, atol=1e-7)
+
+@pytest.mark.parametrize('M', [None, 'jacobi', 'ilu0'])
+@pytest.mark.parametrize('restart', [5, 30, 200])
+def test_gmres_matches_direct_solve(M, restart):
+    A = nonsymmetric(100)
+    b = np.random.default_rng(2).standard_normal(100)
+    x, info = Krylov.gmres(A, b, tol=1e-10, restart=restart, M=M)
+    assert info['converged'] is True and residual(A, x, b) <= 1e-9
+    assert np.allclose(x, np.linalg.solve(A, b), rtol=0, atol=1e-8)
+
+def test_gmres_on_sparse_and_banded():
+    A, G = poisson(10)
+    b = np.ones(100)
+    x, info = Krylov.gmres(A, b, restart=20)
+    assert info['converged'] is True and np.allclose(x, spsl.spsolve(G.tocsc(), b), rtol=0, atol=1e-8)
+    B = Q2.Banded.tri(-np.ones(49), 3*np.ones(50), -2*np.ones(49)) #not symmetric
+    x, info = Krylov.gmres(B, np.ones(50), M='jacobi')
+    assert info['converged'] is True and np.allclose(x, np.linalg.solve(B.dense(), np.ones(50)), rtol=0, atol=1e-8)
+
+def test_matrix_free_operator():
+    A, G = poisson(15)
+    op = Krylov.Operator(G.dot, 225, diag=G.diagonal())
+    b = np.ones(225)
+    x, info = Krylov.cg(op, b, M='jacobi')
+    assert info['converged'] is True and residual(G, x, b) <= 1e-9
+    with pytest.raises(TypeError):
+        Krylov.cg(Krylov.Operator(G.dot, 225), b, M='jacobi') #no diagonal
+
+def test_not_converged_within_maxiter():
+    A, G = poisson(20)
+    b = np.ones(400)
+    for solver in (Krylov.cg, Krylov.gmres):
+        x, info = solver(A, b, maxiter=3)
+        assert info['converged'] is False and info['iterations'] == 3
+
+def test_starting_guess_and_zero_rhs():
+    A = nonsymmetric(20)
+    b = np.ones(20)
+    x = np.linalg.solve(A, b)
+    x1, info = Krylov.gmres(A, b, x0=x)
+    assert info['iterations'] == 0 and info['converged'] is True
+    x0, info = Krylov.cg(np.eye(5)*2, np.zeros(5))
+    assert np.array_equal(x0, np.zeros(5)) and info['converged'] is True
+
+def test_errors():
+    with pytest.raises(TypeError):
+        Krylov.cg(-np.eye(3), np.ones(3)) #not positive definite
+    with pytest.raises(TypeError):
+        Krylov.cg(np.eye(3), np.ones(3), M='ssor')
+    with pytest.raises(TypeError):
+        Krylov.Jacobi(np.array([[0., 1], [1, 0]]))
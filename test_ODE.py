@@ -0,0 +1,114 @@
+'''
+Regression tests for the ODE solvers, compared against analytic solutions of
+the impedance divider dVout/dt = Vin(t) - Vout.
+'''
+import numpy as np
+import scipy.linalg as spl
+import pytest
+import ODE
+import Assignment_Q5 as Q5
+
+def forced(t):
+    return (np.sin(t) - np.cos(t))/2 + 1.5*np.exp(-t) #the divider output for Vin = sin(t) from Vout = 1
+
+@pytest.mark.parametrize('solver, order', [(ODE.rk4, 4), (ODE.ab4, 4)])
+def test_fixed_step_order(solver, order):
+    f = Q5.divider(np.sin)
+    errs = []
+    for h in (0.1, 0.05):
+        t = np.arange(0, 5+h/2, h)
+        errs.append(np.max(np.abs(solver(f, t, [1.])[:,0] - forced(t))))
+    assert np.log2(errs[0]/errs[1]) == pytest.approx(order, abs=0.3)
+
+@pytest.mark.parametrize('method, solver', [('RK4', ODE.rk4), ('AB4', ODE.ab4)])
+@pytest.mark.parametrize('h', [0.1, 0.025])
+def test_ImpDiv_is_the_general_solver(method, solver, h):
+    t = np.arange(-2, 10+h/2, h)
+    Vout = Q5.ImpDiv(t, Q5.Vin1(t), Q5.Vin1(t+h/2), method)
+    assert np.array_equal(Vout, solver(Q5.divider(Q5.Vin1), t, [1.])[:,0])
+
+def test_Tabulated_looks_up_samples_and_half_steps():
+    t = np.array([[0., 10], [0.5, 10.25], [1, 10.5]]) #one column per signal
+    u, uh = np.array([[1., 2], [3, 4], [5, 6]]), -np.array([[1., 2], [3, 4], [5, 6]])
+    inp = ODE.Tabulated(t, u, uh)
+    assert np.array_equal(inp(t[1]), u[1])
+    assert np.array_equal(inp(t[1] + np.array([0.25, 0.125])), uh[1])
+    assert np.array_equal(inp(t[0] + (t[1]-t[0])), u[1]) #a step of t[i+1]-t[i] lands on the next sample
+    single = ODE.Tabulated(t[:,0], u[:,0], uh[:,0])
+    assert single(0.75) == uh[1][0] and single(1.0) == u[2][0]
+
+@pytest.mark.parametrize('rtol', [1e-4, 1e-6, 1e-9])
+def test_dopri_meets_tolerance(rtol):
+    sol = ODE.dopri(Q5.divider(np.sin), (0, 10), [1.], rtol=rtol, atol=rtol*1e-3)
+    assert np.max(np.abs(sol.y[:,0] - forced(sol.t))) < 100*rtol
+    assert sol.t[0] == 0 and sol.t[-1] == 10
+
+def test_dopri_dense_output():
+    sol = ODE.dopri(Q5.divider(np.sin), (0, 10), [1.], rtol=1e-8, atol=1e-11)
+    tq = np.linspace(0, 10, 1001)
+    assert np.max(np.abs(sol(tq)[:,0] - forced(tq))) < 1e-6
+    assert np.allclose(sol(sol.t), sol.y, rtol=0, atol=1e-14) #the polynomials pass through the steps
+
+def test_dopri_takes_fewer_steps_for_looser_tolerance():
+    f = Q5.divider(lambda t: 0)
+    loose = ODE.dopri(f, (0, 10), [1.], rtol=1e-3)
+    tight = ODE.dopri(f, (0, 10), [1.], rtol=1e-9)
+    assert len(loose.t) < len(tight.t) and loose.nfev < tight.nfev
+    assert tight.y[-1][0] == pytest.approx(np.exp(-10), abs=1e-8) #atol dominates once Vout is small
+
+def test_dopri_step_too_small_raises():
+    with pytest.raises(TypeError):
+        ODE.dopri(lambda t, y: 1/(1-t), (0, 2), [0.], rtol=1e-10, atol=1e-12) #blows up at t = 1
+
+def test_lti_is_exact_for_held_inputs():
+    t = np.arange(-2, 10.05, 0.1)
+    Vin = Q5.Vin1(t) #held at 1 up to t = 0, then 0
+    y = ODE.lti(-1, 1, t, Vin, 1)[:,0]
+    assert np.allclose(y, np.where(t <= 0, 1, np.exp(-np.maximum(t, 0))), rtol=1e-12, atol=0)
+
+def test_lti_multiple_states_match_matrix_exponential():
+    A = np.array([[0., 1], [-4, -0.5]]) #a damped oscillator
+    B = np.array([[0.], [1]])
+    t = np.linspace(0, 5, 51)
+    y = ODE.lti(A, B, t, np.ones(51), [1., 0])
+    yss = -np.linalg.solve(A, B[:,0]) #the steady state for a constant input of 1
+    exact = [yss + spl.expm(A*ti).dot([1-yss[0], -yss[1]]) for ti in t]
+    assert np.allclose(y, exact, rtol=0, atol=1e-12)
+
+@pytest.mark.parametrize('A, B', [(-1, 1), ([[0., 1], [-4, -0.5]], [[0.], [1]])])
+def test_lti_falls_back_to_rk4_with_half_steps(A, B):
+    t = np.arange(0, 6.01, 0.05)
+    u, uh = np.sin(t), np.sin(t+0.025) #not constant over the steps
+    f = ODE.Linear(A, B, ODE.Tabulated(t, u, uh))
+    y = ODE.lti(A, B, t, u, np.ones(len(f.A)), uh=uh)
+    assert np.array_equal(y, ODE.rk4(f, t, np.ones(len(f.A))))
+    assert np.allclose(y, ODE.rk4(ODE.Linear(A, B, np.sin), t, np.ones(len(f.A))), rtol=0, atol=1e-14)
+
+def test_lti_fallback_matches_ImpDiv():
+    t = np.arange(-2, 10.05, 0.1)
+    Vin, Vinh = Q5.Vin2(t, 0.5), Q5.Vin2(t+0.05, 0.5)
+    y = ODE.lti(-1, 1, t, Vin, 1, uh=Vinh)[:,0]
+    assert np.array_equal(y, Q5.ImpDiv(t, Vin, Vinh, 'RK4'))
+    assert np.array_equal(y, Q5.ImpDiv(t, Vin, Vinh, 'LTI')) #LTI also falls back
+
+@pytest.fixture
+def expms():
+    saved, size = ODE.expms.copy(), ODE.expmSize
+    ODE.expms.clear()
+    yield ODE.expms
+    ODE.expms.clear()
+    ODE.expms.update(saved)
+    ODE.expmSize = size
+
+def test_discretise_cache_is_bounded(expms):
+    ODE.expmSize = 4
+    A, B = np.array([[-1.]]), np.array([[1.]])
+    first = ODE.discretise(A, B, 0.1)
+    assert ODE.discretise(A, B, 0.1) is first #found once per step size
+    for h in (0.2, 0.3, 0.4, 0.5):
+        ODE.discretise(A, B, h)
+    assert len(expms) == 4 and ODE.discretise(A, B, 0.1) is not first #0.1 was the least recently used
+    assert np.allclose(first[0], np.exp(-0.1)) and np.allclose(first[1], 1-np.exp(-0.1))
+    ODE.discretise(A, B, 0.5)
+    ODE.discretise(A, B, 0.6)
+    assert (A.tobytes(), B.tobytes(), A.shape, B.shape, 0.5) in expms #recently used so kept
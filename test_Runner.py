@@ -0,0 +1,64 @@
+'''
+Regression tests for running the questions as tasks with Runner.
+'''
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+import Runner
+
+class NoPool:
+    def __init__(self, *args, **kwargs):
+        raise AssertionError('a process pool was started')
+
+@pytest.mark.parametrize('workers, cpus', [(1, 8), (None, 1), (None, None)])
+def test_one_worker_runs_in_this_process(monkeypatch, capsys, workers, cpus):
+    monkeypatch.setattr(Runner.os, 'cpu_count', lambda: cpus)
+    monkeypatch.setattr(Runner, 'ProcessPoolExecutor', NoPool)
+    results, times = Runner.run([Runner.Task('Q1', 'Assignment_Q1')], workers=workers, plot=False, cache=False)
+    assert set(results) == {'Q1'} and times['Q1'] >= 0
+    assert 'Wall time per task' in capsys.readouterr().out
+
+tasks = [Runner.Task('A', 'Assignment_Q1'),
+         Runner.Task('B', 'Assignment_Q2'),
+         Runner.Task('C', 'Assignment_Q3', deps=['B']),
+         Runner.Task('D', 'Assignment_Q4', deps=['C', 'A'])]
+
+@pytest.mark.parametrize('names, chosen', [(['A'], 'A'), (['C'], 'BC'), (['D'], 'ABCD'), (['C', 'B'], 'BC'), ([], '')])
+def test_select_adds_dependencies_in_order(names, chosen):
+    assert ''.join(task.name for task in Runner.select(tasks, names)) == chosen
+
+def test_select_unknown_task_raises():
+    with pytest.raises(TypeError):
+        Runner.select(tasks, ['Q9'])
+    with pytest.raises(TypeError):
+        Runner.select([Runner.Task('A', 'Assignment_Q1', deps=['Z'])], ['A'])
+
+def test_unmet_dependency_raises_in_parallel(capsys):
+    with pytest.raises(TypeError):
+        Runner.run([Runner.Task('A', 'Assignment_Q1', deps=['Z'])], workers=2, plot=False, cache=False)
+
+def test_importing_questions_has_no_side_effects():
+    code = 'import ' + ', '.join(task.module for task in tasks)
+    done = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=dict(os.environ, MPLBACKEND='Agg'))
+    assert done.returncode == 0 and done.stdout == ''
+
+def test_plots_only_when_asked(monkeypatch, capsys):
+    import Assignment_Q1
+    drawn = []
+    monkeypatch.setattr(Assignment_Q1, 'plots', lambda res: drawn.append(res))
+    results, times = Runner.run(tasks[:1], workers=1, plot=False, cache=False)
+    assert drawn == []
+    results, times = Runner.run(tasks[:1], workers=1, plot=True, cache=False)
+    assert drawn == [results['A']]
+    out = capsys.readouterr().out
+    assert out.index('Upper from 0.25') < out.index('Wall time per task')
+
+def test_parallel_matches_serial(capsys):
+    serial = Runner.run(tasks[:2], workers=1, plot=False, cache=False)[0]
+    parallel = Runner.run(tasks[:2], workers=2, plot=False, cache=False)[0]
+    assert set(parallel) == {'A', 'B'}
+    for name in serial:
+        for key in serial[name]:
+            assert np.array_equal(serial[name][key], parallel[name][key])
@@ -0,0 +1,79 @@
+'''
+Regression tests for the signal generators in Signals, compared against the
+per-sample loops they replaced in questions 4 and 5.
+'''
+import numpy as np
+import pytest
+import Signals
+import Assignment_Q4 as Q4
+import Assignment_Q5 as Q5
+
+def loopTophat(t):
+    return np.array([4.0 if 5 <= v <= 7 else 0.0 for v in t])
+
+def loopGauss(t):
+    return np.array([(1/(np.sqrt(2*np.pi)))*np.exp((-1*v**2)/4) for v in t])
+
+def loopVin1(t):
+    return np.array([1.0 if v < 0 else 0.0 for v in t])
+
+def loopVin2(t, T):
+    return np.array([1.0 if v < 0 else (0.0 if int(2*(v/T)) % 2 == 0 else 1.0) for v in t])
+
+questionGrids = [np.linspace(-20, 20, 41), np.linspace(-20, 20, 4001), np.linspace(0, 40, 1601)] #the grids used in Q4 and Q5
+otherGrids = [np.linspace(0, 40, 1601) + 0.0125, np.random.default_rng(0).uniform(-10, 30, 999)]
+
+@pytest.mark.parametrize('t', questionGrids + otherGrids)
+def test_generators_match_loops(t):
+    assert np.array_equal(Q4.tophat(t), loopTophat(t))
+    assert np.array_equal(Q5.Vin1(t), loopVin1(t))
+    for T in (2, 0.5, 0.3):
+        assert np.array_equal(Q5.Vin2(t, T), loopVin2(t, T))
+    #the scalar v**2 in the loop (libm pow) and the array square can differ in the last bit,
+    #which exp magnifies for the tiny values far from the centre
+    assert np.allclose(Q4.gauss(t), loopGauss(t), rtol=1e-12, atol=0)
+
+@pytest.mark.parametrize('t', questionGrids)
+def test_gauss_matches_loop_exactly_on_question_grids(t):
+    assert np.array_equal(Q4.gauss(t), loopGauss(t))
+
+def test_Grid_matches_array():
+    g = Signals.Grid(-5, 5, 101)
+    assert len(g) == 101
+    assert np.array_equal(Signals.generate('gauss', g, var=2), Signals.generate('gauss', g.values(), var=2))
+
+def test_cached_results_are_writable_copies():
+    t = np.linspace(0, 10, 11)
+    y = Q4.tophat(t)
+    y[:] = -1
+    assert y.flags.writeable
+    assert np.array_equal(Q4.tophat(t), loopTophat(t)) #the cache is unchanged
+    assert not any(v.flags.writeable for v in Signals.cache.values())
+
+def test_cache_is_keyed_and_bounded():
+    Signals.cache.clear()
+    t = np.linspace(0, 1, 5)
+    a = Signals.generate('step', t, t0=0.5)
+    b = Signals.generate('step', t, t0=0.25)
+    assert not np.array_equal(a, b)
+    for k in range(Signals.cacheSize + 5):
+        Signals.generate('rect', t, amp=k)
+    assert len(Signals.cache) == Signals.cacheSize
+
+def test_invalid_shape_raises():
+    with pytest.raises(TypeError):
+        Signals.generate('triangle', np.zeros(3))
+    with pytest.raises(TypeError):
+        Signals.Waveform('triangle')
+
+def test_Sampled_is_lazy():
+    calls = []
+    class Counting(Signals.Waveform):
+        def __call__(self, t):
+            calls.append(t)
+            return super().__call__(t)
+    s = Counting('square', T=2).lazy(np.linspace(0, 4, 9))
+    assert len(s) == 9 and calls == []
+    assert np.array_equal(np.asarray(s), [0, 0, 1, 1, 0, 0, 1, 1, 0])
+    np.asarray(s)
+    assert len(calls) == 1